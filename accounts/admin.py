@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from .models import User, UserProfile, BankAccount, CryptoWallet, PasswordResetToken
+from site_core.pagination import EstimatedCountAdminMixin
 
 
 class UserProfileInline(admin.StackedInline):
@@ -9,7 +10,7 @@ class UserProfileInline(admin.StackedInline):
     can_delete = False
 
 
-class CustomUserAdmin(UserAdmin):
+class CustomUserAdmin(EstimatedCountAdminMixin, UserAdmin):
     list_display = ('username', 'email', 'subscription_level', 'is_verified', 'date_joined')
     list_filter = ('subscription_level', 'is_verified', 'is_staff', 'is_superuser')
     fieldsets = UserAdmin.fieldsets + (
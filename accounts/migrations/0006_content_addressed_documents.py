@@ -0,0 +1,34 @@
+# Generated by Django 4.2.17 on 2026-10-19 17:59
+
+import site_core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_passwordresettoken'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='kycapplication',
+            name='nin_document',
+            field=models.ImageField(blank=True, storage=site_core.storage.get_content_addressed_storage, upload_to='nin_documents/'),
+        ),
+        migrations.AlterField(
+            model_name='kycverification',
+            name='id_document_back',
+            field=models.ImageField(blank=True, null=True, storage=site_core.storage.get_content_addressed_storage, upload_to='kyc_documents/'),
+        ),
+        migrations.AlterField(
+            model_name='kycverification',
+            name='id_document_front',
+            field=models.ImageField(storage=site_core.storage.get_content_addressed_storage, upload_to='kyc_documents/'),
+        ),
+        migrations.AlterField(
+            model_name='kycverification',
+            name='selfie_with_id',
+            field=models.ImageField(blank=True, null=True, storage=site_core.storage.get_content_addressed_storage, upload_to='kyc_documents/'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-19 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_content_addressed_documents'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='passwordresettoken',
+            index=models.Index(fields=['expires_at'], name='reset_token_expiry_idx'),
+        ),
+    ]
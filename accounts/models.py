@@ -7,6 +7,8 @@ from django.utils.crypto import get_random_string
 from django.utils import timezone
 import uuid
 
+from site_core.storage import get_content_addressed_storage
+
 
 class User(AbstractUser):
     SUBSCRIPTION_CHOICES = [
@@ -69,6 +71,7 @@ class UserProfile(models.Model):
         related_name='profile_referrals'
     )
     date_joined = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     @property
     def is_complete(self):
@@ -97,7 +100,7 @@ class KYCApplication(models.Model):
     address = models.TextField()
     bvn = models.CharField(max_length=11, blank=True)  # BVN
     nin = models.CharField(max_length=11, blank=True)  # NIN
-    nin_document = models.ImageField(upload_to='nin_documents/', blank=True)
+    nin_document = models.ImageField(upload_to='nin_documents/', storage=get_content_addressed_storage, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     rejection_reason = models.TextField(blank=True)
     verified_at = models.DateTimeField(null=True, blank=True)
@@ -195,9 +198,9 @@ class KYCVerification(models.Model):
     postal_code = models.CharField(max_length=20, blank=True)
     
     # Documents
-    id_document_front = models.ImageField(upload_to='kyc_documents/')
-    id_document_back = models.ImageField(upload_to='kyc_documents/', blank=True, null=True)
-    selfie_with_id = models.ImageField(upload_to='kyc_documents/', blank=True, null=True)
+    id_document_front = models.ImageField(upload_to='kyc_documents/', storage=get_content_addressed_storage)
+    id_document_back = models.ImageField(upload_to='kyc_documents/', storage=get_content_addressed_storage, blank=True, null=True)
+    selfie_with_id = models.ImageField(upload_to='kyc_documents/', storage=get_content_addressed_storage, blank=True, null=True)
     
     # Monnify-specific fields
     monnify_customer_reference = models.CharField(max_length=100, blank=True)
@@ -271,6 +274,9 @@ class PasswordResetToken(models.Model):
     class Meta:
         verbose_name = 'Password Reset Token'
         verbose_name_plural = 'Password Reset Tokens'
+        indexes = [
+            models.Index(fields=['expires_at'], name='reset_token_expiry_idx'),
+        ]
     
     def __str__(self):
         return f"Password Reset Token for {self.user.username}"
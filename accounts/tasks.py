@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.utils import timezone
+
+from site_core.taskqueue import task
+
+
+class VirtualAccountError(Exception):
+    pass
+
+
+@task(max_attempts=5, retry_seconds=60)
+def approve_kyc_with_virtual_accounts(kyc_id, reviewer_id):
+    """Create Monnify reserved accounts for a pending KYC and approve it.
+
+    Runs in the task worker because the Monnify round trips are slow; a
+    failed call raises so the queue retries it with backoff.
+    """
+    from payments.monnify_service import MonnifyService
+    from site_core.mail import queue_email
+    from site_core.models import MonnifyBank
+    from .models import KYCVerification, VirtualAccount
+
+    kyc = KYCVerification.objects.select_related('user').get(pk=kyc_id)
+    if kyc.status != 'pending':
+        return
+
+    kyc_data = {
+        'legal_first_name': kyc.legal_first_name,
+        'legal_last_name': kyc.legal_last_name,
+    }
+    # Use all active banks if user has no preference, otherwise use their preferences
+    preferred_banks = list(kyc.user.bank_preferences.filter(is_active=True).values_list('bank__bank_code', flat=True))
+    if not preferred_banks:
+        preferred_banks = list(MonnifyBank.objects.filter(is_active=True).values_list('bank_code', flat=True))
+
+    account_data, error = MonnifyService().create_reserved_account(kyc.user, kyc_data, preferred_banks)
+    if not (account_data and account_data.get('accounts')):
+        raise VirtualAccountError(f"Failed to create virtual accounts for {kyc.user.username}: {error}")
+
+    with transaction.atomic():
+        kyc = KYCVerification.objects.select_for_update().select_related('user').get(pk=kyc_id)
+        if kyc.status != 'pending':
+            return
+        # Delete old accounts if any, to prevent duplicates on re-approval
+        VirtualAccount.objects.filter(user=kyc.user).delete()
+        VirtualAccount.objects.bulk_create([
+            VirtualAccount(
+                user=kyc.user,
+                account_number=account['accountNumber'],
+                account_name=account['accountName'],
+                bank_name=account['bankName'],
+                bank_code=account['bankCode'],
+                reference=account_data['accountReference'],
+                is_primary=index == 0,
+            )
+            for index, account in enumerate(account_data['accounts'])
+        ])
+
+        kyc.status = 'approved'
+        kyc.rejection_reason = ''
+        kyc.monnify_customer_reference = account_data.get('customerReference', '')
+        kyc.reviewed_at = timezone.now()
+        kyc.reviewed_by_id = reviewer_id
+        kyc.save()
+
+        queue_email(
+            'Your KYC verification is approved',
+            f'Hi {kyc.user.get_display_name()},\n\n'
+            f'Your identity verification has been approved and your virtual accounts are ready to use.',
+            [kyc.user.email],
+        )
@@ -3,7 +3,7 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.views.generic import UpdateView, CreateView
 from django.views.generic import DetailView
 from jobs.models import Job
@@ -38,6 +38,7 @@ from .models import UserBankPreference, VirtualAccount
 from django.contrib import messages
 from .models import KYCVerification, VirtualAccount, User
 from .forms_kyc import KYCVerificationForm
+from site_core.mail import queue_email
 from django.contrib import messages
 
 import logging
@@ -67,9 +68,9 @@ def kyc_verification(request):
                     kyc_instance.user = request.user
                     kyc_instance.status = 'pending'
                     kyc_instance.save()
-                
-                # Send notification to admin (you can implement this)
-                send_kyc_submission_notification(request.user, kyc_instance)
+                    
+                    # Queued with the submission so it is only sent if the KYC row is saved
+                    send_kyc_submission_notification(request.user, kyc_instance)
                 
                 messages.success(
                     request, 
@@ -102,10 +103,14 @@ def kyc_verification(request):
     return render(request, 'accounts/profile/kyc_verification.html', context)
 
 def send_kyc_submission_notification(user, kyc):
-    """Send notification about new KYC submission"""
-    # You can implement email notifications, in-app notifications, etc.
-    # For now, we'll just log it
+    """Queue an email to staff about a new KYC submission"""
     logger.info(f"New KYC submission from {user.username} (ID: {kyc.id})")
+    staff_emails = User.objects.filter(is_staff=True, is_active=True).exclude(email='').values_list('email', flat=True)
+    queue_email(
+        'New KYC submission',
+        f'{user.username} submitted KYC verification #{kyc.id} for review.',
+        list(staff_emails),
+    )
 
 @login_required
 def virtual_account_details(request):
@@ -502,10 +507,20 @@ def password_reset_request(request):
                 expires_at=timezone.now() + timezone.timedelta(hours=1)
             )
             
+            reset_url = request.build_absolute_uri(
+                reverse('password_reset_confirm', kwargs={'token': token.token})
+            )
+            queue_email(
+                'Reset your password',
+                f'Hi {user.get_display_name()},\n\n'
+                f'Use this link to reset your password. It expires in 1 hour:\n{reset_url}\n\n'
+                f'If you did not ask for a password reset you can ignore this email.',
+                [user.email],
+            )
+            
             messages.success(
                 request, 
-                f'Password reset link has been generated. Please use this link to reset your password: '
-                f'{request.build_absolute_uri(f"/accounts/password-reset/confirm/{token.token}/")}'
+                'Password reset link has been sent to your email address. It expires in 1 hour.'
             )
             return redirect('password_reset_request')
     else:
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from solo.admin import SingletonModelAdmin
-from .models import Referral, AffiliateSale, AffiliateSettings
+from .models import Referral, AffiliateSale, AffiliateSettings, CommissionSettlementState, ReferrerStats, ReferralPath
+from .stats import refresh_referrer_stats
 
 @admin.register(Referral)
 class ReferralAdmin(admin.ModelAdmin):
@@ -18,7 +19,10 @@ class AffiliateSaleAdmin(admin.ModelAdmin):
     actions = ['approve_commissions', 'mark_as_paid']
     
     def approve_commissions(self, request, queryset):
+        referrer_ids = set(queryset.values_list('referral__referrer_id', flat=True))
         updated = queryset.update(status='approved')
+        # update() sends no signals
+        refresh_referrer_stats(referrer_ids)
         self.message_user(request, f'{updated} commissions approved.')
     approve_commissions.short_description = "Approve selected commissions"
     
@@ -47,4 +51,39 @@ class AffiliateSettingsAdmin(SingletonModelAdmin):
         ('Settings', {
             'fields': ('auto_approve_commissions', 'commission_payout_delay_days')
         }),
-    )
\ No newline at end of file
+    )
+
+
+@admin.register(CommissionSettlementState)
+class CommissionSettlementStateAdmin(SingletonModelAdmin):
+    readonly_fields = ('last_updated_at', 'last_transaction_id', 'last_run_at')
+
+
+@admin.register(ReferrerStats)
+class ReferrerStatsAdmin(admin.ModelAdmin):
+    list_display = ('referrer', 'referral_count', 'total_earned', 'pending', 'paid', 'updated_at')
+    search_fields = ('referrer__username',)
+    readonly_fields = ('referrer', 'referral_count', 'total_earned', 'pending', 'paid', 'updated_at')
+    actions = ['recompute_stats']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def recompute_stats(self, request, queryset):
+        refresh_referrer_stats(queryset.values_list('referrer_id', flat=True))
+        self.message_user(request, f'{queryset.count()} referrer stats recomputed.')
+    recompute_stats.short_description = "Recompute selected stats"
+
+
+@admin.register(ReferralPath)
+class ReferralPathAdmin(admin.ModelAdmin):
+    list_display = ('ancestor', 'descendant', 'depth')
+    list_filter = ('depth',)
+    search_fields = ('ancestor__username', 'descendant__username')
+    raw_id_fields = ('ancestor', 'descendant')
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand
+from affiliates.settlement import SETTLEMENT_BATCH_SIZE, settle_commissions
+
+class Command(BaseCommand):
+    help = 'Pay affiliate commissions on transactions completed since the last settlement'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SETTLEMENT_BATCH_SIZE)
+        parser.add_argument('--lag', type=int, default=None,
+                            help='Only settle transactions completed at least this many seconds ago')
+        parser.add_argument('--loop', action='store_true', help='Keep settling periodically')
+        parser.add_argument('--interval', type=float, default=60.0, help='Seconds between runs with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            created = settle_commissions(batch_size=options['batch_size'], lag_seconds=options['lag'])
+            if created:
+                self.stdout.write(f'Created {created} affiliate commissions')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
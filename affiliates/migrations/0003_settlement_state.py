@@ -0,0 +1,26 @@
+# Generated by Django 4.2.17 on 2026-10-19 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('affiliates', '0002_affiliatesettings'),
+        ('payments', '0005_alter_manualdeposit_screenshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommissionSettlementState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_updated_at', models.DateTimeField(blank=True, null=True)),
+                ('last_transaction_id', models.BigIntegerField(default=0)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Commission Settlement State',
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.17 on 2026-10-19 18:13
+
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+
+def drop_duplicate_commissions(apps, schema_editor):
+    """Keep the first commission recorded for each source transaction (re-saves used to add more)"""
+    AffiliateSale = apps.get_model('affiliates', 'AffiliateSale')
+    duplicated = (
+        AffiliateSale.objects.values('sale_id')
+        .annotate(first_id=Min('id'), rows=models.Count('id'))
+        .filter(rows__gt=1)
+    )
+    for row in duplicated.iterator():
+        AffiliateSale.objects.filter(sale_id=row['sale_id']).exclude(id=row['first_id']).delete()
+
+
+def start_watermark(apps, schema_editor):
+    """Begin settling from now so transactions completed before the engine are not paid again"""
+    Transaction = apps.get_model('payments', 'Transaction')
+    CommissionSettlementState = apps.get_model('affiliates', 'CommissionSettlementState')
+    latest = Transaction.objects.aggregate(updated_at=Max('updated_at'), transaction_id=Max('id'))
+    CommissionSettlementState.objects.update_or_create(
+        pk=1,
+        defaults={
+            'last_updated_at': latest['updated_at'],
+            'last_transaction_id': latest['transaction_id'] or 0,
+        },
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('affiliates', '0003_settlement_state'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_commissions, migrations.RunPython.noop),
+        migrations.RunPython(start_watermark, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='affiliatesale',
+            constraint=models.UniqueConstraint(fields=('sale',), name='affiliate_sale_once_per_source'),
+        ),
+    ]
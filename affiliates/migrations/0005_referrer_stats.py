@@ -0,0 +1,59 @@
+# Generated by Django 4.2.17 on 2026-10-19 18:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_referrer_stats(apps, schema_editor):
+    """One row per existing referrer, totalled from the commissions recorded so far"""
+    Referral = apps.get_model('affiliates', 'Referral')
+    AffiliateSale = apps.get_model('affiliates', 'AffiliateSale')
+    ReferrerStats = apps.get_model('affiliates', 'ReferrerStats')
+    totals = {
+        row['referral__referrer_id']: row
+        for row in AffiliateSale.objects.values('referral__referrer_id').annotate(
+            total_earned=Sum('commission_amount', filter=Q(status__in=['approved', 'paid'])),
+            pending=Sum('commission_amount', filter=Q(status='pending')),
+            paid=Sum('commission_amount', filter=Q(status='paid')),
+        ).order_by()
+    }
+    counts = Referral.objects.values('referrer_id').annotate(count=Count('id')).order_by()
+    ReferrerStats.objects.bulk_create([
+        ReferrerStats(
+            referrer_id=row['referrer_id'],
+            total_earned=totals.get(row['referrer_id'], {}).get('total_earned') or 0,
+            pending=totals.get(row['referrer_id'], {}).get('pending') or 0,
+            paid=totals.get(row['referrer_id'], {}).get('paid') or 0,
+            referral_count=row['count'],
+        )
+        for row in counts
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_passwordresettoken_reset_token_expiry_idx'),
+        ('affiliates', '0004_commission_once_per_source'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferrerStats',
+            fields=[
+                ('referrer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='referrer_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_earned', models.DecimalField(decimal_places=2, default=0, help_text='Approved and paid commissions', max_digits=12)),
+                ('pending', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('paid', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('referral_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Referrer Stats',
+                'verbose_name_plural': 'Referrer Stats',
+            },
+        ),
+        migrations.RunPython(backfill_referrer_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.17 on 2026-10-19 18:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def build_referral_paths(apps, schema_editor):
+    """Walk each referred user's chain of referrers to record every ancestor with its depth"""
+    Referral = apps.get_model('affiliates', 'Referral')
+    ReferralPath = apps.get_model('affiliates', 'ReferralPath')
+    parents = dict(Referral.objects.values_list('referred_user_id', 'referrer_id'))
+    paths = []
+    for user_id in parents:
+        ancestor, depth, seen = parents[user_id], 1, {user_id}
+        while ancestor is not None and ancestor not in seen:
+            paths.append(ReferralPath(ancestor_id=ancestor, descendant_id=user_id, depth=depth))
+            seen.add(ancestor)
+            ancestor, depth = parents.get(ancestor), depth + 1
+    ReferralPath.objects.bulk_create(paths, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('affiliates', '0005_referrer_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReferralPath',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveSmallIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='downline_paths', to=settings.AUTH_USER_MODEL)),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upline_paths', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ancestor', 'depth'], name='referral_path_downline_idx'), models.Index(fields=['descendant', 'depth'], name='referral_path_upline_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='referral_path_unique')],
+            },
+        ),
+        migrations.RunPython(build_referral_paths, migrations.RunPython.noop),
+    ]
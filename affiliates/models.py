@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from solo.models import SingletonModel
 
@@ -15,6 +16,12 @@ class Referral(models.Model):
     def __str__(self):
         return f"{self.referrer.username} -> {self.referred_user.username}"
 
+    def clean(self):
+        if self.referrer_id and self.referrer_id == self.referred_user_id:
+            raise ValidationError("A user cannot refer themselves.")
+        if ReferralPath.objects.filter(ancestor_id=self.referred_user_id, descendant_id=self.referrer_id).exists():
+            raise ValidationError("The referrer is already in this user's downline.")
+
 class AffiliateSale(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -33,6 +40,10 @@ class AffiliateSale(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            # A source transaction earns at most one commission
+            models.UniqueConstraint(fields=['sale'], name='affiliate_sale_once_per_source'),
+        ]
 
     def __str__(self):
         return f"Affiliate Sale: {self.referral.referrer.username} - {self.commission_amount}"
@@ -113,4 +124,59 @@ class AffiliateSettings(SingletonModel):
         verbose_name_plural = "Affiliate Settings"
     
     def __str__(self):
-        return "Affiliate Program Settings"
\ No newline at end of file
+        return "Affiliate Program Settings"
+
+
+class CommissionSettlementState(SingletonModel):
+    """How far the commission settlement engine has scanned completed transactions"""
+    last_updated_at = models.DateTimeField(null=True, blank=True)
+    last_transaction_id = models.BigIntegerField(default=0)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Commission Settlement State"
+
+    def __str__(self):
+        return "Commission Settlement State"
+
+
+class ReferrerStats(models.Model):
+    """Running commission totals per referrer, kept in step with AffiliateSale and Referral rows"""
+    referrer = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='referrer_stats'
+    )
+    total_earned = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Approved and paid commissions")
+    pending = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    paid = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    referral_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Referrer Stats"
+        verbose_name_plural = "Referrer Stats"
+
+    def __str__(self):
+        return f"Referrer Stats: {self.referrer.username}"
+
+
+class ReferralPath(models.Model):
+    """Closure table of the referral tree: one row per (ancestor, descendant) pair at any depth.
+
+    Depth 1 is a direct referral, depth 2 a referral's referral, and so on.
+    Maintained from Referral rows by ``affiliates.tree``.
+    """
+    ancestor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='downline_paths')
+    descendant = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upline_paths')
+    depth = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='referral_path_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['ancestor', 'depth'], name='referral_path_downline_idx'),
+            models.Index(fields=['descendant', 'depth'], name='referral_path_upline_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
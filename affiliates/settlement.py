@@ -0,0 +1,185 @@
+import logging
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from payments.models import Transaction
+from site_core.pubsub import publish_to_user
+from transactions.outbox import enqueue_notifications
+from .models import AffiliateSale, AffiliateSettings, CommissionSettlementState, Referral
+from .stats import refresh_referrer_stats
+
+logger = logging.getLogger(__name__)
+
+SETTLEMENT_BATCH_SIZE = 500
+
+# Small commission on money added by a referred user
+ADD_MONEY_COMMISSION_RATE = Decimal('0.50')
+
+ELIGIBLE_TYPES = ('sale', 'add_money')
+
+
+def settlement_lag():
+    """Seconds a completed transaction must age before it is settled.
+
+    ``updated_at`` is stamped before the saving transaction commits, so a
+    slow commit could otherwise land behind the watermark and be skipped.
+    """
+    return getattr(settings, 'AFFILIATE_SETTLEMENT_LAG_SECONDS', 30)
+
+
+def commission_rate(transaction_type, affiliate_settings):
+    if transaction_type == 'sale':
+        return affiliate_settings.referral_commission_rate
+    if transaction_type == 'add_money':
+        return ADD_MONEY_COMMISSION_RATE
+    return Decimal('0.00')
+
+
+def commission_reference(source_id):
+    """Deterministic reference, so the unique constraint also stops a second payout"""
+    return f'AFF-{source_id}'
+
+
+def _settle_batch(state, affiliate_settings, horizon, batch_size):
+    sources = Transaction.objects.filter(
+        status='completed', transaction_type__in=ELIGIBLE_TYPES, updated_at__lte=horizon
+    )
+    if state.last_updated_at is not None:
+        sources = sources.filter(
+            Q(updated_at__gt=state.last_updated_at)
+            | Q(updated_at=state.last_updated_at, pk__gt=state.last_transaction_id)
+        )
+    batch = list(
+        sources.order_by('updated_at', 'pk')
+        .values('pk', 'user_id', 'transaction_type', 'amount', 'updated_at')[:batch_size]
+    )
+    if not batch:
+        return batch, [], []
+
+    source_ids = [row['pk'] for row in batch]
+    referrals = {
+        referral.referred_user_id: referral
+        for referral in Referral.objects.filter(
+            referred_user_id__in={row['user_id'] for row in batch}, is_active=True
+        ).select_related('referrer', 'referred_user')
+    }
+    settled = set(
+        AffiliateSale.objects.filter(sale_id__in=source_ids).order_by().values_list('sale_id', flat=True)
+    )
+    # A payout whose AffiliateSale was deleted in the admin still counts as settled;
+    # paying it again would also break the unique reference and stall the batch
+    paid_out = set(
+        Transaction.objects.filter(reference__in=[commission_reference(pk) for pk in source_ids])
+        .values_list('reference', flat=True)
+    )
+
+    now = timezone.now()
+    auto_approve = affiliate_settings.auto_approve_commissions
+    sales, payouts = [], []
+    for row in batch:
+        referral = referrals.get(row['user_id'])
+        rate = commission_rate(row['transaction_type'], affiliate_settings)
+        if (referral is None or rate <= 0 or row['pk'] in settled
+                or commission_reference(row['pk']) in paid_out):
+            continue
+        amount = (row['amount'] * rate) / Decimal('100')
+        sales.append(AffiliateSale(
+            referral=referral,
+            sale_id=row['pk'],
+            commission_amount=amount,
+            commission_rate=rate,
+            status='paid' if auto_approve else 'pending',
+            paid_at=now if auto_approve else None,
+        ))
+        if auto_approve:
+            payouts.append(Transaction(
+                user_id=referral.referrer_id,
+                transaction_type='commission',
+                amount=amount,
+                status='completed',
+                reference=commission_reference(row['pk']),
+                description=f'Affiliate commission from {referral.referred_user.username}',
+                completed_at=now,
+            ))
+
+    AffiliateSale.objects.bulk_create(sales)
+    # bulk_create sends no signals, so the referrers' totals are refreshed here
+    refresh_referrer_stats({sale.referral.referrer_id for sale in sales})
+    if payouts:
+        payouts = Transaction.objects.bulk_create(payouts)
+
+    last = batch[-1]
+    CommissionSettlementState.objects.filter(pk=state.pk).update(
+        last_updated_at=last['updated_at'], last_transaction_id=last['pk'], last_run_at=now
+    )
+    return batch, sales, payouts
+
+
+def _announce(payouts):
+    """What the per-save signals did for single commissions, once per batch"""
+    enqueue_notifications([
+        (payout.user_id, 'transaction', 'Commission Earned', f'You earned ₦{payout.amount} in commission.',
+         payout if payout.pk else None)
+        for payout in payouts
+    ])
+    for user_id in {payout.user_id for payout in payouts}:
+        transaction.on_commit(lambda user_id=user_id: publish_to_user(user_id, 'balance'))
+
+
+def next_settlement_at(lag_seconds=None):
+    """When the oldest eligible transaction past the watermark becomes settleable, or None.
+
+    A run only settles transactions older than the lag, so ones completed
+    just before it ran are left for a later run.
+    """
+    if lag_seconds is None:
+        lag_seconds = settlement_lag()
+    state = CommissionSettlementState.objects.filter(pk=CommissionSettlementState.singleton_instance_id).first()
+    waiting = Transaction.objects.filter(status='completed', transaction_type__in=ELIGIBLE_TYPES)
+    if state is not None and state.last_updated_at is not None:
+        waiting = waiting.filter(
+            Q(updated_at__gt=state.last_updated_at)
+            | Q(updated_at=state.last_updated_at, pk__gt=state.last_transaction_id)
+        )
+    oldest = waiting.order_by('updated_at').values_list('updated_at', flat=True).first()
+    return oldest + timedelta(seconds=lag_seconds) if oldest is not None else None
+
+
+def settle_commissions(batch_size=SETTLEMENT_BATCH_SIZE, lag_seconds=None):
+    """Pay affiliate commissions on transactions completed since the watermark.
+
+    Completed sale and add-money transactions of referred users are read
+    in (updated_at, id) order after the stored watermark. Each batch
+    records its AffiliateSale rows, and with auto-approval the commission
+    Transactions too, with one ``bulk_create`` each, and refreshes the
+    referrers' ReferrerStats. The watermark moves
+    forward in the same database transaction. A source that already has a
+    commission is skipped, so re-saved or re-scanned transactions are never
+    paid twice. The watermark row is locked, so concurrent runs queue up
+    behind each other. Returns the number of commissions created.
+    """
+    if lag_seconds is None:
+        lag_seconds = settlement_lag()
+    affiliate_settings = AffiliateSettings.get_solo()
+    horizon = timezone.now() - timedelta(seconds=lag_seconds)
+
+    created = 0
+    while True:
+        with transaction.atomic():
+            state, _ = CommissionSettlementState.objects.select_for_update().get_or_create(
+                pk=CommissionSettlementState.singleton_instance_id
+            )
+            batch, sales, payouts = _settle_batch(state, affiliate_settings, horizon, batch_size)
+            if payouts:
+                _announce(payouts)
+        created += len(sales)
+        if len(batch) < batch_size:
+            break
+    if created:
+        logger.info(f"Affiliate commissions settled: {created}")
+    return created
@@ -1,66 +1,50 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
-from decimal import Decimal
 from payments.models import Transaction
 from .models import Referral, AffiliateSale, AffiliateSettings
+from .stats import refresh_referrer_stats
+from .tree import sync_referral, unlink_referral
+from .settlement import ELIGIBLE_TYPES, settlement_lag
+from .tasks import settle_affiliate_commissions
 import logging
 
 logger = logging.getLogger(__name__)
 
 @receiver(post_save, sender=Transaction)
-def handle_affiliate_commission(sender, instance, created, **kwargs):
-    """Handle affiliate commissions when transactions are completed"""
-    
-    if not created and instance.status == 'completed':
-        try:
-            settings = AffiliateSettings.get_solo()
-            
-            # Check if user was referred
-            try:
-                referral = Referral.objects.get(referred_user=instance.user, is_active=True)
-            except Referral.DoesNotExist:
-                return  # User was not referred
-            
-            commission_rate = Decimal('0.00')
-            
-            # Determine commission rate based on transaction type
-            if instance.transaction_type == 'sale':
-                # This could be from job, course, product, or mentorship
-                # For now, use a default rate - you can enhance this later
-                commission_rate = settings.referral_commission_rate
-            elif instance.transaction_type == 'add_money':
-                # Small commission on money added
-                commission_rate = Decimal('0.50')  # 0.5%
-            else:
-                return  # No commission for other transaction types
-            
-            if commission_rate > 0:
-                commission_amount = (instance.amount * commission_rate) / Decimal('100')
-                
-                # Create affiliate sale record
-                affiliate_sale = AffiliateSale.objects.create(
-                    referral=referral,
-                    sale=instance,
-                    commission_amount=commission_amount,
-                    commission_rate=commission_rate,
-                    status='approved' if settings.auto_approve_commissions else 'pending'
-                )
-                
-                # If auto-approved, create commission transaction
-                if settings.auto_approve_commissions:
-                    Transaction.objects.create(
-                        user=referral.referrer,
-                        transaction_type='commission',
-                        amount=commission_amount,
-                        status='completed',
-                        description=f'Affiliate commission from {referral.referred_user.username}'
-                    )
-                    affiliate_sale.mark_as_paid()
-                
-                logger.info(f"Affiliate commission created: {commission_amount} for {referral.referrer.username}")
-                
-        except Exception as e:
-            logger.error(f"Error processing affiliate commission: {str(e)}")
+def schedule_commission_settlement(sender, instance, **kwargs):
+    """Ask the settlement engine to run once a commissionable transaction completes.
+
+    Commissions are computed in bulk by ``settle_commissions``; waiting calls
+    collapse into one task, so a burst of completions costs one run.
+    """
+    if instance.status == 'completed' and instance.transaction_type in ELIGIBLE_TYPES:
+        settle_affiliate_commissions.schedule(settlement_lag())
+
+@receiver(post_save, sender=AffiliateSale)
+@receiver(post_delete, sender=AffiliateSale)
+def update_stats_on_commission_change(sender, instance, **kwargs):
+    """Keep the referrer's ReferrerStats in step when a commission is recorded, approved, paid or removed"""
+    referrer_id = Referral.objects.filter(pk=instance.referral_id).values_list('referrer_id', flat=True).first()
+    if referrer_id is not None:
+        # After commit, so a cascading delete of the referrer has finished first
+        transaction.on_commit(lambda: refresh_referrer_stats([referrer_id]))
+
+@receiver(post_save, sender=Referral)
+def add_referral_to_tree(sender, instance, created, **kwargs):
+    """Keep the ReferralPath closure table in the same transaction as the referral"""
+    sync_referral(instance, created)
+
+@receiver(post_delete, sender=Referral)
+def remove_referral_from_tree(sender, instance, **kwargs):
+    unlink_referral(instance.referred_user_id)
+
+@receiver(post_save, sender=Referral)
+@receiver(post_delete, sender=Referral)
+def update_stats_on_referral_change(sender, instance, created=None, **kwargs):
+    """Recount the referrer's referrals when one joins (created) or is removed (post_delete sends no ``created``)"""
+    if created is not False:
+        transaction.on_commit(lambda: refresh_referrer_stats([instance.referrer_id]))
 
 @receiver(post_save, sender=Referral)
 def handle_referral_signup_reward(sender, instance, created, **kwargs):
@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Q, Sum
+
+from .models import AffiliateSale, ReferrerStats
+
+EARNED_STATUSES = ('approved', 'paid')
+
+
+def earned_filter():
+    """Condition for commissions that count as earned"""
+    return Q(status__in=EARNED_STATUSES)
+
+
+def refresh_referrer_stats(referrer_ids):
+    """Recompute the ReferrerStats rows of ``referrer_ids`` from their commissions and referrals.
+
+    Totals are read with two grouped queries and written back with a
+    single upsert, so the cost does not grow with the size of a downline.
+    Recomputing (rather than adding deltas) keeps the rows correct however
+    often an event is replayed.
+    """
+    if not referrer_ids:
+        return
+    # Users deleted in the meantime are left out (their rows went with them)
+    counts = dict(
+        get_user_model().objects.filter(pk__in=set(referrer_ids))
+        .annotate(count=Count('referrals_made')).order_by().values_list('pk', 'count')
+    )
+    totals = {
+        row['referral__referrer_id']: row
+        for row in AffiliateSale.objects.filter(referral__referrer_id__in=list(counts))
+        .values('referral__referrer_id')
+        .annotate(
+            total_earned=Sum('commission_amount', filter=earned_filter()),
+            pending=Sum('commission_amount', filter=Q(status='pending')),
+            paid=Sum('commission_amount', filter=Q(status='paid')),
+        )
+        .order_by()
+    }
+    rows = []
+    for referrer_id, referral_count in counts.items():
+        row = totals.get(referrer_id, {})
+        rows.append(ReferrerStats(
+            referrer_id=referrer_id,
+            total_earned=row.get('total_earned') or Decimal('0.00'),
+            pending=row.get('pending') or Decimal('0.00'),
+            paid=row.get('paid') or Decimal('0.00'),
+            referral_count=referral_count,
+        ))
+    ReferrerStats.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['referrer'],
+        update_fields=['total_earned', 'pending', 'paid', 'referral_count', 'updated_at'],
+    )
+
+
+def get_referrer_stats(user):
+    """The user's stats row, or an unsaved empty one if they have never referred anyone"""
+    return ReferrerStats.objects.filter(referrer=user).first() or ReferrerStats(referrer=user)
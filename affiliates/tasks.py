@@ -0,0 +1,20 @@
+from django.conf import settings
+
+from site_core.taskqueue import task
+
+from .settlement import next_settlement_at, settle_commissions
+
+
+@task(unique=True, max_attempts=5, retry_seconds=60)
+def settle_affiliate_commissions():
+    """Settle commissions on transactions completed since the last run.
+
+    Completions that were still inside the settlement lag are picked up by
+    a follow-up run scheduled for when they age past it. Eager mode cannot
+    wait, so it settles only what is due.
+    """
+    created = settle_commissions()
+    due = next_settlement_at()
+    if due is not None and not getattr(settings, 'TASK_QUEUE_EAGER', False):
+        settle_affiliate_commissions.schedule(due)
+    return created
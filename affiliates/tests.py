@@ -1,3 +1,171 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from payments.models import Transaction
+from site_core.models import Task
+from .models import AffiliateSale, AffiliateSettings, CommissionSettlementState, Referral, ReferralPath, ReferrerStats
+from .settlement import settle_commissions, settlement_lag
+from .tasks import settle_affiliate_commissions
+from .tree import downline, downline_count, downline_levels, rebuild_referral_tree, tiered_commissions
+
+User = get_user_model()
+
+
+class CommissionSettlementTests(TestCase):
+    def setUp(self):
+        self.referrer = User.objects.create_user(username='referrer', password='testpass123')
+        self.buyer = User.objects.create_user(username='referred', password='testpass123')
+        self.referral = Referral.objects.create(referrer=self.referrer, referred_user=self.buyer)
+        affiliate_settings = AffiliateSettings.get_solo()
+        affiliate_settings.auto_approve_commissions = True
+        affiliate_settings.save()
+    
+    def make_transaction(self, reference, transaction_type='sale', amount='1000.00'):
+        return Transaction.objects.create(
+            user=self.buyer, transaction_type=transaction_type, amount=Decimal(amount),
+            status='completed', reference=reference, description='Test',
+        )
+    
+    def test_each_source_is_commissioned_once(self):
+        sale = self.make_transaction('SALE-1')
+        self.make_transaction('DEP-1', transaction_type='add_money', amount='2000.00')
+        self.assertTrue(Task.objects.filter(name='affiliates.tasks.settle_affiliate_commissions').exists())
+        
+        # A fixed number of queries however many sources the batch holds
+        with self.assertNumQueries(16):
+            self.assertEqual(settle_commissions(lag_seconds=0), 2)
+        payout = Transaction.objects.get(reference=f'AFF-{sale.pk}')
+        self.assertEqual((payout.user, payout.amount, payout.status), (self.referrer, Decimal('50.00'), 'completed'))
+        self.assertEqual(AffiliateSale.objects.get(sale=sale).status, 'paid')
+        
+        # Re-saving a completed transaction used to pay its commission again
+        sale.description = 'Edited'
+        sale.save()
+        self.assertEqual(settle_commissions(lag_seconds=0), 0)
+        self.assertEqual(AffiliateSale.objects.filter(sale=sale).count(), 1)
+        self.assertEqual(Transaction.objects.filter(user=self.referrer, transaction_type='commission').count(), 2)
+    
+    def test_deleted_commission_is_not_paid_again(self):
+        sale = self.make_transaction('SALE-5')
+        settle_commissions(lag_seconds=0)
+        AffiliateSale.objects.get(sale=sale).delete()
+        
+        sale.description = 'Edited'
+        sale.save()
+        self.assertEqual(settle_commissions(lag_seconds=0), 0)
+        self.assertEqual(Transaction.objects.filter(reference=f'AFF-{sale.pk}').count(), 1)
+        # The watermark moved past it rather than stalling on the duplicate reference
+        self.assertEqual(CommissionSettlementState.get_solo().last_transaction_id, sale.pk)
+    
+    def test_run_reschedules_for_completions_inside_the_lag(self):
+        sale = self.make_transaction('SALE-6')
+        # The queued run has been claimed by a worker and is now running
+        Task.objects.filter(name='affiliates.tasks.settle_affiliate_commissions').update(status='running')
+        self.assertEqual(settle_affiliate_commissions(), 0)
+        follow_up = Task.objects.get(name='affiliates.tasks.settle_affiliate_commissions', status='queued')
+        self.assertEqual(follow_up.run_at, sale.updated_at + timedelta(seconds=settlement_lag()))
+    
+    def test_unreferred_users_earn_nothing(self):
+        self.referral.is_active = False
+        self.referral.save()
+        self.make_transaction('SALE-2')
+        self.assertEqual(settle_commissions(lag_seconds=0), 0)
+        self.assertFalse(AffiliateSale.objects.exists())
+
+    
+    def test_referrer_stats_follow_commissions(self):
+        self.make_transaction('SALE-3')
+        settle_commissions(lag_seconds=0)
+        stats = ReferrerStats.objects.get(referrer=self.referrer)
+        self.assertEqual((stats.total_earned, stats.paid, stats.pending, stats.referral_count),
+                         (Decimal('50.00'), Decimal('50.00'), Decimal('0.00'), 1))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            AffiliateSale.objects.update(status='pending', paid_at=None)
+            AffiliateSale.objects.get().save()
+        stats.refresh_from_db()
+        self.assertEqual((stats.total_earned, stats.pending), (Decimal('0.00'), Decimal('50.00')))
+    
+    def test_referral_list_sums_earnings_per_page(self):
+        for index in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                Referral.objects.create(
+                    referrer=self.referrer,
+                    referred_user=User.objects.create_user(username=f'downline{index}', password='testpass123'),
+                )
+        self.make_transaction('SALE-4')
+        settle_commissions(lag_seconds=0)
+        self.assertEqual(ReferrerStats.objects.get(referrer=self.referrer).referral_count, 4)
+        
+        self.client.force_login(self.referrer)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('referral_list'))
+        # One grouped query for the whole page, not one per referral
+        self.assertEqual(sum('affiliates_affiliatesale' in query['sql'] for query in queries), 1)
+        earned = {referral.referred_user.username: referral.total_earned for referral in response.context['referrals']}
+        self.assertEqual(earned['referred'], Decimal('50.00'))
+        self.assertEqual(earned['downline0'], 0)
+
+
 
-# Create your tests here.
+class ReferralTreeTests(TestCase):
+    def setUp(self):
+        # root -> a -> b -> c, and root -> d
+        self.users = {
+            name: User.objects.create_user(username=name, password='testpass123')
+            for name in ('root', 'a', 'b', 'c', 'd')
+        }
+        for referrer, referred in (('root', 'a'), ('a', 'b'), ('b', 'c'), ('root', 'd')):
+            Referral.objects.create(referrer=self.users[referrer], referred_user=self.users[referred])
+    
+    def paths(self):
+        return set(ReferralPath.objects.values_list('ancestor__username', 'descendant__username', 'depth'))
+    
+    def test_downline_queries(self):
+        root = self.users['root']
+        with self.assertNumQueries(1):
+            self.assertEqual(downline_count(root), 4)
+        with self.assertNumQueries(1):
+            self.assertEqual(downline_levels(root), {1: 2, 2: 1, 3: 1})
+        with self.assertNumQueries(1):
+            names = [path.descendant.username for path in downline(root, max_depth=2)]
+        self.assertEqual(names, ['a', 'd', 'b'])
+        self.assertEqual(downline_count(self.users['a'], max_depth=1), 1)
+        
+        self.client.force_login(root)
+        response = self.client.get(reverse('affiliate_dashboard'))
+        self.assertEqual(response.context['network_levels'], {1: 2, 2: 1, 3: 1})
+        self.assertContains(response, '4 members')
+    
+    def test_moving_and_removing_a_referral(self):
+        built = self.paths()
+        self.assertEqual(rebuild_referral_tree(), len(built))
+        self.assertEqual(self.paths(), built)
+        
+        # b (with c under them) moves under d
+        referral = Referral.objects.get(referred_user=self.users['b'])
+        referral.referrer = self.users['d']
+        referral.save()
+        self.assertIn(('root', 'c', 3), self.paths())
+        self.assertFalse(ReferralPath.objects.filter(ancestor=self.users['a']).exists())
+        
+        Referral.objects.get(referred_user=self.users['d']).delete()
+        self.assertEqual(self.paths(), {('root', 'a', 1), ('d', 'b', 1), ('d', 'c', 2), ('b', 'c', 1)})
+        
+        with self.assertRaises(ValidationError):
+            Referral(referrer=self.users['c'], referred_user=self.users['d']).clean()
+    
+    def test_tiered_commissions(self):
+        with self.assertNumQueries(1):
+            shares = tiered_commissions({self.users['c'].pk: Decimal('1000.00')}, [Decimal('5'), Decimal('2')])
+        self.assertEqual(shares, {
+            (self.users['b'].pk, self.users['c'].pk): (1, Decimal('50.00')),
+            (self.users['a'].pk, self.users['c'].pk): (2, Decimal('20.00')),
+        })
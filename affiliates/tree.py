@@ -0,0 +1,115 @@
+from decimal import Decimal
+
+from django.db.models import Count
+
+from .models import Referral, ReferralPath
+
+PATH_BATCH_SIZE = 1000
+
+
+def link_referral(referrer_id, user_id):
+    """Record ``user_id`` (and everyone already under them) in the downline of ``referrer_id`` and its upline.
+
+    Every ancestor of the referrer gains a path to every member of the
+    user's subtree, all written with one ``bulk_create``.
+    """
+    subtree = [(user_id, 0)] + list(
+        ReferralPath.objects.filter(ancestor_id=user_id).values_list('descendant_id', 'depth')
+    )
+    if referrer_id in {descendant for descendant, _ in subtree}:
+        raise ValueError(f'Referring user {user_id} to {referrer_id} would create a cycle')
+    upline = [(referrer_id, 0)] + list(
+        ReferralPath.objects.filter(descendant_id=referrer_id).values_list('ancestor_id', 'depth')
+    )
+    ReferralPath.objects.bulk_create(
+        [
+            ReferralPath(ancestor_id=ancestor, descendant_id=descendant, depth=up + 1 + down)
+            for ancestor, up in upline
+            for descendant, down in subtree
+        ],
+        batch_size=PATH_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def unlink_referral(user_id):
+    """Detach ``user_id`` and their subtree from everyone above them; the subtree itself is kept"""
+    upline = list(ReferralPath.objects.filter(descendant_id=user_id).values_list('ancestor_id', flat=True))
+    if not upline:
+        return
+    subtree = [user_id] + list(
+        ReferralPath.objects.filter(ancestor_id=user_id).values_list('descendant_id', flat=True)
+    )
+    ReferralPath.objects.filter(ancestor_id__in=upline, descendant_id__in=subtree).delete()
+
+
+def sync_referral(referral, created):
+    """Bring the closure table in line with a saved Referral"""
+    if not created:
+        if ReferralPath.objects.filter(
+            ancestor_id=referral.referrer_id, descendant_id=referral.referred_user_id, depth=1
+        ).exists():
+            return
+        # The referrer was changed: move the subtree under the new one
+        unlink_referral(referral.referred_user_id)
+    link_referral(referral.referrer_id, referral.referred_user_id)
+
+
+def rebuild_referral_tree():
+    """Recompute every path from the Referral rows, e.g. after a bulk import"""
+    parents = dict(Referral.objects.values_list('referred_user_id', 'referrer_id'))
+    ReferralPath.objects.all().delete()
+    paths = []
+    for user_id in parents:
+        ancestor, depth, seen = parents[user_id], 1, {user_id}
+        while ancestor is not None and ancestor not in seen:
+            paths.append(ReferralPath(ancestor_id=ancestor, descendant_id=user_id, depth=depth))
+            seen.add(ancestor)
+            ancestor, depth = parents.get(ancestor), depth + 1
+    ReferralPath.objects.bulk_create(paths, batch_size=PATH_BATCH_SIZE)
+    return len(paths)
+
+
+def _downline_paths(user, max_depth):
+    paths = ReferralPath.objects.filter(ancestor=user)
+    if max_depth is not None:
+        paths = paths.filter(depth__lte=max_depth)
+    return paths
+
+
+def downline(user, max_depth=None):
+    """Paths to everyone under ``user`` (nearest first), with the descendant loaded"""
+    return _downline_paths(user, max_depth).select_related('descendant').order_by('depth', 'descendant_id')
+
+
+def downline_count(user, max_depth=None):
+    return _downline_paths(user, max_depth).count()
+
+
+def downline_levels(user, max_depth=None):
+    """``{depth: members}`` for the levels under ``user``, in one grouped query"""
+    return dict(
+        _downline_paths(user, max_depth).values('depth').annotate(members=Count('id'))
+        .order_by('depth').values_list('depth', 'members')
+    )
+
+
+def tiered_commissions(amounts, tier_rates):
+    """Split commissions on ``amounts`` ({user id: amount}) up the referral tree.
+
+    ``tier_rates`` are percentages by level: the first goes to the direct
+    referrer, the second to their referrer, and so on. Every level for
+    every user is read with one query. Returns ``{(ancestor id, user id):
+    (depth, commission)}``.
+    """
+    if not amounts or not tier_rates:
+        return {}
+    paths = ReferralPath.objects.filter(
+        descendant_id__in=list(amounts), depth__lte=len(tier_rates)
+    ).values_list('ancestor_id', 'descendant_id', 'depth')
+    shares = {}
+    for ancestor, descendant, depth in paths:
+        rate = Decimal(tier_rates[depth - 1])
+        if rate > 0:
+            shares[(ancestor, descendant)] = (depth, amounts[descendant] * rate / Decimal('100'))
+    return shares
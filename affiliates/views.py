@@ -1,30 +1,31 @@
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
-from django.db.models import Sum, Count
+from django.db.models import Sum
 from django.shortcuts import render
 from .models import Referral, AffiliateSale
+from .stats import earned_filter, get_referrer_stats
+from .tree import downline_levels
 from site_core.models import SiteSetting
 
+# Levels of the referral tree shown on the dashboard
+NETWORK_LEVELS = 3
+
 @login_required
 def affiliate_dashboard(request):
     user = request.user
-    referrals = Referral.objects.filter(referrer=user).select_related('referred_user')
-    affiliate_sales = AffiliateSale.objects.filter(referral__referrer=user)
-    
-    total_commission = affiliate_sales.filter(status__in=['approved', 'paid']).aggregate(
-        total=Sum('commission_amount')
-    )['total'] or 0
-    
-    pending_commission = affiliate_sales.filter(status='pending').aggregate(
-        total=Sum('commission_amount')
-    )['total'] or 0
+    referrals = Referral.objects.filter(referrer=user).select_related('referred_user').order_by('-joined_at')
+    stats = get_referrer_stats(user)
+    network = downline_levels(user, max_depth=NETWORK_LEVELS)
     
     site_settings = SiteSetting.get_solo()
     
     context = {
-        'referrals': referrals,
-        'total_commission': total_commission,
-        'pending_commission': pending_commission,
+        'referrals': referrals[:5],
+        'referral_count': stats.referral_count,
+        'total_commission': stats.total_earned,
+        'pending_commission': stats.pending,
+        'network_levels': network,
+        'network_size': sum(network.values()),
         'referral_link': f"{request.scheme}://{request.get_host()}/ref/{user.referral_code}",
         'default_commission_rate': site_settings.default_commission_pct,
     }
@@ -34,21 +35,24 @@ def affiliate_dashboard(request):
 @login_required
 def referral_list(request):
     user = request.user
-    referrals = Referral.objects.filter(referrer=user).select_related('referred_user')
-    
-    for referral in referrals:
-        referral.total_earned = AffiliateSale.objects.filter(
-            referral=referral, 
-            status__in=['approved', 'paid']
-        ).aggregate(total=Sum('commission_amount'))['total'] or 0
+    referrals = Referral.objects.filter(referrer=user).select_related('referred_user').order_by('-joined_at', '-pk')
     
     paginator = Paginator(referrals, 20)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
+    # Earnings for the referrals on this page only, summed in one grouped query
+    earned = dict(
+        AffiliateSale.objects.filter(earned_filter(), referral__in=[referral.pk for referral in page_obj])
+        .values('referral_id').annotate(total=Sum('commission_amount'))
+        .order_by().values_list('referral_id', 'total')
+    )
+    for referral in page_obj:
+        referral.total_earned = earned.get(referral.pk, 0)
+    
     context = {
         'page_obj': page_obj,
         'referrals': page_obj,
     }
     
-    return render(request, 'affiliates/referrals.html', context)
\ No newline at end of file
+    return render(request, 'affiliates/referrals.html', context)
@@ -0,0 +1,55 @@
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from api.renderers import FastJSONRenderer
+from api.serializers import (
+    JobSerializer, CourseSerializer, ProductSerializer, TransactionSerializer
+)
+from jobs.models import Job
+from courses.models import Course
+from products.models import Product
+from payments.models import Transaction
+
+SERIALIZERS = {
+    'jobs': (Job.objects.select_related('posted_by__profile', 'category'), JobSerializer),
+    'courses': (Course.objects.select_related('instructor__profile', 'category'), CourseSerializer),
+    'products': (Product.objects.select_related('seller__profile', 'category').prefetch_related('tag_index'), ProductSerializer),
+    'transactions': (Transaction.objects.select_related('user__profile'), TransactionSerializer),
+}
+
+class Command(BaseCommand):
+    help = 'Compare stdlib and orjson rendering time on a page of API rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=sorted(SERIALIZERS))
+        parser.add_argument('--rows', type=int, default=1000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        queryset, serializer_class = SERIALIZERS[options['resource']]
+        rows = list(queryset.order_by('-created_at', '-id')[:options['rows']])
+        if not rows:
+            raise CommandError(f"No {options['resource']} to benchmark")
+
+        # Repeat existing rows so every run measures a full page
+        rows = (rows * (options['rows'] // len(rows) + 1))[:options['rows']]
+        data = {
+            'count': len(rows),
+            'next': None,
+            'previous': None,
+            'results': serializer_class(rows, many=True).data,
+        }
+
+        stdlib, fast = JSONRenderer(), FastJSONRenderer()
+        if stdlib.render(data) != fast.render(data):
+            raise CommandError('Renderers produced different output')
+
+        self.stdout.write(f"{len(rows)} {options['resource']}, {len(stdlib.render(data))} bytes")
+        timings = {}
+        for name, renderer in (('json', stdlib), ('orjson', fast)):
+            best = min(timeit.repeat(lambda: renderer.render(data), number=1, repeat=options['repeat']))
+            timings[name] = best
+            self.stdout.write(f'{name:>8}: {best * 1000:.2f} ms')
+
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {timings['json'] / timings['orjson']:.1f}x"))
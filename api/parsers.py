@@ -0,0 +1,25 @@
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.utils import json
+
+from site_core import fastjson
+from .renderers import FastJSONRenderer
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser backed by orjson for UTF-8 request bodies"""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        # orjson only reads UTF-8 and never accepts NaN/Infinity
+        if not self.strict or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return fastjson.loads(stream.read(), parse_constant=json.strict_constant)
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
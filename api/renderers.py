@@ -0,0 +1,73 @@
+from rest_framework.renderers import JSONRenderer
+
+from site_core.fastjson import orjson
+
+# Digits and the decimal point all become b'0' so number tokens can be found
+# with plain bytes.find() instead of a regex scan over the whole payload
+NUMBER_CHARS = bytes.maketrans(b'0123456789.', b'00000000000')
+
+
+def _number_start(digits, pos):
+    """Index where the number token containing ``pos`` starts, or None if it is inside a string"""
+    while pos > 0 and digits[pos - 1] in b'0-':
+        pos -= 1
+    if pos == 0 or digits[pos - 1] in b':,[':
+        return pos
+    return None
+
+
+def has_unsafe_float(ret):
+    """Whether orjson wrote a float that float.__repr__ formats differently.
+
+    Those are exponents ("1e16" vs "1e+16") and small fractions
+    ("0.00001" vs "1e-05").
+    """
+    digits = ret.translate(NUMBER_CHARS)
+
+    pos = digits.find(b'0e')
+    while pos != -1:
+        if digits[pos + 2:pos + 3] in (b'0', b'-') and _number_start(digits, pos) is not None:
+            return True
+        pos = digits.find(b'0e', pos + 1)
+
+    pos = ret.find(b'0.0000')
+    while pos != -1:
+        start = _number_start(digits, pos)
+        if start is not None and ret[start:pos] in (b'', b'-'):
+            return True
+        pos = ret.find(b'0.0000', pos + 1)
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes with orjson, producing identical bytes.
+
+    Dates, datetimes and Decimals are handed to DRF's encoder so they are
+    formatted exactly as before. Anything orjson can't match byte for
+    byte (indented output, ASCII-only output, non-string keys, huge
+    integers, exponent floats) falls back to the stdlib renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        renderer_context = renderer_context or {}
+        if (orjson is None or self.ensure_ascii or not self.compact or
+                self.get_indent(accepted_media_type, renderer_context) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if has_unsafe_float(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Same \u2028/\u2029 escaping as JSONRenderer, for a strict javascript subset
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
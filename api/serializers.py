@@ -1,4 +1,6 @@
-from rest_framework import serializers
+from django.core.exceptions import FieldDoesNotExist
+from django.urls import reverse
+from rest_framework import permissions, serializers
 from accounts.models import User, UserProfile
 from jobs.models import Job, JobCategory
 from courses.models import Course, CourseCategory, Enrollment
@@ -6,25 +8,178 @@ from products.models import Product, ProductCategory, ProductSale
 from affiliates.models import Referral, AffiliateSale
 from payments.models import Transaction
 from blog.models import BlogPost, Category, BlogComment
+from site_core.images import VARIANT_FORMATS, build_srcset
 
-class UserProfileSerializer(serializers.ModelSerializer):
+
+def parse_field_list(value):
+    """Split a comma-separated ?fields=/?expand= value into a set of paths"""
+    if value is None:
+        return None
+    return {item.strip() for item in value.split(',') if item.strip()}
+
+
+def split_paths(paths, name):
+    """Return the sub-paths below ``name`` for dotted paths such as user.profile.bio"""
+    prefix = f'{name}.'
+    return {path[len(prefix):] for path in paths if path.startswith(prefix)}
+
+
+def flatten_select_related(tree, prefix=''):
+    """Turn Query.select_related's nested dict into lookup paths"""
+    if not isinstance(tree, dict):
+        return []
+    paths = []
+    for name, subtree in tree.items():
+        path = f'{prefix}{name}'
+        paths.extend(flatten_select_related(subtree, f'{path}__') or [path])
+    return paths
+
+
+class SparseFieldsetMixin:
+    """Trim and expand serializer output from ?fields= and ?expand=.
+    
+    ``?fields=id,title,posted_by.username`` keeps only the listed fields; a
+    dotted path reaches into (and implies expanding) a relation.
+    ``?expand=posted_by,posted_by.profile`` nests related objects. Once either
+    parameter is given, relations that are not expanded render as their
+    primary key. Without them the serializer keeps its full default shape.
+    """
+    
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        
+        if fields is None and expand is None:
+            request = self.context.get('request')
+            if request is not None and request.method in permissions.SAFE_METHODS:
+                fields = parse_field_list(request.query_params.get('fields'))
+                expand = parse_field_list(request.query_params.get('expand'))
+        
+        if fields is not None or expand is not None:
+            self.apply_sparse_fieldset(fields, expand or set())
+    
+    def apply_sparse_fieldset(self, fields, expand):
+        if fields is not None:
+            wanted = {path.split('.', 1)[0] for path in fields}
+            for name in list(self.fields):
+                if name not in wanted:
+                    self.fields.pop(name)
+        
+        for name, field in list(self.fields.items()):
+            many = isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField))
+            child = field.child if isinstance(field, serializers.ListSerializer) else field
+            if not (many or isinstance(field, (serializers.BaseSerializer, serializers.RelatedField))):
+                continue
+            
+            sub_fields = split_paths(fields, name) if fields is not None else set()
+            source = {} if field.source == name else {'source': field.source}
+            if name not in expand and not sub_fields:
+                self.fields[name] = serializers.PrimaryKeyRelatedField(many=many, read_only=True, **source)
+            elif isinstance(child, SparseFieldsetMixin):
+                self.fields[name] = child.__class__(
+                    many=many,
+                    read_only=True,
+                    fields=sub_fields or None,
+                    expand=split_paths(expand, name),
+                    **source
+                )
+    
+    def optimize_queryset(self, queryset, extra_fields=()):
+        """Add select_related/prefetch_related/only() for exactly the fields rendered"""
+        select, prefetch, only = set(), set(), set(extra_fields)
+        complete = self._collect_query_plan(queryset.model, '', select, prefetch, only)
+        
+        if complete:
+            # Keep joins the view asked for only where their relation is rendered,
+            # since only() cannot defer a field that select_related traverses
+            for path in flatten_select_related(queryset.query.select_related):
+                parts = path.split('__')
+                if parts[0] not in only:
+                    continue
+                select.add(path)
+                for depth in range(1, len(parts)):
+                    parent = '__'.join(parts[:depth])
+                    if any(name.startswith(f'{parent}__') for name in only):
+                        only.add('__'.join(parts[:depth + 1]))
+            queryset = queryset.select_related(None)
+        
+        if select:
+            queryset = queryset.select_related(*sorted(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*sorted(prefetch))
+        if complete:
+            queryset = queryset.only(*sorted(only))
+        return queryset
+    
+    def _collect_query_plan(self, model, prefix, select, prefetch, only):
+        """Walk the rendered fields; returns False when only() would be unsafe"""
+        complete = True
+        only.add(f'{prefix}{model._meta.pk.name}')
+        
+        for field in self.fields.values():
+            source = field.source
+            if source == '*' or '.' in source:
+                complete = False
+                continue
+            try:
+                model_field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                # Properties and methods may read any column
+                complete = False
+                continue
+            
+            path = f'{prefix}{source}'
+            if model_field.many_to_many or model_field.one_to_many:
+                prefetch.add(path)
+            elif model_field.is_relation:
+                only.add(path)
+                if isinstance(field, SparseFieldsetMixin):
+                    select.add(path)
+                    complete &= field._collect_query_plan(
+                        model_field.related_model, f'{path}__', select, prefetch, only
+                    )
+                elif not (isinstance(field, serializers.PrimaryKeyRelatedField) and model_field.concrete):
+                    # String representations and reverse one-to-ones need the related row
+                    select.add(path)
+            else:
+                only.add(path)
+        return complete
+
+
+class ImageSrcsetField(serializers.Field):
+    """Read-only ``srcset`` strings per variant format for an ImageField, e.g. ``source='thumbnail'``"""
+    
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+    
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        build_url = request.build_absolute_uri if request is not None else None
+        return {fmt: build_srcset(value, fmt, build_url) for fmt in VARIANT_FORMATS}
+
+
+class UserProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    profile_picture_srcset = ImageSrcsetField(source='profile_picture')
+    
     class Meta:
         model = UserProfile
-        fields = ['bio', 'profile_picture', 'country', 'phone_number', 'date_joined']
+        fields = ['bio', 'profile_picture', 'profile_picture_srcset', 'country', 'phone_number', 'date_joined']
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     profile = UserProfileSerializer(read_only=True)
     
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'first_name', 'last_name', 'subscription_level', 'profile']
 
-class JobCategorySerializer(serializers.ModelSerializer):
+class JobCategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = JobCategory
         fields = ['id', 'name', 'description']
 
-class JobSerializer(serializers.ModelSerializer):
+class JobSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     posted_by = UserSerializer(read_only=True)
     category = JobCategorySerializer(read_only=True)
     
@@ -38,44 +193,54 @@ class JobSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['posted_by', 'status', 'views_count', 'created_at']
 
-class CourseCategorySerializer(serializers.ModelSerializer):
+class CourseCategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = CourseCategory
         fields = ['id', 'name', 'description']
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     instructor = UserSerializer(read_only=True)
     category = CourseCategorySerializer(read_only=True)
+    thumbnail_srcset = ImageSrcsetField(source='thumbnail')
     
     class Meta:
         model = Course
         fields = [
             'id', 'title', 'description', 'category', 'level', 'instructor',
             'duration', 'mode', 'start_date', 'is_self_paced', 'price',
-            'spots_total', 'spots_left', 'preview_video', 'thumbnail', 'status',
-            'created_at'
+            'spots_total', 'spots_left', 'preview_video', 'thumbnail', 'thumbnail_srcset',
+            'status', 'created_at'
         ]
         read_only_fields = ['instructor', 'status', 'created_at']
 
-class ProductCategorySerializer(serializers.ModelSerializer):
+class ProductCategorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = ProductCategory
         fields = ['id', 'name', 'description']
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     seller = UserSerializer(read_only=True)
     category = ProductCategorySerializer(read_only=True)
+    thumbnail_srcset = ImageSrcsetField(source='thumbnail')
+    download_url = serializers.SerializerMethodField()
     
     class Meta:
         model = Product
         fields = [
             'id', 'title', 'description', 'category', 'seller', 'license_type',
-            'version', 'price', 'product_file', 'sample_file', 'thumbnail',
-            'status', 'views_count', 'download_count', 'created_at'
+            'version', 'price', 'product_file', 'download_url', 'sample_file', 'thumbnail',
+            'thumbnail_srcset', 'tags', 'status', 'views_count', 'download_count', 'created_at'
         ]
         read_only_fields = ['seller', 'status', 'views_count', 'download_count', 'created_at']
+        # Paid files are only handed out by product_download, which checks the purchase
+        extra_kwargs = {'product_file': {'write_only': True}}
+    
+    def get_download_url(self, obj):
+        url = reverse('product_download', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
     class Meta:
@@ -87,7 +252,7 @@ class TransactionSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['user', 'reference', 'created_at', 'completed_at']
 
-class AffiliateSaleSerializer(serializers.ModelSerializer):
+class AffiliateSaleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     referral = serializers.StringRelatedField()
     
     class Meta:
@@ -97,15 +262,16 @@ class AffiliateSaleSerializer(serializers.ModelSerializer):
             'created_at', 'paid_at'
         ]
 
-class BlogPostSerializer(serializers.ModelSerializer):
+class BlogPostSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     category = serializers.StringRelatedField()
+    featured_image_srcset = ImageSrcsetField(source='featured_image')
     
     class Meta:
         model = BlogPost
         fields = [
             'id', 'title', 'slug', 'content', 'excerpt', 'author', 'category',
-            'featured_image', 'status', 'is_featured', 'views_count', 'created_at',
+            'featured_image', 'featured_image_srcset', 'status', 'is_featured', 'views_count', 'created_at',
             'published_at'
         ]
         read_only_fields = ['author', 'slug', 'views_count', 'created_at', 'published_at']
\ No newline at end of file
@@ -1,3 +1,198 @@
+import datetime
+import io
+from decimal import Decimal
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from affiliates.models import AffiliateSale, Referral
+from blog.models import BlogPost, Category as BlogCategory
+from payments.models import Transaction
+from products.models import Product
+from site_core.models import Category
+from .parsers import FastJSONParser
+from .renderers import FastJSONRenderer
+
+User = get_user_model()
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='reader',
+            email='reader@example.com',
+            password='testpass123'
+        )
+        for i in range(3):
+            BlogPost.objects.create(title=f'Post {i}', content='Body', author=self.user, status='published')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def test_page_number_mode_is_default(self):
+        response = self.client.get('/api/blog-posts/', {'page_size': 2})
+        self.assertEqual(response.data['count'], 3)
+    
+    def test_cursor_mode_skips_count(self):
+        response = self.client.get('/api/blog-posts/', {'page_size': 2, 'pagination': 'cursor'})
+        self.assertNotIn('count', response.data)
+        self.assertEqual(len(response.data['results']), 2)
+        
+        response = self.client.get(response.data['next'])
+        self.assertEqual([post['title'] for post in response.data['results']], ['Post 0'])
+
+    
+    def test_affiliate_sales_pages_in_a_stable_order(self):
+        referred = User.objects.create_user(username='referred', password='testpass123')
+        referral = Referral.objects.create(referrer=self.user, referred_user=referred)
+        created_at = timezone.now()
+        for i in range(3):
+            sale = Transaction.objects.create(
+                user=referred, transaction_type='sale', amount=Decimal('100.00'), reference=f'AFF-SRC-{i}'
+            )
+            commission = AffiliateSale.objects.create(
+                referral=referral, sale=sale, commission_amount=Decimal('5.00'), commission_rate=Decimal('5.00')
+            )
+            AffiliateSale.objects.filter(pk=commission.pk).update(created_at=created_at)
+        
+        pages = [self.client.get('/api/affiliate-sales/', {'page_size': 2, 'page': page}).data['results'] for page in (1, 2)]
+        ids = [row['id'] for page in pages for row in page]
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertEqual(len(set(ids)), 3)
+
+class ProductSerializerTests(TestCase):
+    def test_file_is_only_offered_through_the_download_view(self):
+        seller = User.objects.create_user(username='seller', password='testpass123')
+        product = Product.objects.create(
+            title='Kit', description='Files', seller=seller, price=Decimal('1000'), status='approved',
+            category=Category.objects.create(name='Kits', category_type='product'),
+            product_file='cas/ab/cd/abcd.zip',
+        )
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username='browser', password='testpass123'))
+        data = client.get(f'/api/products/{product.pk}/').data
+        self.assertNotIn('product_file', data)
+        self.assertEqual(data['download_url'], f'http://testserver/products/{product.pk}/download/')
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='reader',
+            email='reader@example.com',
+            password='testpass123'
+        )
+        for i in range(3):
+            author = User.objects.create_user(username=f'author{i}', password='testpass123')
+            BlogPost.objects.create(title=f'Post {i}', content='Body', author=author, status='published')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def test_default_shape_loads_profiles_without_extra_queries(self):
+        # count, page, validators
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/blog-posts/')
+        self.assertIn('profile', response.data['results'][0]['author'])
+    
+    def test_fields_collapse_relations_to_ids(self):
+        response = self.client.get('/api/blog-posts/', {'fields': 'id,title,author'})
+        post = response.data['results'][0]
+        self.assertEqual(set(post), {'id', 'title', 'author'})
+        self.assertIsInstance(post['author'], int)
+    
+    def test_dotted_fields_expand_relations(self):
+        response = self.client.get('/api/blog-posts/', {'fields': 'title,author.username', 'expand': 'author.profile'})
+        author = response.data['results'][0]['author']
+        self.assertEqual(set(author), {'username'})
+        
+        response = self.client.get('/api/blog-posts/', {'fields': 'title,author', 'expand': 'author'})
+        author = response.data['results'][0]['author']
+        self.assertIsInstance(author['profile'], int)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='reader',
+            email='reader@example.com',
+            password='testpass123'
+        )
+        self.post = BlogPost.objects.create(title='Post', content='Body', author=self.user, status='published')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+    
+    def test_unchanged_list_is_not_modified(self):
+        response = self.client.get('/api/blog-posts/')
+        etag = response['ETag']
+        
+        # count, page and the page's validators; nothing is serialized
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/blog-posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        
+        self.post.title = 'Edited'
+        self.post.save()
+        response = self.client.get('/api/blog-posts/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_cursor_list_validators_do_not_count(self):
+        response = self.client.get('/api/blog-posts/?pagination=cursor')
+        etag = response['ETag']
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/blog-posts/?pagination=cursor', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 2)
+        self.assertFalse(any('COUNT(*)' in query['sql'] for query in queries.captured_queries))
+        
+        BlogPost.objects.create(title='Newer', content='Body', author=self.user, status='published')
+        response = self.client.get('/api/blog-posts/?pagination=cursor', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+    
+    def test_nested_profile_and_category_changes_are_not_cached(self):
+        category = BlogCategory.objects.create(name='News')
+        self.post.category = category
+        self.post.save()
+        urls = ['/api/blog-posts/', f'/api/blog-posts/{self.post.pk}/']
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        
+        profile = self.user.profile
+        profile.bio = 'Edited bio'
+        profile.save()
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+        
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        category.name = 'Renamed'
+        category.save()
+        for url, etag in zip(urls, etags):
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+    
+    def test_retrieve_sets_validators(self):
+        response = self.client.get(f'/api/blog-posts/{self.post.pk}/')
+        self.assertIn('Last-Modified', response)
+        response = self.client.get(f'/api/blog-posts/{self.post.pk}/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
 
-# Create your tests here.
+class FastJSONTests(TestCase):
+    def test_output_matches_stdlib_renderer(self):
+        payloads = [
+            {'amount': Decimal('1500.50'), 'at': timezone.now(), 'day': datetime.date(2024, 1, 31)},
+            {'text': 'caf\u00e9 \u2028 \u2029 \x00', 'nested': [1, 2.5, None, True]},
+            {'tiny': 0.00001, 'huge': 1e16, 'wide': 2 ** 70},
+            {1: 'non-string key'},
+        ]
+        for data in payloads:
+            self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+    
+    def test_parser_matches_stdlib(self):
+        parser = FastJSONParser()
+        self.assertEqual(parser.parse(io.BytesIO(b'{"n": 123456789012345678901, "f": 1.5}')),
+                         {'n': 123456789012345678901, 'f': 1.5})
+        with self.assertRaises(ParseError):
+            parser.parse(io.BytesIO(b'{"n": NaN}'))
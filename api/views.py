@@ -1,27 +1,142 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import PageNumberPagination, CursorPagination
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db.models import Count, Max, Sum
+from django.utils.cache import patch_vary_headers
 from rest_framework.filters import SearchFilter, OrderingFilter
 from accounts.models import User
 from jobs.models import Job
 from courses.models import Course
-from products.models import Product
+from products.models import Product, ProductTag
 from payments.models import Transaction
 from affiliates.models import AffiliateSale
 from blog.models import BlogPost
+from site_core.conditional import make_etag, not_modified_response, set_validators
 from .serializers import (
     UserSerializer, JobSerializer, CourseSerializer, ProductSerializer,
     TransactionSerializer, AffiliateSaleSerializer, BlogPostSerializer
 )
 
+class StandardCursorPagination(CursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
 class StandardResultsSetPagination(PageNumberPagination):
+    """Page numbers by default; keyset cursors with ?pagination=cursor.
+    
+    Cursor mode skips the COUNT(*) and the OFFSET scan, so clients walking
+    deep into large lists should use it. Follow-up links keep the mode.
+    """
     page_size = 20
     page_size_query_param = 'page_size'
     max_page_size = 100
+    mode_query_param = 'pagination'
+    cursor_paginator = None
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor_paginator = StandardCursorPagination()
+        if (request.query_params.get(self.mode_query_param) == 'cursor' or
+                cursor_paginator.cursor_query_param in request.query_params):
+            self.cursor_paginator = cursor_paginator
+            return cursor_paginator.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+    
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+    
+    def get_validator_parts(self):
+        """What the paginated response adds besides the rows (for ETags)"""
+        if self.cursor_paginator is not None:
+            return [self.cursor_paginator.get_next_link() or '', self.cursor_paginator.get_previous_link() or '']
+        return [self.page.paginator.count, self.page.number]
+
+class SparseFieldsetViewMixin:
+    """Load exactly the rows and columns the serializer will render.
+    
+    Works with SparseFieldsetMixin serializers: ?fields= and ?expand= shape
+    the output, and the queryset gets matching select_related,
+    prefetch_related and only() calls.
+    """
+    
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.request.method not in permissions.SAFE_METHODS:
+            return queryset
+        
+        # Pagination and ordering read these columns even when they aren't rendered
+        ordering = list(getattr(self, 'ordering', None) or []) + list(getattr(self, 'ordering_fields', None) or [])
+        extra_fields = {name.lstrip('-') for name in ordering}
+        return self.get_serializer().optimize_queryset(queryset, extra_fields=extra_fields)
+
+class ConditionalGetMixin:
+    """ETag/Last-Modified validators for list and retrieve.
+    
+    The validators come from the rows being served: lists are paginated
+    first and then stamped with one aggregate over the page's primary keys
+    (newest ``updated_at`` and any ``etag_aggregates``, which must cover
+    every related row the serializer nests), so revalidating
+    costs no more than the page itself and a client with an unchanged page
+    gets a 304 before anything is serialized. Each response is per user,
+    so the ETag includes the user.
+    """
+    last_modified_field = 'updated_at'
+    etag_aggregates = {}
+    
+    def get_validators(self, queryset, *extra):
+        stamp = queryset.order_by().aggregate(
+            last_modified=Max(self.last_modified_field),
+            rows=Count('pk'),
+            **self.etag_aggregates
+        )
+        last_modified = stamp.pop('last_modified')
+        etag = make_etag(
+            queryset.model._meta.label_lower,
+            self.request.get_full_path(),
+            self.request.user.pk,
+            last_modified.isoformat() if last_modified else '',
+            *(stamp[key] for key in sorted(stamp)),
+            *extra
+        )
+        return etag, last_modified
+    
+    def conditional_response(self, validators, render):
+        etag, last_modified = validators
+        response = not_modified_response(self.request, etag, last_modified)
+        if response is None:
+            response = set_validators(render(), etag, last_modified)
+        patch_vary_headers(response, ['Cookie', 'Authorization'])
+        return response
+    
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        rows = page if page is not None else list(queryset)
+        pks = [row.pk for row in rows]
+        # The page's keys in order, plus whatever else the links are built from
+        extra = [','.join(map(str, pks))]
+        if page is not None:
+            extra += self.paginator.get_validator_parts()
+        validators = self.get_validators(queryset.model._default_manager.filter(pk__in=pks), *extra)
+        return self.conditional_response(validators, lambda: self.render_list(rows, page is not None))
+    
+    def render_list(self, rows, paginated):
+        serializer = self.get_serializer(rows, many=True)
+        if paginated:
+            return self.get_paginated_response(serializer.data)
+        return Response(serializer.data)
+    
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.get_queryset().filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        return self.conditional_response(self.get_validators(queryset), lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs))
 
-class JobViewSet(viewsets.ModelViewSet):
+class JobViewSet(ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Job.objects.filter(status='approved').select_related('posted_by', 'category')
     serializer_class = JobSerializer
     pagination_class = StandardResultsSetPagination
@@ -29,12 +144,18 @@ class JobViewSet(viewsets.ModelViewSet):
     filterset_fields = ['category', 'job_type', 'level_requirement']
     search_fields = ['title', 'description', 'company_name']
     ordering_fields = ['created_at', 'price', 'salary_min']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
+    etag_aggregates = {
+        'users_updated': Max('posted_by__date_updated'),
+        'profiles_updated': Max('posted_by__profile__updated_at'),
+        'categories_updated': Max('category__updated_at'),
+        'views': Sum('views_count'),
+    }
     
     def perform_create(self, serializer):
         serializer.save(posted_by=self.request.user, status='pending')
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Course.objects.filter(status='approved').select_related('instructor', 'category')
     serializer_class = CourseSerializer
     pagination_class = StandardResultsSetPagination
@@ -42,12 +163,17 @@ class CourseViewSet(viewsets.ModelViewSet):
     filterset_fields = ['category', 'level', 'mode']
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'price', 'start_date']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
+    etag_aggregates = {
+        'users_updated': Max('instructor__date_updated'),
+        'profiles_updated': Max('instructor__profile__updated_at'),
+        'categories_updated': Max('category__updated_at'),
+    }
     
     def perform_create(self, serializer):
         serializer.save(instructor=self.request.user, status='pending')
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Product.objects.filter(status='approved').select_related('seller', 'category')
     serializer_class = ProductSerializer
     pagination_class = StandardResultsSetPagination
@@ -55,30 +181,52 @@ class ProductViewSet(viewsets.ModelViewSet):
     filterset_fields = ['category', 'license_type']
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'price']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
+    etag_aggregates = {
+        'users_updated': Max('seller__date_updated'),
+        'profiles_updated': Max('seller__profile__updated_at'),
+        'categories_updated': Max('category__updated_at'),
+        'views': Sum('views_count'),
+        'downloads': Sum('download_count'),
+    }
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        tag = self.request.query_params.get('tag')
+        if tag:
+            queryset = queryset.filter(tag_index__slug=ProductTag.normalize(tag))
+        return queryset
     
     def perform_create(self, serializer):
         serializer.save(seller=self.request.user, status='pending')
 
-class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
+class TransactionViewSet(ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = TransactionSerializer
     pagination_class = StandardResultsSetPagination
     filter_backends = [DjangoFilterBackend, OrderingFilter]
     filterset_fields = ['transaction_type', 'status']
     ordering_fields = ['created_at', 'amount']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
+    etag_aggregates = {
+        'users_updated': Max('user__date_updated'),
+        'profiles_updated': Max('user__profile__updated_at'),
+    }
     
     def get_queryset(self):
         return Transaction.objects.filter(user=self.request.user)
 
-class AffiliateSaleViewSet(viewsets.ReadOnlyModelViewSet):
+class AffiliateSaleViewSet(SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = AffiliateSaleSerializer
     pagination_class = StandardResultsSetPagination
+    ordering = ['-created_at', '-id']
     
     def get_queryset(self):
-        return AffiliateSale.objects.filter(referral__referrer=self.request.user)
+        # No OrderingFilter here, so page-number mode relies on the queryset's own order
+        return AffiliateSale.objects.filter(
+            referral__referrer=self.request.user
+        ).select_related('referral__referrer', 'referral__referred_user').order_by(*self.ordering)
 
-class BlogPostViewSet(viewsets.ModelViewSet):
+class BlogPostViewSet(ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = BlogPost.objects.filter(status='published').select_related('author', 'category')
     serializer_class = BlogPostSerializer
     pagination_class = StandardResultsSetPagination
@@ -86,7 +234,13 @@ class BlogPostViewSet(viewsets.ModelViewSet):
     filterset_fields = ['category']
     search_fields = ['title', 'content', 'excerpt']
     ordering_fields = ['created_at', 'views_count']
-    ordering = ['-created_at']
+    ordering = ['-created_at', '-id']
+    etag_aggregates = {
+        'users_updated': Max('author__date_updated'),
+        'profiles_updated': Max('author__profile__updated_at'),
+        'categories_updated': Max('category__updated_at'),
+        'views': Sum('views_count'),
+    }
     
     def perform_create(self, serializer):
         serializer.save(author=self.request.user, status='pending')
\ No newline at end of file
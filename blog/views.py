@@ -3,15 +3,17 @@ from django.shortcuts import render
 # Create your views here.
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.core.paginator import Paginator
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Max
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from .models import BlogPost, BlogComment, Category, Tag, SavedArticle
+from site_core.pagination import KeysetPaginationMixin
+from site_core.conditional import ConditionalDetailMixin
 from .forms import BlogPostForm, BlogCommentForm
 from django.contrib.auth.decorators import login_required
 
-class BlogPostListView(ListView):
+class BlogPostListView(KeysetPaginationMixin, ListView):
     model = BlogPost
     template_name = 'blog/list.html'
     context_object_name = 'posts'
@@ -45,14 +47,32 @@ class BlogPostListView(ListView):
         ).filter(post_count__gt=0).order_by('-post_count')[:10]
         return context
 
-class BlogPostDetailView(DetailView):
+class BlogPostDetailView(ConditionalDetailMixin, DetailView):
     model = BlogPost
     template_name = 'blog/detail.html'
     context_object_name = 'post'
+    etag_annotations = {
+        'likes_total': Count('likes', distinct=True),
+        'comments_total': Count('comments', distinct=True),
+        'comments_updated': Max('comments__updated_at'),
+    }
+    views_count_field = 'views_count'
     
     def get_queryset(self):
         return BlogPost.objects.select_related('author', 'category').prefetch_related('tags', 'comments')
     
+    def get_etag_parts(self, request):
+        parts = super().get_etag_parts(request)
+        if request.user.is_authenticated:
+            parts.append(SavedArticle.objects.filter(
+                user=request.user,
+                post__slug=self.kwargs.get(self.slug_url_kwarg)
+            ).exists())
+        return parts
+    
+    def get_views_count_queryset(self):
+        return super().get_views_count_queryset().filter(status='published')
+    
     def get_object(self):
         obj = super().get_object()
         if obj.status == 'published':
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.17 on 2026-10-19 18:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0004_coursepurchase'),
+        ('site_core', '0008_task'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='course',
+            name='status',
+            field=models.CharField(choices=[('draft', 'Draft'), ('pending', 'Pending Approval'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('closed', 'Enrollment Closed')], default='draft', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['status', 'start_date'], name='course_status_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='promocode',
+            index=models.Index(fields=['is_active', 'valid_until'], name='course_promo_valid_idx'),
+        ),
+    ]
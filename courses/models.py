@@ -30,6 +30,7 @@ class Course(models.Model):
         ('pending', 'Pending Approval'),
         ('approved', 'Approved'),
         ('rejected', 'Rejected'),
+        ('closed', 'Enrollment Closed'),
     ]
 
     title = models.CharField(max_length=200)
@@ -60,6 +61,9 @@ class Course(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'start_date'], name='course_status_start_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -103,6 +107,11 @@ class PromoCode(models.Model):
     valid_until = models.DateTimeField()
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'valid_until'], name='course_promo_valid_idx'),
+        ]
+
     def __str__(self):
         return self.code
 
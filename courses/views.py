@@ -2,11 +2,14 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.db.models import Q
+from django.utils import timezone
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy, reverse
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib import messages
 from .models import Course, Enrollment, PromoCode, CoursePurchase
+from site_core.pagination import KeysetPaginationMixin
+from site_core.conditional import ConditionalDetailMixin
 from .forms import CourseForm
 from site_core.models import Category
 from transactions.utils import get_user_balance, can_afford_purchase, create_purchase_transaction, create_sale_transaction
@@ -36,14 +39,18 @@ def reject_course(request, pk):
 
 
 
-class CourseListView(ListView):
+class CourseListView(KeysetPaginationMixin, ListView):
     model = Course
     template_name = 'courses/list.html'
     context_object_name = 'courses'
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = Course.objects.filter(status='approved').select_related('instructor', 'category')
+        # The start date check covers courses the expiration sweeper has not reached yet
+        queryset = Course.objects.filter(
+            Q(is_self_paced=True) | Q(start_date__gt=timezone.now()),
+            status='approved', spots_left__gt=0,
+        ).select_related('instructor', 'category')
         
         category = self.request.GET.get('category')
         level = self.request.GET.get('level')
@@ -69,7 +76,7 @@ class CourseListView(ListView):
         context['categories'] = Category.objects.filter(category_type="course", is_active=True)
         return context
 
-class CourseDetailView(DetailView):
+class CourseDetailView(ConditionalDetailMixin, DetailView):
     model = Course
     template_name = 'courses/detail.html'
     context_object_name = 'course'
@@ -32,6 +32,7 @@ class Job(models.Model):
         ('pending', 'Pending Approval'),
         ('approved', 'Approved'),
         ('rejected', 'Rejected'),
+        ('expired', 'Expired'),
     ]
 
     title = models.CharField(max_length=200)
@@ -80,6 +81,9 @@ class Job(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'deadline'], name='job_status_deadline_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -2,11 +2,14 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.db.models import Q
+from django.utils import timezone
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy, reverse
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib import messages
 from .models import Job, JobPurchase
+from site_core.pagination import KeysetPaginationMixin
+from site_core.conditional import ConditionalDetailMixin
 from site_core.models import Category   # instead of JobCategory
 from .forms import JobForm
 from transactions.utils import get_user_balance, can_afford_purchase, create_purchase_transaction, create_sale_transaction
@@ -53,14 +56,17 @@ class JobManageView(LoginRequiredMixin, ListView):
         return context
     
     
-class JobListView(ListView):
+class JobListView(KeysetPaginationMixin, ListView):
     model = Job
     template_name = 'jobs/list.html'
     context_object_name = 'jobs'
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = Job.objects.filter(status='approved').select_related('posted_by', 'category')
+        # The deadline check covers jobs the expiration sweeper has not reached yet
+        queryset = Job.objects.filter(
+            status='approved', deadline__gt=timezone.now(), spots_left__gt=0
+        ).select_related('posted_by', 'category')
         
         category = self.request.GET.get('category')
         job_type = self.request.GET.get('job_type')
@@ -90,10 +96,11 @@ class JobListView(ListView):
         context['categories'] = Category.objects.filter(category_type="job", is_active=True)
         return context
 
-class JobDetailView(DetailView):
+class JobDetailView(ConditionalDetailMixin, DetailView):
     model = Job
     template_name = 'jobs/detail.html'
     context_object_name = 'job'
+    views_count_field = 'views_count'
     
     def get_object(self):
         obj = super().get_object()
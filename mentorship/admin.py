@@ -45,13 +45,14 @@ class MentorshipApplicationAdmin(admin.ModelAdmin):
 # New Mentor Management System Admin
 @admin.register(Mentor)
 class MentorAdmin(admin.ModelAdmin):
-    list_display = ('name', 'username', 'expertise_area', 'price', 'available_slots', 'people_mentored_count', 'is_active', 'created_at')
+    list_display = ('name', 'username', 'user', 'expertise_area', 'price', 'available_slots', 'people_mentored_count', 'is_active', 'created_at')
     list_filter = ('is_active', 'expertise_area', 'created_at')
     search_fields = ('name', 'username', 'expertise_area', 'bio')
     readonly_fields = ('created_at', 'updated_at')
+    raw_id_fields = ('user',)
     fieldsets = (
         ('Basic Information', {
-            'fields': ('name', 'username', 'email', 'phone', 'mentor_picture')
+            'fields': ('name', 'username', 'user', 'email', 'phone', 'mentor_picture')
         }),
         ('Mentorship Details', {
             'fields': ('bio', 'expertise_area', 'duration', 'price')
@@ -72,10 +73,10 @@ class MentorAdmin(admin.ModelAdmin):
 
 @admin.register(MentorshipEnrollment)
 class MentorshipEnrollmentAdmin(admin.ModelAdmin):
-    list_display = ('mentor', 'student', 'purchase_price', 'admin_fee', 'net_amount', 'status', 'enrolled_at')
+    list_display = ('mentor', 'student', 'purchase_price', 'admin_fee', 'net_amount', 'status', 'student_unread', 'mentor_unread', 'enrolled_at')
     list_filter = ('status', 'enrolled_at')
     search_fields = ('mentor__name', 'mentor__username', 'student__username')
-    readonly_fields = ('tracking_id', 'enrolled_at', 'completed_at', 'admin_fee', 'net_amount')
+    readonly_fields = ('tracking_id', 'enrolled_at', 'completed_at', 'admin_fee', 'net_amount', 'student_unread', 'mentor_unread')
     actions = ['activate_enrollments', 'complete_enrollments']
     
     def activate_enrollments(self, request, queryset):
@@ -0,0 +1,57 @@
+from django.db.models import Max
+
+from site_core.pubsub import get_broker
+from .models import MentorshipEnrollment
+
+HISTORY_PAGE_SIZE = 50
+SINCE_LIMIT = 200
+
+
+def chat_channel(enrollment_id):
+    return f'chat:{enrollment_id}'
+
+
+def serialize_message(chat_message):
+    sender = chat_message.sender
+    return {
+        'id': chat_message.id,
+        'sender_id': chat_message.sender_id,
+        'sender_name': sender.get_display_name(),
+        'message': chat_message.message,
+        'is_read': chat_message.is_read,
+        'sent_at': chat_message.sent_at,
+    }
+
+
+def publish_message(chat_message):
+    get_broker().publish(chat_channel(chat_message.enrollment_id), {
+        'event': 'message',
+        'data': serialize_message(chat_message),
+    })
+
+
+def publish_read_receipt(enrollment_id, reader_id, up_to):
+    get_broker().publish(chat_channel(enrollment_id), {
+        'event': 'read',
+        'data': {'reader_id': reader_id, 'up_to': up_to},
+    })
+
+
+def snapshot(enrollment_id):
+    """The chat's newest message and unread counters, as the stream's ``ready`` event.
+
+    The stream re-reads this every poll interval and sends it again when
+    it changes, so messages written by another process still make the
+    client fetch ``?since=`` without waiting for a reconnect.
+    """
+    row = (
+        MentorshipEnrollment.objects.filter(pk=enrollment_id)
+        .annotate(last_id=Max('chat_messages__id'))
+        .values('last_id', 'mentor_unread', 'student_unread')
+        .first()
+    )
+    return [('ready', row or {})]
+
+
+def expand(message):
+    return [(message['event'], message['data'])]
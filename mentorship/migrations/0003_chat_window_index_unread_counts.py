@@ -0,0 +1,29 @@
+# Generated by Django 4.2.17 on 2026-10-19 17:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentorship', '0002_mentor_mentorshipenrollment_mentorshipchat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mentorshipenrollment',
+            name='mentor_unread',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='mentorshipenrollment',
+            name='student_unread',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='mentorshipchat',
+            index=models.Index(fields=['enrollment', 'sent_at'], name='mentorship_chat_window_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.17 on 2026-10-19 17:43
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_unread_counts(apps, schema_editor):
+    MentorshipEnrollment = apps.get_model('mentorship', 'MentorshipEnrollment')
+    MentorshipChat = apps.get_model('mentorship', 'MentorshipChat')
+
+    def unread(sent_by_student):
+        condition = Q(sender=OuterRef('student_id'))
+        counts = MentorshipChat.objects.filter(
+            condition if sent_by_student else ~condition,
+            enrollment=OuterRef('pk'),
+            is_read=False,
+        ).values('enrollment').annotate(total=Count('pk')).values('total')
+        return Coalesce(Subquery(counts), 0)
+
+    MentorshipEnrollment.objects.update(
+        mentor_unread=unread(sent_by_student=True),
+        student_unread=unread(sent_by_student=False),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentorship', '0003_chat_window_index_unread_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
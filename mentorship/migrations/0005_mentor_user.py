@@ -0,0 +1,21 @@
+# Generated by Django 4.2.17 on 2026-10-19 17:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentorship', '0004_backfill_chat_unread_counts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mentor',
+            name='user',
+            field=models.OneToOneField(blank=True, help_text='Account the mentor signs in with; matched by username when left empty', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='mentor_profile', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
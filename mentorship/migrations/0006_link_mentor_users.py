@@ -0,0 +1,24 @@
+# Generated by Django 4.2.17 on 2026-10-19 17:52
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def link_mentor_users(apps, schema_editor):
+    Mentor = apps.get_model('mentorship', 'Mentor')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+
+    matching_user = User.objects.filter(username=OuterRef('username')).values('pk')[:1]
+    Mentor.objects.filter(user__isnull=True).update(user=Subquery(matching_user))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mentorship', '0005_mentor_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_mentor_users, migrations.RunPython.noop),
+    ]
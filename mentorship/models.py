@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
 from django.conf import settings
 from django.utils import timezone
 import uuid
@@ -91,6 +93,14 @@ class Mentor(models.Model):
     """Admin-managed mentor profiles"""
     name = models.CharField(max_length=200)
     username = models.CharField(max_length=100, unique=True, help_text="Username for mentor login")
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='mentor_profile',
+        help_text="Account the mentor signs in with; matched by username when left empty"
+    )
     email = models.EmailField(blank=True)
     phone = models.CharField(max_length=20, blank=True)
     bio = models.TextField()
@@ -111,6 +121,12 @@ class Mentor(models.Model):
     def __str__(self):
         return f"{self.name} (@{self.username})"
     
+    def save(self, *args, **kwargs):
+        if self.user_id is None and self.username:
+            from django.contrib.auth import get_user_model
+            self.user = get_user_model().objects.filter(username=self.username).first()
+        super().save(*args, **kwargs)
+    
     @property
     def available_slots(self):
         return self.maximum_slots - self.slots_taken
@@ -139,6 +155,9 @@ class MentorshipEnrollment(models.Model):
     tracking_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     enrolled_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    # Denormalized unread message counts for each side of the chat
+    student_unread = models.PositiveIntegerField(default=0)
+    mentor_unread = models.PositiveIntegerField(default=0)
     
     class Meta:
         ordering = ['-enrolled_at']
@@ -147,6 +166,40 @@ class MentorshipEnrollment(models.Model):
     def __str__(self):
         return f"{self.student.username} -> {self.mentor.name}"
     
+    def participant_role(self, user):
+        """Return 'student', 'mentor' or None for ``user``.
+        
+        Compares primary keys against the enrollment row (and its mentor, when
+        loaded with select_related), so no query is needed; the answer is
+        cached on the instance.
+        """
+        roles = self.__dict__.setdefault('_participant_roles', {})
+        if user.pk not in roles:
+            if user.pk == self.student_id:
+                roles[user.pk] = 'student'
+            elif user.pk is not None and user.pk == self.mentor.user_id:
+                roles[user.pk] = 'mentor'
+            else:
+                roles[user.pk] = None
+        return roles[user.pk]
+    
+    @staticmethod
+    def unread_field(is_mentor):
+        return 'mentor_unread' if is_mentor else 'student_unread'
+    
+    def record_message_sent(self, sender_is_mentor):
+        """Count a new message as unread for the other participant"""
+        field = self.unread_field(not sender_is_mentor)
+        MentorshipEnrollment.objects.filter(pk=self.pk).update(**{field: F(field) + 1})
+    
+    def record_messages_read(self, reader_is_mentor, count):
+        """Take ``count`` messages off the reader's unread counter, never below zero"""
+        if count:
+            field = self.unread_field(reader_is_mentor)
+            MentorshipEnrollment.objects.filter(pk=self.pk).update(
+                **{field: Greatest(F(field) - count, Value(0))}
+            )
+    
     def save(self, *args, **kwargs):
         if not self.admin_fee:
             self.admin_fee = self.purchase_price * 0.05  # 5% admin fee
@@ -165,6 +218,9 @@ class MentorshipChat(models.Model):
     
     class Meta:
         ordering = ['sent_at']
+        indexes = [
+            models.Index(fields=['enrollment', 'sent_at'], name='mentorship_chat_window_idx'),
+        ]
     
     def __str__(self):
         return f"{self.sender.username}: {self.message[:50]}..."
\ No newline at end of file
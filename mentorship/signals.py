@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Mentor
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def link_mentor_profile(sender, instance, created, update_fields=None, **kwargs):
+    """Link a mentor profile created before its account once the account exists.
+
+    Mentor.save only matches accounts that are already there, so the other
+    order (profile first, sign-up later) is handled here.
+    """
+    if not created and update_fields is not None and 'username' not in update_fields:
+        return
+    if Mentor.objects.filter(user=instance).exists():
+        return
+    Mentor.objects.filter(user__isnull=True, username=instance.username).update(user=instance)
@@ -1,3 +1,118 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from .models import Mentor, MentorshipEnrollment, MentorshipChat
+
+User = get_user_model()
+
+class MentorshipChatTransportTests(TestCase):
+    def setUp(self):
+        self.student = User.objects.create_user(username='student', password='testpass123')
+        self.mentor_user = User.objects.create_user(username='coach', password='testpass123')
+        self.outsider = User.objects.create_user(username='outsider', password='testpass123')
+        mentor = Mentor.objects.create(
+            name='Coach', username='coach', bio='Bio', expertise_area='Django',
+            duration=10, price=Decimal('100.00')
+        )
+        self.enrollment = MentorshipEnrollment.objects.create(
+            mentor=mentor, student=self.student, purchase_price=Decimal('100.00'),
+            admin_fee=Decimal('5.00'), net_amount=Decimal('95.00'), status='active'
+        )
+    
+    def url(self, name):
+        return reverse(name, args=[self.enrollment.tracking_id])
+    
+    def test_send_then_fetch_since(self):
+        self.client.force_login(self.student)
+        first = self.client.post(self.url('chat_send'), {'message': 'Hello'}).json()
+        self.client.post(self.url('chat_send'), {'message': 'Are you there?'})
+        
+        self.client.force_login(self.mentor_user)
+        data = self.client.get(self.url('chat_messages_since'), {'since': first['id']}).json()
+        self.assertEqual([m['message'] for m in data['messages']], ['Are you there?'])
+    
+    def test_history_pages_backwards_by_cursor(self):
+        for i in range(60):
+            MentorshipChat.objects.create(enrollment=self.enrollment, sender=self.student, message=f'm{i}')
+        self.client.force_login(self.student)
+        response = self.client.get(self.url('mentorship_chat'))
+        window = response.context['messages']
+        self.assertEqual(len(window), 50)
+        self.assertTrue(response.context['has_older'])
+        
+        data = self.client.get(self.url('chat_history'), {'before': window[0].id}).json()
+        self.assertEqual([m['message'] for m in data['messages']], [f'm{i}' for i in range(10)])
+        self.assertFalse(data['has_more'])
+    
+    def test_read_receipt_marks_other_side_in_one_batch(self):
+        ids = [MentorshipChat.objects.create(enrollment=self.enrollment, sender=self.student, message=f'm{i}').id for i in range(3)]
+        self.client.force_login(self.mentor_user)
+        self.client.get(self.url('mentorship_chat'))
+        self.assertEqual(MentorshipChat.objects.filter(is_read=False).count(), 3)
+        
+        with self.assertNumQueries(5):
+            # session, user, enrollment, one UPDATE for the batch and one for the unread counter
+            data = self.client.post(self.url('chat_mark_read'), {'up_to': ids[1]}).json()
+        self.assertEqual(data['updated'], 2)
+    
+    def test_outsiders_are_rejected(self):
+        self.client.force_login(self.outsider)
+        self.assertEqual(self.client.get(self.url('chat_messages_since')).status_code, 403)
+    
+    def test_unread_counters_follow_send_and_read(self):
+        self.client.force_login(self.student)
+        sent = [self.client.post(self.url('chat_send'), {'message': f'm{i}'}).json()['id'] for i in range(3)]
+        self.enrollment.refresh_from_db()
+        self.assertEqual((self.enrollment.mentor_unread, self.enrollment.student_unread), (3, 0))
+        
+        self.client.force_login(self.mentor_user)
+        response = self.client.get(reverse('mentor_dashboard'))
+        self.assertEqual(response.context['enrollments'][0].mentor_unread, 3)
+        self.client.post(self.url('chat_mark_read'), {'up_to': sent[1]})
+        self.client.post(self.url('chat_mark_read'), {'up_to': sent[1]})
+        self.enrollment.refresh_from_db()
+        self.assertEqual(self.enrollment.mentor_unread, 1)
+    
+    def test_chat_polls_unless_the_stream_is_enabled(self):
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(self.url('chat_stream')).status_code, 204)
+        self.assertContains(self.client.get(self.url('mentorship_chat')), 'if (false && window.EventSource)')
+    
+    @override_settings(LIVE_EVENTS_STREAM=True, LIVE_EVENTS_POLL_SECONDS=0)
+    def test_stream_announces_messages_written_elsewhere(self):
+        self.client.force_login(self.student)
+        response = self.client.get(self.url('chat_stream'))
+        chunks = iter(response.streaming_content)
+        next(chunks)
+        self.assertIn(b'"last_id":null', next(chunks))
+        
+        # Written by another process: nothing is published to this one's broker
+        chat_message = MentorshipChat.objects.create(enrollment=self.enrollment, sender=self.mentor_user, message='Hi')
+        self.assertIn(f'"last_id":{chat_message.pk}'.encode(), next(chunks))
+        response.close()
+    
+    def test_participants_resolved_by_user_link(self):
+        from .views import get_chat_enrollment
+        self.assertEqual(self.enrollment.mentor.user, self.mentor_user)
+        
+        # Renaming the account no longer breaks the mentor's access
+        self.mentor_user.username = 'coach-renamed'
+        self.mentor_user.save()
+        with self.assertNumQueries(1):
+            enrollment, is_mentor = get_chat_enrollment(self.mentor_user, self.enrollment.tracking_id)
+            self.assertTrue(is_mentor)
+            self.assertEqual(enrollment.participant_role(self.student), 'student')
+            self.assertIsNone(enrollment.participant_role(self.outsider))
+    
+    def test_mentor_created_before_account_is_linked_on_sign_up(self):
+        mentor = Mentor.objects.create(
+            name='Early', username='early', bio='Bio', expertise_area='Design',
+            duration=2, price=Decimal('50.00')
+        )
+        self.assertIsNone(mentor.user)
+        
+        account = User.objects.create_user(username='early', password='testpass123')
+        mentor.refresh_from_db()
+        self.assertEqual(mentor.user, account)
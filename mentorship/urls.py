@@ -16,5 +16,10 @@ urlpatterns = [
     path('mentor/<int:pk>/confirm/', views.mentor_enroll_confirm, name='mentor_enroll_confirm'),
     path('my-mentorships/', views.my_mentorships, name='my_mentorships'),
     path('chat/<uuid:tracking_id>/', views.mentorship_chat, name='mentorship_chat'),
+    path('chat/<uuid:tracking_id>/messages/', views.chat_messages_since, name='chat_messages_since'),
+    path('chat/<uuid:tracking_id>/history/', views.chat_history, name='chat_history'),
+    path('chat/<uuid:tracking_id>/send/', views.chat_send, name='chat_send'),
+    path('chat/<uuid:tracking_id>/read/', views.chat_mark_read, name='chat_mark_read'),
+    path('chat/<uuid:tracking_id>/stream/', views.chat_stream, name='chat_stream'),
     path('mentor-dashboard/', views.mentor_dashboard, name='mentor_dashboard'),
 ]
\ No newline at end of file
@@ -6,13 +6,23 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse_lazy, reverse
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib import messages
-from django.http import JsonResponse
+from functools import wraps
+from django.core.exceptions import PermissionDenied
+from django.db.models import Q, Subquery
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.http import require_POST
 from django.contrib.auth import get_user_model
 from .models import MentorshipOffer, MentorshipApplication, Mentor, MentorshipEnrollment, MentorshipChat
 from .forms import MentorshipOfferForm, MentorshipApplicationForm
+from .live import (
+    HISTORY_PAGE_SIZE, SINCE_LIMIT, chat_channel, expand as expand_chat_event,
+    publish_message, publish_read_receipt, serialize_message, snapshot as chat_snapshot
+)
+from site_core.sse import stream_response
+from transactions.live import stream_enabled
 from payments.models import Transaction
 from site_core.models import SiteSetting
+from pricing.entitlements import has_plan
 from transactions.utils import get_user_balance, can_afford_purchase, create_purchase_transaction, create_sale_transaction
 
 User = get_user_model()
@@ -52,6 +62,13 @@ class MentorshipApplicationCreateView(LoginRequiredMixin, CreateView):
     
     def dispatch(self, request, *args, **kwargs):
         self.mentorship_offer = get_object_or_404(MentorshipOffer, pk=self.kwargs['offer_id'])
+        requirement = self.mentorship_offer.subscription_requirement
+        if request.user.is_authenticated and not has_plan(request.user, requirement):
+            messages.warning(
+                request,
+                f'This mentorship needs the {self.mentorship_offer.get_subscription_requirement_display()} plan or higher.'
+            )
+            return redirect('pricing_list')
         return super().dispatch(request, *args, **kwargs)
     
     def get_context_data(self, **kwargs):
@@ -94,7 +111,8 @@ class MentorshipApplicationCreateView(LoginRequiredMixin, CreateView):
 def manage_mentorship(request):
     user = request.user
     
-    if request.user.subscription_level == 'mentorship':
+    is_mentor_plan = has_plan(user, 'mentorship')
+    if is_mentor_plan:
         offers = MentorshipOffer.objects.filter(mentor=user)
         applications = MentorshipApplication.objects.filter(mentorship_offer__mentor=user)
     else:
@@ -104,6 +122,7 @@ def manage_mentorship(request):
     context = {
         'offers': offers,
         'applications': applications,
+        'is_mentor_plan': is_mentor_plan,
     }
     
     return render(request, 'mentorship/manage.html', context)
@@ -219,7 +238,7 @@ def mentor_enroll_confirm(request, pk):
 @login_required
 def my_mentorships(request):
     """Show user's mentorship enrollments."""
-    enrollments = MentorshipEnrollment.objects.filter(student=request.user).order_by('-enrolled_at')
+    enrollments = MentorshipEnrollment.objects.filter(student=request.user).select_related('mentor').order_by('-enrolled_at')
     
     context = {
         'enrollments': enrollments,
@@ -229,62 +248,179 @@ def my_mentorships(request):
     return render(request, 'mentorship/my_mentorships.html', context)
 
 
+def get_chat_enrollment(user, tracking_id):
+    """Return (enrollment, is_mentor) if ``user`` takes part in the chat, else raise PermissionDenied"""
+    enrollment = get_object_or_404(
+        MentorshipEnrollment.objects.select_related('mentor', 'student'),
+        tracking_id=tracking_id
+    )
+    role = enrollment.participant_role(user)
+    if role is None:
+        raise PermissionDenied('You are not authorized to access this chat.')
+    return enrollment, role == 'mentor'
+
+
 @login_required
 def mentorship_chat(request, tracking_id):
     """Chat interface for mentorship."""
-    enrollment = get_object_or_404(MentorshipEnrollment, tracking_id=tracking_id)
-    
-    # Check if user is authorized to access this chat
-    if request.user != enrollment.student:
-        # Check if user is the mentor (by username)
-        try:
-            mentor_user = User.objects.get(username=enrollment.mentor.username)
-            if request.user != mentor_user:
-                messages.error(request, 'You are not authorized to access this chat.')
-                return redirect('available_mentors')
-        except User.DoesNotExist:
-            messages.error(request, 'Mentor user not found.')
-            return redirect('available_mentors')
-    
-    # Get chat messages
-    messages_list = MentorshipChat.objects.filter(enrollment=enrollment)
-    
-    # Mark messages as read for the current user
-    MentorshipChat.objects.filter(
-        enrollment=enrollment,
-        is_read=False
-    ).exclude(sender=request.user).update(is_read=True)
+    try:
+        enrollment, is_mentor = get_chat_enrollment(request.user, tracking_id)
+    except PermissionDenied:
+        messages.error(request, 'You are not authorized to access this chat.')
+        return redirect('available_mentors')
     
+    # Plain form posts still work when JavaScript is unavailable
     if request.method == 'POST':
         message_text = request.POST.get('message', '').strip()
         if message_text:
-            MentorshipChat.objects.create(
+            chat_message = MentorshipChat.objects.create(
                 enrollment=enrollment,
                 sender=request.user,
                 message=message_text
             )
+            enrollment.record_message_sent(is_mentor)
+            publish_message(chat_message)
             messages.success(request, 'Message sent!')
             return redirect('mentorship_chat', tracking_id=tracking_id)
     
+    # Only the latest window is rendered; older messages load by cursor
+    latest, has_older = message_window(enrollment)
+    
     context = {
         'enrollment': enrollment,
-        'messages': messages_list,
-        'is_mentor': request.user.username == enrollment.mentor.username,
+        'messages': latest,
+        'has_older': has_older,
+        'is_mentor': is_mentor,
     }
     
     return render(request, 'mentorship/chat.html', context)
 
 
+def message_window(enrollment, before=None):
+    """Return one page of messages older than message ``before`` (oldest first), and whether more exist.
+    
+    Walks the (enrollment, sent_at) index newest first, so only one window is
+    read no matter how long the conversation is.
+    """
+    window = MentorshipChat.objects.filter(enrollment=enrollment)
+    if before:
+        anchor = Subquery(window.filter(pk=before).values('sent_at')[:1])
+        window = window.filter(Q(sent_at__lt=anchor) | Q(sent_at=anchor, pk__lt=before))
+    page = list(window.select_related('sender').order_by('-sent_at', '-id')[:HISTORY_PAGE_SIZE + 1])
+    has_older = len(page) > HISTORY_PAGE_SIZE
+    page = page[:HISTORY_PAGE_SIZE]
+    page.reverse()
+    return page, has_older
+
+
+def chat_participant_required(view):
+    """Resolve the chat for JSON endpoints, answering 403 to non-participants"""
+    @wraps(view)
+    @login_required
+    def wrapper(request, tracking_id, *args, **kwargs):
+        try:
+            enrollment, is_mentor = get_chat_enrollment(request.user, tracking_id)
+        except PermissionDenied as e:
+            return JsonResponse({'error': str(e)}, status=403)
+        return view(request, enrollment, is_mentor, *args, **kwargs)
+    return wrapper
+
+
+def _cursor_param(request, name):
+    try:
+        return int(request.GET.get(name, 0))
+    except ValueError:
+        return 0
+
+
+@chat_participant_required
+def chat_messages_since(request, enrollment, is_mentor):
+    """Messages newer than ?since=<id>, oldest first"""
+    since = _cursor_param(request, 'since')
+    chat_messages = list(
+        MentorshipChat.objects.filter(enrollment=enrollment, id__gt=since)
+        .select_related('sender').order_by('id')[:SINCE_LIMIT]
+    )
+    return JsonResponse({
+        'messages': [serialize_message(chat_message) for chat_message in chat_messages],
+        'last_id': chat_messages[-1].id if chat_messages else since,
+    })
+
+
+@chat_participant_required
+def chat_history(request, enrollment, is_mentor):
+    """The page of messages older than ?before=<id>, oldest first"""
+    page, has_more = message_window(enrollment, before=_cursor_param(request, 'before'))
+    return JsonResponse({
+        'messages': [serialize_message(chat_message) for chat_message in page],
+        'has_more': has_more,
+    })
+
+
+@require_POST
+@chat_participant_required
+def chat_send(request, enrollment, is_mentor):
+    if enrollment.status != 'active':
+        return JsonResponse({'error': 'This mentorship is not active.'}, status=400)
+    message_text = request.POST.get('message', '').strip()
+    if not message_text:
+        return JsonResponse({'error': 'Message cannot be empty.'}, status=400)
+    
+    chat_message = MentorshipChat.objects.create(
+        enrollment=enrollment,
+        sender=request.user,
+        message=message_text
+    )
+    enrollment.record_message_sent(is_mentor)
+    publish_message(chat_message)
+    return JsonResponse(serialize_message(chat_message), status=201)
+
+
+@require_POST
+@chat_participant_required
+def chat_mark_read(request, enrollment, is_mentor):
+    """Batched read receipt: everything from the other side up to ?up_to=<id>"""
+    try:
+        up_to = int(request.POST.get('up_to', 0))
+    except ValueError:
+        return JsonResponse({'error': 'up_to must be a message id.'}, status=400)
+    
+    updated = MentorshipChat.objects.filter(
+        enrollment=enrollment,
+        id__lte=up_to,
+        is_read=False
+    ).exclude(sender=request.user).update(is_read=True)
+    enrollment.record_messages_read(is_mentor, updated)
+    if updated:
+        publish_read_receipt(enrollment.id, request.user.id, up_to)
+    return JsonResponse({'updated': updated})
+
+
+@chat_participant_required
+def chat_stream(request, enrollment, is_mentor):
+    """Server-sent events for new messages and read receipts in one chat"""
+    if not stream_enabled():
+        # 204 tells EventSource to stop reconnecting; the page polls instead
+        return HttpResponse(status=204)
+    return stream_response(
+        request,
+        chat_channel(enrollment.id),
+        # Clients fetch ?since= whenever ``ready`` arrives, on connect or when it changes
+        snapshot=lambda: chat_snapshot(enrollment.id),
+        expand=expand_chat_event,
+    )
+
+
 @login_required
 def mentor_dashboard(request):
     """Dashboard for mentors to see their students and chats."""
     try:
-        mentor = Mentor.objects.get(username=request.user.username)
+        mentor = Mentor.objects.get(user=request.user)
     except Mentor.DoesNotExist:
         messages.error(request, 'You are not registered as a mentor.')
         return redirect('available_mentors')
     
-    enrollments = MentorshipEnrollment.objects.filter(mentor=mentor).order_by('-enrolled_at')
+    enrollments = MentorshipEnrollment.objects.filter(mentor=mentor).select_related('student').order_by('-enrolled_at')
     
     context = {
         'mentor': mentor,
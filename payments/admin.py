@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.utils import timezone
 from .models import PaymentMethod, Transaction, ManualDeposit
+from site_core.pagination import EstimatedCountAdminMixin
 
 @admin.register(PaymentMethod)
 class PaymentMethodAdmin(admin.ModelAdmin):
@@ -9,7 +10,7 @@ class PaymentMethodAdmin(admin.ModelAdmin):
     list_editable = ('is_active',)
 
 @admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
+class TransactionAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = ('reference', 'user', 'transaction_type', 'amount', 'currency', 'status', 'created_at')
     list_filter = ('transaction_type', 'status', 'currency', 'created_at')
     search_fields = ('reference', 'user__username', 'description')
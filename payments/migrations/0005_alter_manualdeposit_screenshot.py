@@ -0,0 +1,19 @@
+# Generated by Django 4.2.17 on 2026-10-19 17:59
+
+import site_core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_alter_paymentmethod_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='manualdeposit',
+            name='screenshot',
+            field=models.ImageField(storage=site_core.storage.get_content_addressed_storage, upload_to='deposit_screenshots/'),
+        ),
+    ]
@@ -5,6 +5,8 @@ from django.utils import timezone
 from django.db.models import Sum
 import logging
 
+from site_core.storage import get_content_addressed_storage
+
 logger = logging.getLogger(__name__)
 
 
@@ -149,7 +151,7 @@ class ManualDeposit(models.Model):
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='manual_deposits')
     amount = models.DecimalField(max_digits=10, decimal_places=2)
-    screenshot = models.ImageField(upload_to='deposit_screenshots/')
+    screenshot = models.ImageField(upload_to='deposit_screenshots/', storage=get_content_addressed_storage)
     depositor_name = models.CharField(max_length=100, help_text="Name of person who made the deposit")
     deposit_date = models.DateTimeField(help_text="Date and time when deposit was made")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
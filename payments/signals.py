@@ -1,11 +1,13 @@
 from django.db.models.signals import post_save
+from django.db import transaction
 from django.dispatch import receiver
 from .models import Transaction
-from transactions.models import Notification
+from site_core.pubsub import publish_to_user
+from transactions.outbox import enqueue_notification
 
 @receiver(post_save, sender=Transaction)
 def create_transaction_notification(sender, instance, created, **kwargs):
-    """Create notification when transaction is created or status changes"""
+    """Queue a notification when transaction is created or status changes"""
     
     if created:
         # New transaction created
@@ -28,12 +30,7 @@ def create_transaction_notification(sender, instance, created, **kwargs):
             title = "Transaction Created"
             message = f"A new {instance.get_transaction_type_display().lower()} transaction has been created."
         
-        Notification.objects.create(
-            user=instance.user,
-            notification_type='transaction',
-            title=title,
-            message=message
-        )
+        enqueue_notification(instance.user, 'transaction', title, message, related_object=instance)
     
     else:
         # Transaction status updated
@@ -48,20 +45,17 @@ def create_transaction_notification(sender, instance, created, **kwargs):
                 title = "Transaction Completed"
                 message = f"Your {instance.get_transaction_type_display().lower()} transaction has been completed."
             
-            Notification.objects.create(
-                user=instance.user,
-                notification_type='transaction',
-                title=title,
-                message=message
-            )
+            enqueue_notification(instance.user, 'transaction', title, message, related_object=instance)
         
         elif instance.status == 'rejected':
             title = "Transaction Rejected"
             message = f"Your {instance.get_transaction_type_display().lower()} transaction has been rejected."
             
-            Notification.objects.create(
-                user=instance.user,
-                notification_type='transaction',
-                title=title,
-                message=message
-            )
\ No newline at end of file
+            enqueue_notification(instance.user, 'transaction', title, message, related_object=instance)
+
+
+@receiver(post_save, sender=Transaction)
+def publish_balance_change(sender, instance, **kwargs):
+    """Let the user's live streams refresh their balance once the save commits"""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: publish_to_user(user_id, 'balance'))
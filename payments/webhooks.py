@@ -1,13 +1,13 @@
 from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
-import json
 import hmac
 import hashlib
 from django.conf import settings
 from .models import Transaction
 from accounts.models import VirtualAccount
 from django.utils import timezone
+from site_core import fastjson
 
 @csrf_exempt
 @require_POST
@@ -17,7 +17,7 @@ def monnify_webhook(request):
     if not verify_webhook_signature(request.body, signature):
         return HttpResponse('Invalid signature', status=400)
 
-    payload = json.loads(request.body)
+    payload = fastjson.loads(request.body)
     event_type = payload.get('eventType')
     
     if event_type == 'SUCCESSFUL_TRANSACTION':
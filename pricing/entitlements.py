@@ -0,0 +1,96 @@
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import SubscriptionPurchase
+
+# Plans from least to most access; a plan includes everything below it
+PLAN_ORDER = ['starter', 'pro', 'mentorship']
+
+ENTITLEMENT_CACHE_TIMEOUT = 60 * 60
+
+
+def plan_rank(plan):
+    return PLAN_ORDER.index(plan) if plan in PLAN_ORDER else 0
+
+
+def _cache_key(user_id):
+    return f'entitlement:{user_id}'
+
+
+def _best_purchase(user_id, now):
+    """The highest unexpired active purchase as (plan, end date), or None"""
+    best = None
+    purchases = (
+        SubscriptionPurchase.objects.filter(user_id=user_id, status='active')
+        .filter(Q(end_date__isnull=True) | Q(end_date__gt=now))
+        .values_list('plan__name', 'end_date')
+    )
+    for plan, end_date in purchases:
+        if best is None or plan_rank(plan) > plan_rank(best[0]):
+            best = (plan, end_date)
+    return best
+
+
+def _build_record(user, now):
+    # The level set on the account is kept as granted; a paid plan only adds to it
+    best = _best_purchase(user.pk, now)
+    if best is not None and plan_rank(best[0]) > plan_rank(user.subscription_level):
+        return {'plan': best[0], 'expires_at': best[1]}
+    return {'plan': user.subscription_level, 'expires_at': None}
+
+
+def get_entitlement(user):
+    """The user's effective plan as ``{'plan', 'expires_at'}``.
+
+    Resolved once per request (memoized on the user object) from a cached
+    per-user record, so gating checks normally cost no queries. The cache
+    entry never outlives the subscription it came from, and it is dropped
+    whenever a purchase is saved, activated or expired.
+    """
+    record = user.__dict__.get('_entitlement')
+    now = timezone.now()
+    if record is None or (record['expires_at'] and record['expires_at'] <= now):
+        key = _cache_key(user.pk)
+        record = cache.get(key)
+        if record is None or (record['expires_at'] and record['expires_at'] <= now):
+            record = _build_record(user, now)
+            timeout = ENTITLEMENT_CACHE_TIMEOUT
+            if record['expires_at']:
+                timeout = max(1, min(timeout, int((record['expires_at'] - now).total_seconds())))
+            cache.set(key, record, timeout)
+        user.__dict__['_entitlement'] = record
+    return record
+
+
+def effective_plan(user):
+    if not user.is_authenticated:
+        return None
+    return get_entitlement(user)['plan']
+
+
+def has_plan(user, plan):
+    """Whether ``user`` is entitled to ``plan`` or a higher one"""
+    current = effective_plan(user)
+    return current is not None and plan_rank(current) >= plan_rank(plan)
+
+
+def invalidate_entitlement(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+def refresh_entitlements(user_ids):
+    """Re-resolve plans after subscriptions change state.
+
+    Only the cached records are dropped: ``User.subscription_level`` is the
+    level granted on the account and is never overwritten from purchases.
+    """
+    for user_id in set(user_ids):
+        invalidate_entitlement(user_id)
+
+
+def refresh_expired_subscriptions(purchase_ids):
+    """Expiration sweeper hook: refresh the owners of subscriptions that just expired"""
+    refresh_entitlements(
+        SubscriptionPurchase.objects.filter(pk__in=purchase_ids).values_list('user_id', flat=True)
+    )
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.17 on 2026-10-19 18:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0005_alter_manualdeposit_screenshot'),
+        ('pricing', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscriptionpurchase',
+            index=models.Index(fields=['status', 'end_date'], name='subscription_status_end_idx'),
+        ),
+    ]
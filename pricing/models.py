@@ -43,6 +43,9 @@ class SubscriptionPurchase(models.Model):
 
     class Meta:
         ordering = ['-purchased_at']
+        indexes = [
+            models.Index(fields=['status', 'end_date'], name='subscription_status_end_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.plan.name}"
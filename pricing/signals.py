@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .entitlements import invalidate_entitlement, refresh_entitlements
+from .models import SubscriptionPurchase
+
+
+@receiver(post_save, sender=SubscriptionPurchase)
+@receiver(post_delete, sender=SubscriptionPurchase)
+def subscription_changed(sender, instance, **kwargs):
+    """Re-resolve the owner's plan when a subscription starts or ends"""
+    if instance.status != 'pending':
+        refresh_entitlements([instance.user_id])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def account_level_changed(sender, instance, update_fields=None, **kwargs):
+    """A level set by hand on the account is the fallback plan, so drop the cached one"""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_entitlement(instance.pk)
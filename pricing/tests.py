@@ -1,3 +1,68 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
+
+from site_core.expiry import sweep_expired
+from .entitlements import effective_plan, has_plan
+from .models import SubscriptionPlan, SubscriptionPurchase
+
+User = get_user_model()
+
 
-# Create your tests here.
+class EntitlementTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='subscriber', password='testpass123')
+        self.plan = SubscriptionPlan.objects.create(name='mentorship', price=5000, duration_days=30)
+        self.purchase = SubscriptionPurchase.objects.create(user=self.user, plan=self.plan, amount_paid=5000)
+    
+    def fresh_user(self):
+        return User.objects.get(pk=self.user.pk)
+    
+    def test_activation_grants_the_plan_and_checks_are_free(self):
+        self.assertFalse(has_plan(self.fresh_user(), 'pro'))
+        
+        self.purchase.activate()
+        user = self.fresh_user()
+        self.assertTrue(has_plan(user, 'pro'))
+        
+        user = self.fresh_user()
+        with self.assertNumQueries(0):
+            self.assertEqual(effective_plan(user), 'mentorship')
+            self.assertTrue(has_plan(user, 'mentorship'))
+    
+    def test_expiry_drops_back_to_starter(self):
+        self.purchase.activate()
+        self.assertTrue(has_plan(self.fresh_user(), 'mentorship'))
+        
+        # The cache entry times out at the end date; the lapse is noticed before the sweep runs
+        SubscriptionPurchase.objects.filter(pk=self.purchase.pk).update(end_date=timezone.now() - timedelta(minutes=1))
+        cache.clear()
+        self.assertFalse(has_plan(self.fresh_user(), 'pro'))
+        
+        sweep_expired()
+        self.purchase.refresh_from_db()
+        self.assertEqual(self.purchase.status, 'expired')
+        self.assertEqual(effective_plan(self.fresh_user()), 'starter')
+    
+    def test_level_granted_on_the_account_survives_purchases(self):
+        User.objects.filter(pk=self.user.pk).update(subscription_level='pro')
+        pro_purchase = SubscriptionPurchase.objects.create(
+            user=self.user, plan=SubscriptionPlan.objects.create(name='pro', price=2000, duration_days=30),
+            amount_paid=2000
+        )
+        pro_purchase.activate()
+        pro_purchase.delete()
+        
+        self.purchase.activate()
+        self.assertEqual(effective_plan(self.fresh_user()), 'mentorship')
+        SubscriptionPurchase.objects.filter(pk=self.purchase.pk).update(end_date=timezone.now() - timedelta(minutes=1))
+        sweep_expired()
+        
+        user = self.fresh_user()
+        self.assertEqual(user.subscription_level, 'pro')
+        with self.assertNumQueries(1):
+            self.assertEqual(effective_plan(user), 'pro')
@@ -7,6 +7,7 @@ from django.views.generic import ListView, CreateView
 from django.contrib import messages
 from .models import SubscriptionPlan, SubscriptionPurchase
 from .forms import SubscribeForm
+from .entitlements import effective_plan
 from payments.models import Transaction
 
 class PricingListView(ListView):
@@ -16,6 +17,13 @@ class PricingListView(ListView):
     
     def get_queryset(self):
         return SubscriptionPlan.objects.filter(is_active=True)
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        current_plan = effective_plan(self.request.user)
+        context['current_plan'] = current_plan
+        context['current_plan_display'] = dict(self.request.user.SUBSCRIPTION_CHOICES).get(current_plan, '') if current_plan else ''
+        return context
 
 class SubscribeView(LoginRequiredMixin, CreateView):
     model = SubscriptionPurchase
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ProductCategory, Product, ProductSale
+from .models import ProductCategory, Product, ProductSale, ProductTag, ChunkedUpload
 
 @admin.register(ProductCategory)
 class ProductCategoryAdmin(admin.ModelAdmin):
@@ -11,6 +11,12 @@ class ProductCategoryAdmin(admin.ModelAdmin):
         return obj.products.count()
     product_count.short_description = 'Products'
 
+@admin.register(ProductTag)
+class ProductTagAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'created_at')
+    search_fields = ('name', 'slug')
+    readonly_fields = ('slug', 'created_at')
+
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('title', 'seller', 'category', 'license_type', 'price', 'status', 'views_count', 'download_count', 'created_at')
@@ -42,4 +48,11 @@ class ProductSaleAdmin(admin.ModelAdmin):
     
     
     
-    
\ No newline at end of file
+    
+@admin.register(ChunkedUpload)
+class ChunkedUploadAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'user', 'offset', 'total_size', 'status', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('filename', 'user__username')
+    readonly_fields = ('upload_id', 'checksum', 'created_at', 'updated_at')
+    raw_id_fields = ('user',)
@@ -1,5 +1,6 @@
 from django import forms
-from .models import Product
+from .models import ChunkedUpload, Product
+from .uploads import AssembledFile
 from site_core.models import Category  # adjust this import to match your project structure
 
 class ProductForm(forms.ModelForm):
@@ -7,7 +8,7 @@ class ProductForm(forms.ModelForm):
         model = Product
         fields = [
             'title', 'description', 'category', 'license_type', 'version',
-            'price', 'product_file', 'sample_file', 'thumbnail',
+            'price', 'product_file', 'sample_file', 'thumbnail', 'tags',
         ]
         widgets = {
             'description': forms.Textarea(attrs={'rows': 4}),
@@ -16,10 +17,41 @@ class ProductForm(forms.ModelForm):
             }),
         }
 
-    def __init__(self, *args, **kwargs):
+    # Set by the chunked uploader instead of sending product_file in the POST
+    upload_id = forms.UUIDField(required=False, widget=forms.HiddenInput)
+
+    def __init__(self, *args, user=None, **kwargs):
         super().__init__(*args, **kwargs)
+        self.user = user
+        self.chunked_upload = None
         # Only show categories meant for Products
         self.fields['category'].queryset = Category.objects.filter(category_type='product')
+        # Either a direct file or a finished chunked upload; clean() insists on one of them
+        self.fields['product_file'].required = False
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload_id = cleaned_data.get('upload_id')
+        if upload_id:
+            self.chunked_upload = ChunkedUpload.objects.filter(
+                upload_id=upload_id, user=self.user, status='complete'
+            ).first()
+            if self.chunked_upload is None:
+                self.add_error('product_file', 'That upload was not found or has not finished.')
+            else:
+                cleaned_data['product_file'] = AssembledFile(self.chunked_upload)
+        elif not cleaned_data.get('product_file') and 'product_file' not in self.errors:
+            # Neither a new file nor one already on the product
+            self.add_error('product_file', 'Please upload the product file.')
+        return cleaned_data
+
+    def save(self, commit=True):
+        product = super().save(commit=commit)
+        if commit and self.chunked_upload is not None:
+            # The partial file has been moved into storage
+            self.cleaned_data['product_file'].close()
+            self.chunked_upload.delete()
+        return product
 
     def clean_price(self):
         price = self.cleaned_data.get('price')
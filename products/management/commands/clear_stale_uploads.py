@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from products.uploads import discard_stale_uploads
+
+class Command(BaseCommand):
+    help = 'Delete chunked product uploads that were abandoned, with their partial files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=None,
+                            help='Age in hours after which an untouched upload is discarded')
+
+    def handle(self, *args, **options):
+        removed = discard_stale_uploads(hours=options['hours'])
+        self.stdout.write(self.style.SUCCESS(f'Removed {removed} stale uploads'))
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.17 on 2026-10-19 17:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_alter_product_category'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductTag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('slug', models.SlugField(max_length=60, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='tag_index',
+            field=models.ManyToManyField(blank=True, editable=False, related_name='products', to='products.producttag'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.17 on 2026-10-19 17:12
+
+from django.db import migrations
+from django.utils.text import slugify
+
+
+def backfill_product_tags(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductTag = apps.get_model('products', 'ProductTag')
+
+    tags_by_slug = {}
+    for product in Product.objects.exclude(tags='').only('id', 'tags').iterator():
+        slugs = []
+        for name in product.tags.split(','):
+            # Same rule as ProductTag.normalize: slug the truncated name, so
+            # names sharing their first 50 characters map to one tag
+            name = name.strip()[:50]
+            slug = slugify(name)[:60]
+            if not slug:
+                continue
+            if slug not in tags_by_slug:
+                tags_by_slug[slug] = ProductTag.objects.get_or_create(
+                    slug=slug, defaults={'name': name}
+                )[0]
+            slugs.append(slug)
+        product.tag_index.set({tags_by_slug[slug] for slug in slugs})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_producttag'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_product_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.17 on 2026-10-19 17:59
+
+import django.core.validators
+import site_core.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_chunkedupload'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='product_file',
+            field=models.FileField(storage=site_core.storage.get_content_addressed_storage, upload_to='product_files/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['zip', 'pdf', 'doc', 'docx'])]),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.17 on 2026-10-19 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_alter_product_product_file'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='promocode',
+            index=models.Index(fields=['is_active', 'valid_until'], name='product_promo_valid_idx'),
+        ),
+    ]
@@ -1,7 +1,14 @@
+import os
+import uuid
+
 from django.db import models
 from django.conf import settings
 from django.core.validators import FileExtensionValidator
+from django.utils import timezone
+from django.utils.text import slugify
 from site_core.models import Category
+from site_core.counters import BufferedCounter
+from site_core.storage import get_content_addressed_storage, private_media_root
 
 class ProductCategory(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -11,6 +18,33 @@ class ProductCategory(models.Model):
     def __str__(self):
         return self.name
 
+class ProductTag(models.Model):
+    NAME_MAX_LENGTH = 50
+
+    name = models.CharField(max_length=NAME_MAX_LENGTH, unique=True)
+    slug = models.SlugField(max_length=60, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            self.slug = self.normalize(self.name)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def clean_name(cls, name):
+        return name.strip()[:cls.NAME_MAX_LENGTH]
+
+    @classmethod
+    def normalize(cls, name):
+        # Slugged from the stored (truncated) name, so equal names always share a slug
+        return slugify(cls.clean_name(name))[:60]
+
 class Product(models.Model):
     LICENSE_TYPES = [
         ('personal', 'Personal Use'),
@@ -46,6 +80,7 @@ class Product(models.Model):
     # Files
     product_file = models.FileField(
         upload_to='product_files/',
+        storage=get_content_addressed_storage,
         validators=[FileExtensionValidator(allowed_extensions=['zip', 'pdf', 'doc', 'docx'])]
     )
     sample_file = models.FileField(
@@ -58,6 +93,7 @@ class Product(models.Model):
     # Additional details
     features = models.TextField(blank=True, help_text="List of features (one per line)")
     tags = models.CharField(max_length=500, blank=True, help_text="Comma-separated tags")
+    tag_index = models.ManyToManyField(ProductTag, related_name='products', blank=True, editable=False)
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='draft')
     rejection_reason = models.TextField(blank=True)
@@ -77,8 +113,7 @@ class Product(models.Model):
         self.save(update_fields=['views_count'])
 
     def increment_downloads(self):
-        self.download_count += 1
-        self.save(update_fields=['download_count'])
+        product_downloads.increment(self.pk)
 
     def get_features_list(self):
         return [feature.strip() for feature in self.features.split('\n') if feature.strip()]
@@ -86,6 +121,30 @@ class Product(models.Model):
     def get_tags_list(self):
         return [tag.strip() for tag in self.tags.split(',') if tag.strip()]
 
+    def sync_tag_index(self):
+        """Mirror the comma-separated tags string into the indexed tag table"""
+        tags_by_slug = {}
+        for name in self.get_tags_list():
+            slug = ProductTag.normalize(name)
+            if slug and slug not in tags_by_slug:
+                tags_by_slug[slug] = ProductTag.clean_name(name)
+
+        # Both columns are unique, so a tag stored under either counts as existing
+        lookup = models.Q(slug__in=tags_by_slug) | models.Q(name__in=tags_by_slug.values())
+        existing = list(ProductTag.objects.filter(lookup))
+        known_slugs = {tag.slug for tag in existing}
+        known_names = {tag.name for tag in existing}
+        missing = [
+            ProductTag(name=name, slug=slug)
+            for slug, name in tags_by_slug.items()
+            if slug not in known_slugs and name not in known_names
+        ]
+        if missing:
+            ProductTag.objects.bulk_create(missing, ignore_conflicts=True)
+            existing = list(ProductTag.objects.filter(lookup))
+
+        self.tag_index.set(existing)
+
 class ProductImage(models.Model):
     image = models.ImageField(upload_to='product_gallery/')
     caption = models.CharField(max_length=200, blank=True)
@@ -110,6 +169,11 @@ class PromoCode(models.Model):
     valid_until = models.DateTimeField()
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'valid_until'], name='product_promo_valid_idx'),
+        ]
+
     def __str__(self):
         return self.code
 
@@ -146,6 +210,49 @@ class ProductSale(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.license_key:
-            import uuid
             self.license_key = str(uuid.uuid4())[:16].upper()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+
+class ChunkedUpload(models.Model):
+    """A product file being uploaded in pieces.
+
+    Chunks are appended to a partial file on disk in order; ``offset`` is
+    how many bytes have been written, so an interrupted client asks for it
+    and carries on from there. Once complete and verified, the partial file
+    is moved into storage as a Product.product_file.
+    """
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+    ]
+
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='chunked_uploads')
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    checksum = models.CharField(max_length=64, blank=True, help_text="Expected SHA-256 of the whole file, if the client sent one")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='uploading')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'updated_at'], name='chunked_upload_stale_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.filename} ({self.offset}/{self.total_size})"
+
+    @property
+    def part_path(self):
+        # Partial product files are as private as the finished ones
+        directory = getattr(settings, 'CHUNKED_UPLOAD_DIR', os.path.join(private_media_root(), 'chunked_uploads'))
+        return os.path.join(directory, f'{self.upload_id}.part')
+
+
+# Download counters are bumped on every file request, so writes are batched
+product_downloads = BufferedCounter(Product, 'download_count')
+sale_downloads = BufferedCounter(ProductSale, 'download_count')
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import Product
+
+@receiver(post_save, sender=Product)
+def sync_product_tag_index(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the normalized tag index in step with Product.tags"""
+    
+    # Counter updates (views, downloads) never touch tags
+    if update_fields is not None and 'tags' not in update_fields:
+        return
+    
+    instance.sync_tag_index()
@@ -1,3 +1,214 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from site_core.models import Category
+from site_core.counters import flush_all_counters, flush_due_counters
+from .models import ChunkedUpload, Product, ProductSale, ProductTag, product_downloads
+
+User = get_user_model()
+
+class ProductTagIndexTests(TestCase):
+    def setUp(self):
+        self.seller = User.objects.create_user(
+            username='seller',
+            email='seller@example.com',
+            password='testpass123'
+        )
+        self.category = Category.objects.create(name='Templates', category_type='product')
+    
+    def create_product(self, title, tags, status='approved'):
+        return Product.objects.create(
+            title=title,
+            description='A product',
+            seller=self.seller,
+            price=1000,
+            category=self.category,
+            product_file='product_files/test.zip',
+            tags=tags,
+            status=status
+        )
+    
+    def test_tags_are_indexed_on_save(self):
+        product = self.create_product('Theme', 'WordPress, Theme , ,wordpress')
+        self.assertEqual(
+            sorted(product.tag_index.values_list('slug', flat=True)),
+            ['theme', 'wordpress']
+        )
+        
+        product.tags = 'Theme'
+        product.save()
+        self.assertEqual(list(product.tag_index.values_list('slug', flat=True)), ['theme'])
+        self.assertEqual(ProductTag.objects.count(), 2)
+    
+    def test_long_tags_sharing_a_prefix_share_one_tag(self):
+        prefix = 'x' * 50
+        first = self.create_product('First', f'{prefix}-alpha')
+        second = self.create_product('Second', f'{prefix}-beta')
+        
+        self.assertEqual(ProductTag.objects.filter(name=prefix).count(), 1)
+        self.assertEqual(list(first.tag_index.all()), list(second.tag_index.all()))
+        self.assertEqual(second.tag_index.get().slug, ProductTag.normalize(f'{prefix}-beta'))
+    
+    def test_tag_stored_under_another_slug_is_reused(self):
+        legacy = ProductTag.objects.create(name='Legacy', slug='legacy-old')
+        product = self.create_product('Old', 'Legacy')
+        self.assertEqual(list(product.tag_index.all()), [legacy])
+    
+    def test_list_view_filters_and_counts_by_tag(self):
+        self.create_product('Theme A', 'wordpress, theme')
+        self.create_product('Theme B', 'wordpress')
+        self.create_product('Draft', 'wordpress', status='draft')
+        
+        response = self.client.get(reverse('products_list'), {'tag': 'WordPress'})
+        self.assertEqual(len(response.context['products']), 2)
+        
+        facets = {tag.slug: tag.product_count for tag in response.context['tag_facets']}
+        self.assertEqual(facets, {'wordpress': 2, 'theme': 1})
+
+
+class ProductDownloadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.private_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.private_root)
+        override = override_settings(
+            MEDIA_ROOT=self.media_root, PRIVATE_MEDIA_ROOT=self.private_root, COUNTER_FLUSH_SECONDS=3600
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(flush_all_counters)
+        
+        self.seller = User.objects.create_user(username='seller', password='testpass123')
+        self.buyer = User.objects.create_user(username='buyer', password='testpass123')
+        self.product = Product(
+            title='Kit', description='A product', seller=self.seller, price=1000,
+            category=Category.objects.create(name='Kits', category_type='product'), status='approved'
+        )
+        self.product.product_file.save('kit.zip', ContentFile(b'0123456789' * 10), save=False)
+        self.product.save()
+        self.url = reverse('product_download', args=[self.product.pk])
+    
+    def buy(self):
+        return ProductSale.objects.create(
+            product=self.product, buyer=self.buyer, seller=self.seller,
+            sale_price=1000, status='completed'
+        )
+    
+    def test_requires_a_completed_purchase(self):
+        self.client.force_login(self.buyer)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+    
+    def test_range_requests_resume_without_recounting(self):
+        sale = self.buy()
+        self.client.force_login(self.buyer)
+        
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(len(b''.join(response.streaming_content)), 100)
+        
+        response = self.client.get(self.url, HTTP_RANGE='bytes=90-')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 90-99/100')
+        self.assertEqual(b''.join(response.streaming_content), b'0123456789')
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=500-').status_code, 416)
+        
+        # Counted once, and only written when the buffer flushes
+        self.assertEqual(product_downloads.pending(self.product.pk), 1)
+        flush_all_counters()
+        self.product.refresh_from_db()
+        sale.refresh_from_db()
+        self.assertEqual((self.product.download_count, sale.download_count), (1, 1))
+    
+    def test_idle_counts_are_flushed_once_the_interval_passes(self):
+        product_downloads.increment(self.product.pk)
+        # An idle process is covered by a timer; finished requests check the interval too
+        self.assertIsNotNone(product_downloads._timer)
+        self.assertEqual(flush_due_counters(), 0)
+        
+        product_downloads._last_flush -= 3600
+        self.assertEqual(flush_due_counters(), 1)
+        self.assertIsNone(product_downloads._timer)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.download_count, 1)
+    
+    @override_settings(PROTECTED_MEDIA_SERVER='nginx')
+    def test_offloads_transfer_to_nginx(self):
+        self.buy()
+        self.client.force_login(self.buyer)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected-media/{self.product.product_file.name}')
+        self.assertEqual(response.content, b'')
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.private_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.private_root)
+        override = override_settings(
+            MEDIA_ROOT=self.media_root, PRIVATE_MEDIA_ROOT=self.private_root, CHUNKED_UPLOAD_CHUNK_SIZE=4
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        
+        self.seller = User.objects.create_user(username='seller', password='testpass123')
+        self.category = Category.objects.create(name='Kits', category_type='product')
+        self.client.force_login(self.seller)
+        self.data = b'0123456789'
+    
+    def put(self, upload_id, start, chunk, **headers):
+        end = start + len(chunk) - 1
+        return self.client.put(
+            reverse('product_upload_chunk', args=[upload_id]), chunk,
+            content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE=f'bytes {start}-{end}/{len(self.data)}', **headers
+        )
+    
+    def test_resumable_upload_is_attached_to_new_product(self):
+        import hashlib
+        response = self.client.post(reverse('product_upload_start'), {
+            'filename': 'bundle.zip', 'size': len(self.data),
+            'checksum': hashlib.sha256(self.data).hexdigest(),
+        })
+        upload_id = response.json()['upload_id']
+        
+        self.assertEqual(self.put(upload_id, 0, self.data[:4]).json()['offset'], 4)
+        # A retried chunk is accepted without being written twice, a gap is refused
+        self.assertEqual(self.put(upload_id, 0, self.data[:4]).json()['offset'], 4)
+        gap = self.put(upload_id, 8, self.data[8:])
+        self.assertEqual((gap.status_code, gap.json()['offset']), (409, 4))
+        bad = self.put(upload_id, 4, self.data[4:8], HTTP_X_CHUNK_SHA256='0' * 64)
+        self.assertEqual(bad.status_code, 400)
+        
+        self.put(upload_id, 4, self.data[4:8])
+        self.put(upload_id, 8, self.data[8:])
+        self.assertEqual(self.client.post(reverse('product_upload_complete', args=[upload_id])).status_code, 200)
+        
+        response = self.client.post(reverse('product_create'), {
+            'title': 'Bundle', 'description': 'Files', 'category': self.category.pk,
+            'license_type': 'personal', 'version': '1.0', 'price': '1000', 'upload_id': upload_id,
+        })
+        self.assertEqual(response.status_code, 302)
+        product = Product.objects.get(title='Bundle')
+        with product.product_file.open('rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertFalse(ChunkedUpload.objects.exists())
+        # Moved into storage rather than copied
+        self.assertEqual(os.listdir(os.path.join(self.private_root, 'chunked_uploads')), [])
+    
+    def test_product_needs_a_file_or_finished_upload(self):
+        response = self.client.post(reverse('product_create'), {
+            'title': 'Empty', 'description': 'Nothing', 'category': self.category.pk,
+            'license_type': 'personal', 'version': '1.0', 'price': '1000',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('product_file', response.context['form'].errors)
+        self.assertFalse(Product.objects.filter(title='Empty').exists())
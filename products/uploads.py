@@ -0,0 +1,172 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ChunkedUpload, Product
+
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+class AssembledFile(File):
+    """A finished upload; storage moves it into place instead of copying"""
+
+    def __init__(self, upload):
+        super().__init__(open(upload.part_path, 'rb'), name=upload.filename)
+        self.path = upload.part_path
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def chunk_size():
+    return getattr(settings, 'CHUNKED_UPLOAD_CHUNK_SIZE', 5 * 1024 * 1024)
+
+
+def max_upload_size():
+    return getattr(settings, 'PRODUCT_FILE_MAX_SIZE', 2 * 1024 * 1024 * 1024)
+
+
+def allowed_extensions():
+    field = Product._meta.get_field('product_file')
+    for validator in field.validators:
+        if getattr(validator, 'allowed_extensions', None):
+            return validator.allowed_extensions
+    return None
+
+
+def start_upload(user, filename, total_size, checksum=''):
+    filename = os.path.basename(filename or '').strip()
+    extension = os.path.splitext(filename)[1][1:].lower()
+    extensions = allowed_extensions()
+    if not filename or (extensions and extension not in extensions):
+        raise UploadError(f"Allowed file types: {', '.join(extensions)}")
+    if total_size <= 0 or total_size > max_upload_size():
+        raise UploadError(f'File size must be between 1 byte and {max_upload_size()} bytes')
+    if checksum and not re.fullmatch(r'[0-9a-f]{64}', checksum):
+        raise UploadError('checksum must be a hex SHA-256 digest')
+
+    upload = ChunkedUpload.objects.create(
+        user=user, filename=filename, total_size=total_size, checksum=checksum
+    )
+    os.makedirs(os.path.dirname(upload.part_path), exist_ok=True)
+    open(upload.part_path, 'wb').close()
+    return upload
+
+
+def parse_content_range(header):
+    """Return (start, length, total) from ``Content-Range: bytes start-end/total``"""
+    match = CONTENT_RANGE_RE.match((header or '').strip())
+    if not match:
+        raise UploadError('Content-Range must look like "bytes <start>-<end>/<total>"')
+    start, end, total = (int(value) for value in match.groups())
+    if end < start:
+        raise UploadError('Content-Range end is before its start')
+    return start, end - start + 1, total
+
+
+def _spool(stream, length, expected_sha256):
+    """Copy the chunk off the network before taking any lock, checking its length and digest"""
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    digest = hashlib.sha256()
+    remaining = length
+    while remaining > 0:
+        block = stream.read(min(COPY_BUFFER_SIZE, remaining))
+        if not block:
+            break
+        digest.update(block)
+        spooled.write(block)
+        remaining -= len(block)
+    if remaining:
+        spooled.close()
+        raise UploadError('Chunk body is shorter than its Content-Range')
+    if expected_sha256 and digest.hexdigest() != expected_sha256.lower():
+        spooled.close()
+        raise UploadError('Chunk checksum mismatch; resend it')
+    spooled.seek(0)
+    return spooled
+
+
+def append_chunk(upload, start, length, total, stream, chunk_sha256=None):
+    """Append one chunk at ``start`` and return the new offset.
+
+    Chunks must arrive in order. A chunk that was already stored (a retry
+    after a lost response) is accepted without writing; a gap answers 409
+    with the offset to resume from.
+    """
+    if total != upload.total_size or start + length > upload.total_size:
+        raise UploadError('Content-Range does not match the upload size')
+    if length > chunk_size():
+        raise UploadError(f'Chunks may be at most {chunk_size()} bytes')
+
+    spooled = _spool(stream, length, chunk_sha256)
+    try:
+        with transaction.atomic():
+            upload = ChunkedUpload.objects.select_for_update().get(pk=upload.pk)
+            if upload.status != 'uploading':
+                raise UploadError('This upload is already complete', status=409)
+            if start + length <= upload.offset:
+                return upload.offset
+            if start != upload.offset:
+                raise UploadError(f'Expected a chunk starting at byte {upload.offset}', status=409)
+
+            with open(upload.part_path, 'r+b') as part:
+                # Drop anything past the offset left by a write that never committed
+                part.seek(upload.offset)
+                part.truncate()
+                shutil.copyfileobj(spooled, part, COPY_BUFFER_SIZE)
+            upload.offset += length
+            upload.save(update_fields=['offset', 'updated_at'])
+            return upload.offset
+    finally:
+        spooled.close()
+
+
+def complete_upload(upload):
+    """Verify the assembled file and mark it ready to attach to a product"""
+    with transaction.atomic():
+        upload = ChunkedUpload.objects.select_for_update().get(pk=upload.pk)
+        if upload.status == 'complete':
+            return upload
+        if upload.offset != upload.total_size:
+            raise UploadError(f'Upload is incomplete: {upload.offset} of {upload.total_size} bytes', status=409)
+
+        digest = hashlib.sha256()
+        with open(upload.part_path, 'rb') as part:
+            for block in iter(lambda: part.read(COPY_BUFFER_SIZE), b''):
+                digest.update(block)
+        if upload.checksum and digest.hexdigest() != upload.checksum:
+            raise UploadError('File checksum does not match; start the upload again', status=422)
+
+        upload.checksum = digest.hexdigest()
+        upload.status = 'complete'
+        upload.save(update_fields=['checksum', 'status', 'updated_at'])
+        return upload
+
+
+def discard_stale_uploads(hours=None):
+    """Remove uploads untouched for CHUNKED_UPLOAD_EXPIRY_HOURS and their partial files"""
+    if hours is None:
+        hours = getattr(settings, 'CHUNKED_UPLOAD_EXPIRY_HOURS', 24)
+    stale = ChunkedUpload.objects.filter(updated_at__lt=timezone.now() - timedelta(hours=hours))
+    removed = 0
+    for upload in stale.iterator():
+        if os.path.exists(upload.part_path):
+            os.remove(upload.part_path)
+        upload.delete()
+        removed += 1
+    return removed
@@ -4,7 +4,11 @@ from . import views
 urlpatterns = [
     path('', views.ProductListView.as_view(), name='products_list'),
     path('<int:pk>/', views.ProductDetailView.as_view(), name='product_detail'),
+    path('<int:pk>/download/', views.product_download, name='product_download'),
     path('create/', views.ProductCreateView.as_view(), name='product_create'),
+    path('uploads/', views.upload_start, name='product_upload_start'),
+    path('uploads/<uuid:upload_id>/', views.upload_chunk, name='product_upload_chunk'),
+    path('uploads/<uuid:upload_id>/complete/', views.upload_complete, name='product_upload_complete'),
     path('<int:pk>/edit/', views.ProductUpdateView.as_view(), name='product_edit'),
     path('<int:pk>/delete/', views.ProductDeleteView.as_view(), name='product_delete'),
     path('manage/', views.ProductManageView.as_view(), name='product_manage'),
@@ -1,10 +1,22 @@
+import os
+
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db.models import Q, Count
 from django.shortcuts import render, get_object_or_404
 from django.urls import reverse_lazy
+from django.utils.text import slugify
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from .models import Product, ProductSale
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse
+from .models import ChunkedUpload, Product, ProductSale, ProductTag, product_downloads, sale_downloads
+from .uploads import (
+    UploadError, append_chunk, chunk_size as upload_chunk_size, complete_upload,
+    parse_content_range, start_upload
+)
+from site_core.downloads import requested_range_start, serve_protected_file
+from site_core.pagination import KeysetPaginationMixin
+from site_core.conditional import ConditionalDetailMixin
 from .forms import ProductForm
 from site_core.models import Category
 
@@ -57,7 +69,7 @@ class ProductManageView(LoginRequiredMixin, ListView):
     
     
     
-class ProductListView(ListView):
+class ProductListView(KeysetPaginationMixin, ListView):
     model = Product
     template_name = 'products/list.html'
     context_object_name = 'products'
@@ -71,9 +83,12 @@ class ProductListView(ListView):
         min_price = self.request.GET.get('min_price')
         max_price = self.request.GET.get('max_price')
         search = self.request.GET.get('search')
+        tag = self.request.GET.get('tag')
         
         if category:
             queryset = queryset.filter(category__name=category)
+        if tag:
+            queryset = queryset.filter(tag_index__slug=ProductTag.normalize(tag))
         if license_type:
             queryset = queryset.filter(license_type=license_type)
         if min_price:
@@ -91,17 +106,65 @@ class ProductListView(ListView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['categories'] = Category.objects.filter(category_type="job", is_active=True)
+        
+        # Tag facets for the current filter set, counted on the join table index
+        context['tag_facets'] = ProductTag.objects.filter(
+            products__in=self.object_list.values('pk')
+        ).annotate(
+            product_count=Count('products')
+        ).order_by('-product_count', 'name')[:20]
+        context['active_tag'] = ProductTag.normalize(self.request.GET.get('tag', ''))
         return context
 
-class ProductDetailView(DetailView):
+class ProductDetailView(ConditionalDetailMixin, DetailView):
     model = Product
     template_name = 'products/detail.html'
     context_object_name = 'product'
+    views_count_field = 'views_count'
     
     def get_object(self):
         obj = super().get_object()
         obj.increment_views()
         return obj
+    
+    def has_purchased(self, product_pk):
+        if not hasattr(self, '_has_purchased'):
+            user = self.request.user
+            self._has_purchased = user.is_authenticated and ProductSale.objects.filter(
+                product_id=product_pk, buyer=user, status='completed'
+            ).exists()
+        return self._has_purchased
+    
+    def get_etag_parts(self, request):
+        # The purchase card swaps "Buy" for "Download" once bought
+        return super().get_etag_parts(request) + [self.has_purchased(self.validator_pk)]
+    
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['has_purchased'] = self.has_purchased(self.object.pk)
+        return context
+
+
+@login_required
+def product_download(request, pk):
+    """Send a purchased product file; buyers, the seller and staff only"""
+    product = get_object_or_404(Product.objects.only('id', 'seller_id', 'title', 'product_file'), pk=pk)
+    sale_id = ProductSale.objects.filter(
+        product=product, buyer=request.user, status='completed'
+    ).values_list('id', flat=True).first()
+    if sale_id is None and not (product.seller_id == request.user.pk or request.user.is_staff):
+        raise PermissionDenied('Purchase this product to download it.')
+    if not product.product_file:
+        raise Http404('This product has no file.')
+    
+    # Resumed transfers of the same download are not counted again
+    if requested_range_start(request) == 0:
+        product_downloads.increment(product.pk)
+        if sale_id is not None:
+            sale_downloads.increment(sale_id)
+    # Stored files are named by content digest, so name the download after the product
+    extension = os.path.splitext(product.product_file.name)[1]
+    return serve_protected_file(request, product.product_file, f"{slugify(product.title) or 'product'}{extension}")
 
 from django.contrib import messages
 from django.urls import reverse_lazy
@@ -111,6 +174,11 @@ class ProductCreateView(LoginRequiredMixin, CreateView):
     form_class = ProductForm
     template_name = 'products/create.html'
     
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+    
     def form_valid(self, form):
         form.instance.seller = self.request.user
         form.instance.status = 'pending'
@@ -138,6 +206,11 @@ class ProductUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     template_name = 'products/edit.html'
     success_url = reverse_lazy('products_list')
     
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['user'] = self.request.user
+        return kwargs
+    
     def test_func(self):
         product = self.get_object()
         return product.seller == self.request.user
@@ -161,4 +234,70 @@ class ProductDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
     
     def delete(self, request, *args, **kwargs):
         messages.success(request, '✅ Product deleted successfully!')
-        return super().delete(request, *args, **kwargs)
\ No newline at end of file
+        return super().delete(request, *args, **kwargs)
+
+
+def upload_error_response(error):
+    return JsonResponse({'error': str(error)}, status=error.status)
+
+
+@require_POST
+@login_required
+def upload_start(request):
+    """Begin a chunked product file upload: filename, size and optional sha256 checksum"""
+    try:
+        total_size = int(request.POST.get('size', 0))
+    except ValueError:
+        return JsonResponse({'error': 'size must be a number of bytes'}, status=400)
+    try:
+        upload = start_upload(
+            request.user,
+            request.POST.get('filename', ''),
+            total_size,
+            request.POST.get('checksum', '').lower(),
+        )
+    except UploadError as e:
+        return upload_error_response(e)
+    return JsonResponse({
+        'upload_id': str(upload.upload_id),
+        'offset': 0,
+        'chunk_size': upload_chunk_size(),
+    }, status=201)
+
+
+@login_required
+def upload_chunk(request, upload_id):
+    """GET reports the offset to resume from; PUT appends the chunk named by Content-Range"""
+    upload = get_object_or_404(ChunkedUpload, upload_id=upload_id, user=request.user)
+    if request.method == 'GET':
+        return JsonResponse({
+            'offset': upload.offset,
+            'total_size': upload.total_size,
+            'status': upload.status,
+            'chunk_size': upload_chunk_size(),
+        })
+    if request.method != 'PUT':
+        return HttpResponseNotAllowed(['GET', 'PUT'])
+    
+    try:
+        start, length, total = parse_content_range(request.headers.get('Content-Range'))
+        offset = append_chunk(
+            upload, start, length, total, request,
+            chunk_sha256=request.headers.get('X-Chunk-SHA256'),
+        )
+    except UploadError as e:
+        # The current offset lets the client resume after a gap or a bad chunk
+        upload.refresh_from_db(fields=['offset'])
+        return JsonResponse({'error': str(e), 'offset': upload.offset}, status=e.status)
+    return JsonResponse({'offset': offset})
+
+
+@require_POST
+@login_required
+def upload_complete(request, upload_id):
+    upload = get_object_or_404(ChunkedUpload, upload_id=upload_id, user=request.user)
+    try:
+        upload = complete_upload(upload)
+    except UploadError as e:
+        return upload_error_response(e)
+    return JsonResponse({'upload_id': str(upload.upload_id), 'checksum': upload.checksum})
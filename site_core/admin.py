@@ -6,10 +6,13 @@ from django.contrib import messages
 from django.utils import timezone
 from django.db import transaction
 
-from .models import SiteSetting, MonnifyBank, AdminNotification, Category
+from .models import SiteSetting, MonnifyBank, AdminNotification, Category, QueuedEmail, StoredBlob, Task
 from accounts.models import KYCVerification, VirtualAccount, User
 from payments.models import ManualDeposit
 from payments.monnify_service import MonnifyService
+from .pagination import EstimatedCountAdminMixin
+from accounts.tasks import approve_kyc_with_virtual_accounts
+from .taskqueue import queue_stats
 
 @admin.register(SiteSetting)
 class SiteSettingAdmin(admin.ModelAdmin):
@@ -94,7 +97,7 @@ class MonnifyBankAdmin(admin.ModelAdmin):
     fetch_banks_from_monnify.allowed_permissions = ('change',)
 
 @admin.register(KYCVerification)
-class KYCVerificationAdmin(admin.ModelAdmin):
+class KYCVerificationAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'id_type', 'status_badge', 'submitted_at', 'reviewed_at', 'action_buttons')
     list_filter = ('status', 'id_type', 'submitted_at', 'reviewed_at')
     search_fields = ('user__username', 'user__email', 'id_number', 'legal_first_name', 'legal_last_name')
@@ -188,69 +191,13 @@ class KYCVerificationAdmin(admin.ModelAdmin):
             self.message_user(request, f"❌ KYC for {kyc.user.username} is not pending approval", messages.ERROR)
             return redirect('admin:accounts_kycverification_changelist')
 
-        try:
-            with transaction.atomic():
-                # Create virtual account using Monnify
-                monnify_service = MonnifyService()
-                kyc_data = {
-                    'legal_first_name': kyc.legal_first_name,
-                    'legal_last_name': kyc.legal_last_name,
-                }
-                
-                # Get user's preferred banks
-                preferred_banks = list(kyc.user.bank_preferences.filter(is_active=True).values_list('bank__bank_code', flat=True))
-                
-                account_data, error = monnify_service.create_reserved_account(kyc.user, kyc_data, preferred_banks)
-                
-                if account_data and account_data.get('accounts'):
-                    # Create virtual account records for each bank
-                    for account in account_data['accounts']:
-                        VirtualAccount.objects.create(
-                            user=kyc.user,
-                            account_number=account['accountNumber'],
-                            account_name=account['accountName'],
-                            bank_name=account['bankName'],
-                            bank_code=account['bankCode'],
-                            reference=account_data['accountReference'],
-                            is_primary=False  # First account will be primary
-                        )
-                    
-                    # Set first account as primary
-                    first_account = VirtualAccount.objects.filter(user=kyc.user).first()
-                    if first_account:
-                        first_account.is_primary = True
-                        first_account.save()
-                    
-                    # Update KYC status
-                    kyc.status = 'approved'
-                    kyc.monnify_customer_reference = account_data.get('customerReference', '')
-                    kyc.reviewed_at = timezone.now()
-                    kyc.reviewed_by = request.user
-                    kyc.save()
-                    
-                    self.message_user(
-                        request, 
-                        f"✅ KYC approved and virtual accounts created for {kyc.user.username}! Account reference: {account_data['accountReference']}", 
-                        messages.SUCCESS
-                    )
-                    
-                    # Send notification to user (you can implement this)
-                    self._send_kyc_approval_notification(kyc.user)
-                    
-                else:
-                    self.message_user(
-                        request, 
-                        f"❌ Failed to create virtual account for {kyc.user.username}: {error}", 
-                        messages.ERROR
-                    )
-                    
-        except Exception as e:
-            self.message_user(
-                request, 
-                f"❌ Error approving KYC for {kyc.user.username}: {str(e)}", 
-                messages.ERROR
-            )
-        
+        # Monnify calls are slow, so accounts are created by the task worker
+        approve_kyc_with_virtual_accounts.delay(kyc.pk, request.user.pk)
+        self.message_user(
+            request,
+            f"✅ Approval queued for {kyc.user.username}; virtual accounts will be created shortly.",
+            messages.SUCCESS
+        )
         return redirect('admin:accounts_kycverification_changelist')
     
 
@@ -282,25 +229,16 @@ class KYCVerificationAdmin(admin.ModelAdmin):
 
     def approve_selected_kyc(self, request, queryset):
         """Admin action to approve multiple KYC verifications"""
-        approved_count = 0
-        failed_count = 0
-        
-        for kyc in queryset.filter(status='pending'):
-            try:
-                # Simulate the approval process (you can call approve_kyc logic here)
-                kyc.status = 'approved'
-                kyc.reviewed_at = timezone.now()
-                kyc.reviewed_by = request.user
-                kyc.save()
-                approved_count += 1
-            except Exception as e:
-                failed_count += 1
-                # Log the error but continue with others
+        queued_count = 0
+        for kyc_id in queryset.filter(status='pending').values_list('id', flat=True):
+            approve_kyc_with_virtual_accounts.delay(kyc_id, request.user.pk)
+            queued_count += 1
         
-        if approved_count:
-            self.message_user(request, f"✅ Successfully approved {approved_count} KYC verification(s)", messages.SUCCESS)
-        if failed_count:
-            self.message_user(request, f"❌ Failed to approve {failed_count} KYC verification(s)", messages.ERROR)
+        self.message_user(
+            request,
+            f"✅ Queued approval of {queued_count} KYC verification(s); virtual accounts will be created shortly",
+            messages.SUCCESS
+        )
     
     approve_selected_kyc.short_description = "✅ Approve selected KYC verifications"
 
@@ -317,11 +255,6 @@ class KYCVerificationAdmin(admin.ModelAdmin):
     
     reject_selected_kyc.short_description = "❌ Reject selected KYC verifications"
 
-    def _send_kyc_approval_notification(self, user):
-        """Send notification to user about KYC approval"""
-        # Implement your notification logic here (email, in-app notification, etc.)
-        print(f"KYC approved notification sent to {user.email}")
-
 @admin.register(VirtualAccount)
 class VirtualAccountAdmin(admin.ModelAdmin):
     list_display = ('user', 'account_number', 'bank_name', 'is_active', 'is_primary', 'created_at')
@@ -333,6 +266,49 @@ class VirtualAccountAdmin(admin.ModelAdmin):
     def has_add_permission(self, request):
         return False  # Virtual accounts should only be created via KYC approval
 
+@admin.register(QueuedEmail)
+class QueuedEmailAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
+    list_display = ('subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('subject', 'recipients')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    actions = ['retry_now']
+    
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status='sent').update(status='pending', attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f"{updated} email(s) queued for the next send.", messages.SUCCESS)
+    
+    retry_now.short_description = "Retry selected emails now"
+
 # ManualDeposit admin is registered in payments/admin.py
 
-# ... rest of your existing admin registrations ...
\ No newline at end of file
+# ... rest of your existing admin registrations ...
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
+    list_display = ('name', 'size', 'refcount', 'created_at', 'updated_at')
+    list_filter = ('created_at',)
+    search_fields = ('name', 'digest')
+    readonly_fields = ('name', 'digest', 'size', 'refcount', 'created_at', 'updated_at')
+
+
+@admin.register(Task)
+class TaskAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
+    list_display = ('name', 'queue', 'status', 'attempts', 'run_at', 'started_at', 'finished_at', 'locked_by')
+    list_filter = ('status', 'queue', 'name')
+    search_fields = ('name', 'last_error')
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'locked_by', 'locked_at', 'last_error')
+    change_list_template = 'admin/site_core/task/change_list.html'
+    actions = ['retry_now']
+    
+    def changelist_view(self, request, extra_context=None):
+        extra_context = {**(extra_context or {}), 'queue_stats': queue_stats()}
+        return super().changelist_view(request, extra_context=extra_context)
+    
+    def retry_now(self, request, queryset):
+        updated = queryset.filter(status='failed').update(
+            status='queued', attempts=0, run_at=timezone.now(), finished_at=None
+        )
+        self.message_user(request, f"{updated} task(s) queued to run again.", messages.SUCCESS)
+    
+    retry_now.short_description = "Retry selected failed tasks now"
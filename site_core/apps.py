@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class SiteCoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'site_core'
+    
+    def ready(self):
+        import site_core.signals
@@ -0,0 +1,116 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+def parse_range(header, size):
+    """Return (start, end) inclusive for a single byte range, None to send the whole file, or False if unsatisfiable"""
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        # Absent, malformed or multi-range headers get the full file
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            return False
+        return max(size - suffix, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_range(fieldfile, start, length):
+    with fieldfile.open('rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _attachment(response, filename, content_type, as_attachment=True):
+    response['Content-Type'] = content_type
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['Cache-Control'] = 'private, no-store'
+    return response
+
+
+def requested_range_start(request):
+    """Byte offset a (resumed) download starts at, 0 for a fresh one"""
+    match = RANGE_RE.match(request.headers.get('Range', '').strip())
+    if match and match.group(1):
+        return int(match.group(1))
+    return 0
+
+
+def serve_protected_file(request, fieldfile, filename=None, as_attachment=True):
+    """Send a private stored file after the caller has authorized the request.
+
+    With PROTECTED_MEDIA_SERVER = 'nginx' the response is an empty
+    X-Accel-Redirect to PROTECTED_MEDIA_INTERNAL_URL (an ``internal``
+    location aliasing PRIVATE_MEDIA_ROOT); with 'sendfile' (Apache mod_xsendfile,
+    lighttpd) it is an X-Sendfile with the file's path. Either way the web
+    server streams the bytes and handles Range itself. Otherwise the file
+    is streamed from storage in chunks with single-range support so
+    interrupted downloads can resume.
+    """
+    filename = filename or os.path.basename(fieldfile.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    server = getattr(settings, 'PROTECTED_MEDIA_SERVER', None)
+
+    if server == 'nginx':
+        internal_url = getattr(settings, 'PROTECTED_MEDIA_INTERNAL_URL', '/protected-media/')
+        response = HttpResponse()
+        response['X-Accel-Redirect'] = internal_url + fieldfile.name
+        return _attachment(response, filename, content_type, as_attachment)
+    if server == 'sendfile':
+        response = HttpResponse()
+        response['X-Sendfile'] = fieldfile.path
+        return _attachment(response, filename, content_type, as_attachment)
+
+    storage = fieldfile.storage
+    size = fieldfile.size
+    try:
+        last_modified = int(storage.get_modified_time(fieldfile.name).timestamp())
+    except NotImplementedError:
+        last_modified = None
+
+    byte_range = parse_range(request.headers.get('Range'), size)
+    if_range = request.headers.get('If-Range')
+    if byte_range and if_range and (last_modified is None or parse_http_date_safe(if_range) != last_modified):
+        # The file changed since the partial download began, so start over
+        byte_range = None
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    if byte_range:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(fieldfile, start, end - start + 1), status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    else:
+        response = StreamingHttpResponse(_read_range(fieldfile, 0, size))
+        response['Content-Length'] = size
+
+    response['Accept-Ranges'] = 'bytes'
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return _attachment(response, filename, content_type, as_attachment)
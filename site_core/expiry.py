@@ -0,0 +1,68 @@
+from django.apps import apps
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+SWEEP_BATCH_SIZE = 1000
+
+# What the sweeper does to rows whose time has run out, as
+# (name, model label, rows to sweep given now, update to apply or None to delete).
+# Each selection mirrors the model's read-time check (is_active, is_valid, ...).
+EXPIRATION_SWEEPS = [
+    ('subscriptions', 'pricing.SubscriptionPurchase',
+     lambda now: Q(status='active', end_date__lte=now), {'status': 'expired'}),
+    ('jobs', 'jobs.Job',
+     lambda now: Q(status='approved', deadline__lte=now), {'status': 'expired', 'spots_left': 0}),
+    ('courses', 'courses.Course',
+     lambda now: Q(status='approved', is_self_paced=False, start_date__lte=now), {'status': 'closed'}),
+    ('course promo codes', 'courses.PromoCode',
+     lambda now: Q(is_active=True, valid_until__lte=now), {'is_active': False}),
+    ('product promo codes', 'products.PromoCode',
+     lambda now: Q(is_active=True, valid_until__lte=now), {'is_active': False}),
+    ('broadcasts', 'site_core.AdminNotification',
+     lambda now: Q(is_active=True, end_date__lt=now), {'is_active': False}),
+    ('password reset tokens', 'accounts.PasswordResetToken',
+     lambda now: Q(expires_at__lt=now), None),
+]
+
+# Called with the pks of each swept batch, keyed by sweep name
+EXPIRATION_HOOKS = {
+    'subscriptions': 'pricing.entitlements.refresh_expired_subscriptions',
+}
+
+
+def _sweep(model, condition, update, batch_size, hook=None, now=None):
+    """Apply ``update`` (or delete) to matching rows in pk batches so no statement holds locks for long"""
+    if update is not None:
+        # update() skips auto_now, and conditional GETs are validated against updated_at
+        now = now or timezone.now()
+        touched = {field.name: now for field in model._meta.concrete_fields if getattr(field, 'auto_now', False)}
+        update = {**touched, **update}
+    swept = 0
+    while True:
+        pks = list(model._default_manager.filter(condition).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return swept
+        # Re-check the condition so a row changed since it was selected is left alone
+        batch = model._default_manager.filter(condition, pk__in=pks)
+        if update is None:
+            swept += batch.delete()[0]
+        else:
+            swept += batch.update(**update)
+        if hook is not None:
+            hook(pks)
+        if len(pks) < batch_size:
+            return swept
+
+
+def sweep_expired(batch_size=SWEEP_BATCH_SIZE, now=None):
+    """Move every expired row to its expired state. Returns {sweep name: rows swept}."""
+    now = now or timezone.now()
+    counts = {}
+    for name, label, condition, update in EXPIRATION_SWEEPS:
+        hook = import_string(EXPIRATION_HOOKS[name]) if name in EXPIRATION_HOOKS else None
+        counts[name] = _sweep(apps.get_model(label), condition(now), update, batch_size, hook, now)
+    if counts['broadcasts']:
+        cache.delete(apps.get_model('site_core.AdminNotification').BROADCASTS_CACHE_KEY)
+    return counts
@@ -0,0 +1,29 @@
+import json
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Integers past 64 bits come back from orjson as floats
+LONG_INTEGER = re.compile(rb'\d{19,}')
+
+
+def loads(data, **kwargs):
+    """Parse a JSON document from bytes or str, with orjson when it is installed.
+
+    Returns exactly what ``json.loads`` would. Documents orjson reads
+    differently (integers wider than 64 bits) and documents it rejects go
+    through the stdlib, so errors are still ``ValueError``. Keyword
+    arguments are passed to ``json.loads`` on that path.
+    """
+    if orjson is None:
+        return json.loads(data, **kwargs)
+    raw = data.encode() if isinstance(data, str) else data
+    if not LONG_INTEGER.search(raw):
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data, **kwargs)
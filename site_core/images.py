@@ -0,0 +1,227 @@
+import io
+import json
+import logging
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+logger = logging.getLogger(__name__)
+
+# Uploaded images that get responsive variants, as (model label, field name)
+IMAGE_VARIANT_FIELDS = [
+    ('products.Product', 'thumbnail'),
+    ('products.ProductImage', 'image'),
+    ('accounts.UserProfile', 'profile_picture'),
+    ('mentorship.Mentor', 'mentor_picture'),
+    ('courses.Course', 'thumbnail'),
+    ('jobs.Job', 'company_logo'),
+    ('blog.BlogPost', 'featured_image'),
+]
+
+# Pillow format name and file extension per variant format
+VARIANT_FORMATS = {
+    'webp': ('WEBP', 'webp'),
+    'jpeg': ('JPEG', 'jpg'),
+}
+
+MANIFEST_CACHE_TIMEOUT = 60 * 60 * 24
+MISSING_CACHE_TIMEOUT = 60
+# Longest a generation may take before another worker may try the same image
+GENERATION_LOCK_TIMEOUT = 5 * 60
+# How long a failed image is served as-is before requests queue it again
+FAILED_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def variant_widths():
+    return tuple(getattr(settings, 'IMAGE_VARIANT_WIDTHS', (320, 640, 1280)))
+
+
+def variant_name(name, width, fmt):
+    stem = os.path.splitext(name)[0]
+    return f'variants/{width}/{stem}.{VARIANT_FORMATS[fmt][1]}'
+
+
+def manifest_name(name):
+    return f'variants/manifests/{name}.json'
+
+
+def _manifest_cache_key(name):
+    return f'image_variants:{name}'
+
+
+def _failed_cache_key(name):
+    return f'image_variants_failed:{name}'
+
+
+def variants_failed(name):
+    """Whether the last attempt to generate variants for ``name`` failed"""
+    return cache.get(_failed_cache_key(name)) is not None
+
+
+def get_manifest(name):
+    """Return the variant manifest for an uploaded file, or None if not generated yet.
+
+    The manifest maps each configured width to the width actually produced
+    (originals are never upscaled). It lives next to the variants in storage
+    and is cached, so rendering a page does not touch storage per image.
+    A manifest lacking one of the current IMAGE_VARIANT_WIDTHS counts as
+    missing, so the variants are generated again.
+    """
+    key = _manifest_cache_key(name)
+    manifest = cache.get(key)
+    if manifest is None:
+        manifest = False
+        path = manifest_name(name)
+        if default_storage.exists(path):
+            with default_storage.open(path) as f:
+                manifest = json.loads(f.read())
+        cache.set(key, manifest, MANIFEST_CACHE_TIMEOUT if manifest else MISSING_CACHE_TIMEOUT)
+    if not manifest or any(stored_variant_width(manifest, width) is None for width in variant_widths()):
+        return None
+    return manifest
+
+
+def stored_variant_width(manifest, width):
+    """The width directory holding the variant served for ``width``, or None"""
+    # Originals narrower than ``width`` share one variant across several widths
+    actual = min(width, manifest['width'])
+    return next((int(w) for w, produced in manifest['variants'].items() if produced == actual), None)
+
+
+def _save(path, content):
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    default_storage.save(path, ContentFile(content))
+
+
+def _encode(image, fmt):
+    from PIL import Image
+
+    pil_format = VARIANT_FORMATS[fmt][0]
+    if pil_format == 'JPEG' and image.mode == 'RGBA':
+        # JPEG has no alpha channel, so flatten onto white
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    buffer = io.BytesIO()
+    quality = getattr(settings, 'IMAGE_VARIANT_QUALITY', 80)
+    image.save(buffer, pil_format, quality=quality, optimize=pil_format == 'JPEG')
+    return buffer.getvalue()
+
+
+def generate_variants(name):
+    """Write WebP and JPEG variants of an uploaded image at each configured width"""
+    from PIL import Image, ImageOps
+
+    with default_storage.open(name) as f:
+        original = ImageOps.exif_transpose(Image.open(f))
+        original.load()
+
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if original.mode in ('LA', 'P', 'PA') else 'RGB')
+
+    manifest = {'width': original.width, 'height': original.height, 'variants': {}}
+    produced = {}
+    for width in variant_widths():
+        actual = min(width, original.width)
+        if actual in produced:
+            continue
+        resized = original.copy()
+        resized.thumbnail((actual, original.height), Image.LANCZOS)
+        for fmt in VARIANT_FORMATS:
+            _save(variant_name(name, width, fmt), _encode(resized, fmt))
+        produced[actual] = width
+        manifest['variants'][str(width)] = actual
+
+    _save(manifest_name(name), json.dumps(manifest).encode())
+    cache.set(_manifest_cache_key(name), manifest, MANIFEST_CACHE_TIMEOUT)
+    return manifest
+
+
+def ensure_variants(name, raise_errors=False):
+    """Generate variants for ``name`` unless they already exist, logging failures.
+
+    Only one process generates a given image at a time; the others get
+    None while it runs and keep serving the original. A failure is
+    remembered for FAILED_CACHE_TIMEOUT so pages and the on-demand view
+    stop queuing an image that cannot be decoded; with ``raise_errors``
+    it is also re-raised, so the task queue retries it.
+    """
+    manifest = get_manifest(name)
+    if manifest is not None:
+        return manifest
+    lock_key = f'image_variants_lock:{name}'
+    if not cache.add(lock_key, True, GENERATION_LOCK_TIMEOUT):
+        return None
+    try:
+        manifest = generate_variants(name)
+    except Exception as e:
+        logger.warning(f"Could not generate image variants for {name}: {str(e)}")
+        cache.set(_failed_cache_key(name), str(e), FAILED_CACHE_TIMEOUT)
+        if raise_errors:
+            raise
+        return None
+    finally:
+        cache.delete(lock_key)
+    cache.delete(_failed_cache_key(name))
+    return manifest
+
+
+def schedule_variants(name):
+    """Queue variant generation for the task worker.
+
+    Set IMAGE_VARIANTS_ASYNC = False to generate inline (tests, management
+    commands). A lost task is harmless: the first request for a missing
+    variant queues it again. Images whose generation failed are not queued
+    again until the failure is forgotten.
+    """
+    if variants_failed(name):
+        return None
+    if not getattr(settings, 'IMAGE_VARIANTS_ASYNC', True):
+        return ensure_variants(name)
+    from .tasks import build_image_variants
+    build_image_variants.delay(name)
+
+
+def variant_upload_prefixes():
+    """Upload directories of the image fields that get variants"""
+    from django.apps import apps
+
+    prefixes = set()
+    for label, field_name in IMAGE_VARIANT_FIELDS:
+        upload_to = apps.get_model(label)._meta.get_field(field_name).upload_to
+        if isinstance(upload_to, str):
+            prefixes.add(upload_to.rstrip('/') + '/')
+    return tuple(prefixes)
+
+
+def srcset_entries(fieldfile, fmt):
+    """(url, width) pairs for one format of an uploaded image, narrowest first.
+
+    Generated variants are linked straight from storage; until they exist the
+    URLs point at the on-demand view, which generates and redirects.
+    """
+    if not fieldfile:
+        return []
+    name = fieldfile.name
+    manifest = get_manifest(name)
+    if manifest:
+        return [
+            (default_storage.url(variant_name(name, width, fmt)), actual)
+            for width, actual in sorted(manifest['variants'].items(), key=lambda item: item[1])
+        ]
+    if variants_failed(name):
+        return []
+    return [(reverse('image_variant', args=[width, fmt, name]), width) for width in variant_widths()]
+
+
+def build_srcset(fieldfile, fmt, build_url=None):
+    """The ``srcset`` attribute value for one format, or '' without an image"""
+    return ', '.join(
+        f"{build_url(url) if build_url else url} {width}w"
+        for url, width in srcset_entries(fieldfile, fmt)
+    )
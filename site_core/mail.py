@@ -0,0 +1,140 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import QueuedEmail
+
+logger = logging.getLogger(__name__)
+
+SEND_BATCH_SIZE = 100
+
+
+def queue_email(subject, body, recipients, from_email=None, html_body=''):
+    """Add an email to the outbox instead of talking to SMTP in the request.
+
+    Like the notification outbox, the row commits or rolls back with the
+    caller's transaction, along with a task asking a worker to send it.
+    Returns None when there is nobody to send to.
+    """
+    from .tasks import deliver_queued_emails
+
+    recipients = [address for address in recipients if address]
+    if not recipients:
+        return None
+    queued = QueuedEmail.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        recipients=recipients,
+    )
+    deliver_queued_emails.delay()
+    return queued
+
+
+def retry_delay(attempts):
+    """Seconds to wait after the ``attempts``-th failure: base * 2^(attempts - 1), capped"""
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_SECONDS', 60)
+    return min(base * 2 ** (attempts - 1), getattr(settings, 'EMAIL_OUTBOX_MAX_RETRY_SECONDS', 6 * 60 * 60))
+
+
+def _build_message(queued, connection):
+    message = EmailMultiAlternatives(
+        subject=queued.subject,
+        body=queued.body,
+        from_email=queued.from_email,
+        to=queued.recipients,
+        connection=connection,
+    )
+    if queued.html_body:
+        message.attach_alternative(queued.html_body, 'text/html')
+    return message
+
+
+def _mark_failed(queued, error, max_attempts):
+    queued.attempts += 1
+    queued.last_error = str(error)
+    if queued.attempts >= max_attempts:
+        queued.status = 'failed'
+        logger.error(f"Giving up on email {queued.pk} after {queued.attempts} attempts: {str(error)}")
+    else:
+        queued.next_attempt_at = timezone.now() + timedelta(seconds=retry_delay(queued.attempts))
+    queued.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def claim_seconds():
+    """How long a worker has to deliver a claimed batch before others may retry it"""
+    return getattr(settings, 'EMAIL_OUTBOX_CLAIM_SECONDS', 10 * 60)
+
+
+def claim_queued_emails(batch_size=SEND_BATCH_SIZE):
+    """Take up to ``batch_size`` due emails for this worker.
+
+    The rows are locked only for the length of one short transaction, in
+    which their next attempt is pushed past the claim window; other workers
+    skip them until then, and if this one dies mid-batch the unsent rows
+    come due again by themselves.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            QueuedEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        QueuedEmail.objects.filter(pk__in=[queued.pk for queued in batch]).update(
+            next_attempt_at=now + timedelta(seconds=claim_seconds())
+        )
+    return batch
+
+
+def send_queued_emails(batch_size=SEND_BATCH_SIZE, max_attempts=None):
+    """Deliver due outbox emails, one batch per SMTP connection.
+
+    Each batch is claimed in its own short transaction and sent outside
+    it, so no database locks are held while talking to the mail server.
+    Every message is marked sent as soon as the server accepts it, so a
+    crash mid-batch only retries the ones that were not handed over. A
+    message the server rejects is rescheduled with exponential backoff
+    without failing the rest of the batch; if the connection itself cannot
+    be opened the whole batch is rescheduled. Returns ``(sent, failed)``
+    counts.
+    """
+    if max_attempts is None:
+        max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+
+    sent = failed = 0
+    while True:
+        batch = claim_queued_emails(batch_size)
+        if not batch:
+            break
+
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as e:
+            logger.warning(f"Could not connect to the mail server: {str(e)}")
+            for queued in batch:
+                _mark_failed(queued, e, max_attempts)
+            failed += len(batch)
+            break
+
+        try:
+            for queued in batch:
+                try:
+                    connection.send_messages([_build_message(queued, connection)])
+                except Exception as e:
+                    _mark_failed(queued, e, max_attempts)
+                    failed += 1
+                else:
+                    QueuedEmail.objects.filter(pk=queued.pk).update(status='sent', sent_at=timezone.now())
+                    sent += 1
+        finally:
+            connection.close()
+        if len(batch) < batch_size:
+            break
+    return sent, failed
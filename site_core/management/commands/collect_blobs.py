@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from site_core.storage import collect_garbage
+
+class Command(BaseCommand):
+    help = 'Recount references to content-addressed blobs and delete the ones nothing uses'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=int, default=24, help='Leave blobs touched more recently than this')
+        parser.add_argument('--workers', type=int, default=4, help='Parallel file deletions')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be removed without removing it')
+
+    def handle(self, *args, **options):
+        stats = collect_garbage(
+            grace_hours=options['grace_hours'], workers=options['workers'], dry_run=options['dry_run']
+        )
+        prefix = 'Would remove' if options['dry_run'] else f"Removed {stats['removed']} files;"
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {stats['orphans']} orphaned blobs and {stats['strays']} untracked files "
+            f"({stats['recounted']} reference counts corrected)"
+        ))
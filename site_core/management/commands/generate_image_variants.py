@@ -0,0 +1,29 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from site_core.images import IMAGE_VARIANT_FIELDS, ensure_variants, generate_variants
+
+class Command(BaseCommand):
+    help = 'Generate responsive variants for uploaded images that do not have them yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate variants that already exist')
+
+    def handle(self, *args, **options):
+        generated = failed = 0
+        for label, field_name in IMAGE_VARIANT_FIELDS:
+            names = (
+                apps.get_model(label)._default_manager
+                .exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                .values_list(field_name, flat=True).iterator()
+            )
+            for name in names:
+                try:
+                    manifest = generate_variants(name) if options['force'] else ensure_variants(name)
+                except Exception as e:
+                    self.stderr.write(f'{name}: {str(e)}')
+                    manifest = None
+                if manifest is None:
+                    failed += 1
+                else:
+                    generated += 1
+        self.stdout.write(self.style.SUCCESS(f'{generated} images ready, {failed} failed'))
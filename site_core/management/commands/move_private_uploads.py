@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from site_core.storage import move_public_uploads
+
+class Command(BaseCommand):
+    help = 'Move KYC documents, deposit proofs and product files from MEDIA_ROOT to PRIVATE_MEDIA_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Count the files without moving them')
+
+    def handle(self, *args, **options):
+        moved = move_public_uploads(dry_run=options['dry_run'])
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {moved} files to private storage"))
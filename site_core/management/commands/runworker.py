@@ -0,0 +1,93 @@
+import multiprocessing
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, connections
+from site_core.taskqueue import (
+    autodiscover_tasks, claim_task, purge_finished_tasks, requeue_stalled_tasks, run_task, worker_name,
+)
+
+MAINTENANCE_INTERVAL = 60
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queue', action='append', dest='queues', help='Queue to work on (repeatable, default: default)')
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes to fork')
+        parser.add_argument('--concurrency', type=int, default=1, help='Threads per worker process')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--burst', action='store_true', help='Exit once no task is due')
+
+    def handle(self, *args, **options):
+        autodiscover_tasks()
+        queues = options['queues'] or ['default']
+        self.stdout.write(
+            f"Working on {', '.join(queues)} with {options['processes']} process(es) "
+            f"x {options['concurrency']} thread(s)"
+        )
+        if options['processes'] <= 1:
+            self.run_process(queues, options['concurrency'], options['interval'], options['burst'])
+            return
+
+        # Children must not share the parent's database connections
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        children = [
+            context.Process(
+                target=self.run_process,
+                args=(queues, options['concurrency'], options['interval'], options['burst']),
+            )
+            for _ in range(options['processes'])
+        ]
+        for child in children:
+            child.start()
+        try:
+            for child in children:
+                child.join()
+        except KeyboardInterrupt:
+            for child in children:
+                child.terminate()
+            for child in children:
+                child.join()
+
+    def run_process(self, queues, concurrency, interval, burst):
+        stop = threading.Event()
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            # Finish the task in hand, then exit
+            signal.signal(signum, lambda *args: stop.set())
+
+        threads = [
+            threading.Thread(target=self.run_thread, args=(queues, worker_name(index), interval, burst, stop))
+            for index in range(concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+
+        last_maintenance = 0
+        while any(thread.is_alive() for thread in threads):
+            if time.monotonic() - last_maintenance >= MAINTENANCE_INTERVAL:
+                close_old_connections()
+                requeued, failed = requeue_stalled_tasks()
+                if requeued or failed:
+                    self.stdout.write(f'Requeued {requeued} stalled task(s), failed {failed}')
+                purge_finished_tasks()
+                last_maintenance = time.monotonic()
+            stop.wait(1)
+        connection.close()
+
+    def run_thread(self, queues, worker, interval, burst, stop):
+        try:
+            while not stop.is_set():
+                close_old_connections()
+                task_row = claim_task(queues, worker)
+                if task_row is None:
+                    if burst:
+                        break
+                    stop.wait(interval)
+                    continue
+                run_task(task_row)
+        finally:
+            connection.close()
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from site_core.mail import SEND_BATCH_SIZE, send_queued_emails
+
+class Command(BaseCommand):
+    help = 'Send queued emails in batches over one mail server connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SEND_BATCH_SIZE)
+        parser.add_argument('--max-attempts', type=int, default=None,
+                            help='Give up on a message after this many failures')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new emails')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            sent, failed = send_queued_emails(
+                batch_size=options['batch_size'],
+                max_attempts=options['max_attempts'],
+            )
+            if sent or failed:
+                self.stdout.write(f'Sent {sent} emails, {failed} failed')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
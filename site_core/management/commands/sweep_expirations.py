@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+from site_core.expiry import SWEEP_BATCH_SIZE, sweep_expired
+
+class Command(BaseCommand):
+    help = 'Move expired subscriptions, jobs, courses, promo codes, broadcasts and reset tokens to their expired state'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping periodically')
+        parser.add_argument('--interval', type=float, default=60.0, help='Seconds between sweeps with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            counts = sweep_expired(batch_size=options['batch_size'])
+            swept = {name: count for name, count in counts.items() if count}
+            if swept:
+                self.stdout.write('Expired ' + ', '.join(f'{count} {name}' for name, count in swept.items()))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.17 on 2026-10-19 17:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_core', '0004_remove_sitesetting_manual_payment_account_name_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastReadCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_until', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='adminnotification',
+            index=models.Index(fields=['is_active', 'end_date'], name='site_core_a_is_acti_d8ac1c_idx'),
+        ),
+        migrations.AddField(
+            model_name='broadcastreadcursor',
+            name='user',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='broadcast_cursor', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.17 on 2026-10-19 19:02
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def cursor_dates_to_ids(apps, schema_editor):
+    """Carry each date mark over as the newest broadcast it covered"""
+    AdminNotification = apps.get_model('site_core', 'AdminNotification')
+    BroadcastReadCursor = apps.get_model('site_core', 'BroadcastReadCursor')
+    for cursor in BroadcastReadCursor.objects.iterator():
+        latest = AdminNotification.objects.filter(start_date__lte=cursor.read_until).aggregate(latest=Max('id'))['latest']
+        cursor.read_through = latest or 0
+        cursor.save(update_fields=['read_through'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('site_core', '0008_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='broadcastreadcursor',
+            name='read_through',
+            field=models.BigIntegerField(default=0, help_text='Id of the newest broadcast read'),
+        ),
+        migrations.RunPython(cursor_dates_to_ids, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='broadcastreadcursor',
+            name='read_until',
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.db import models
 from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -104,6 +106,7 @@ class Category(models.Model):
     description = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Categories"
@@ -129,9 +132,174 @@ class AdminNotification(models.Model):
     end_date = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    BROADCASTS_CACHE_KEY = 'admin_notifications:live'
+    BROADCASTS_CACHE_TIMEOUT = 60
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['is_active', 'end_date']),
+        ]
+
     def __str__(self):
         return self.title
 
     def is_current(self):
         from django.utils import timezone
-        return self.is_active and self.start_date <= timezone.now() <= self.end_date
\ No newline at end of file
+        return self.is_active and self.start_date <= timezone.now() <= self.end_date
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        cache.delete(self.BROADCASTS_CACHE_KEY)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        cache.delete(self.BROADCASTS_CACHE_KEY)
+        return result
+
+    @classmethod
+    def current_broadcasts(cls):
+        """Broadcasts live right now, newest first.
+
+        Every user sees the same set, so it is loaded once and cached;
+        per-user read state comes from BroadcastReadCursor.
+        """
+        from django.utils import timezone
+        live = cache.get(cls.BROADCASTS_CACHE_KEY)
+        if live is None:
+            live = list(cls.objects.filter(
+                is_active=True, end_date__gte=timezone.now()
+            ).order_by('-start_date', '-id'))
+            cache.set(cls.BROADCASTS_CACHE_KEY, live, cls.BROADCASTS_CACHE_TIMEOUT)
+        now = timezone.now()
+        return [broadcast for broadcast in live if broadcast.start_date <= now <= broadcast.end_date]
+
+
+class BroadcastReadCursor(models.Model):
+    """How far a user has read through the admin broadcasts.
+
+    Read state is a single high-water mark on the broadcast id: every
+    broadcast created no later than ``read_through`` counts as read. Ids
+    follow creation order, unlike ``start_date`` which admins may backdate.
+    Announcing to all users is one AdminNotification insert and marking
+    everything read is one upsert.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='broadcast_cursor')
+    read_through = models.BigIntegerField(default=0, help_text="Id of the newest broadcast read")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} read through broadcast {self.read_through}"
+
+    @classmethod
+    def inbox_for(cls, user):
+        """Current broadcasts for ``user``, each with ``is_read`` set"""
+        broadcasts = AdminNotification.current_broadcasts()
+        if not broadcasts:
+            return []
+        read_through = cls.objects.filter(user=user).values_list('read_through', flat=True).first() or 0
+        for broadcast in broadcasts:
+            broadcast.is_read = broadcast.pk <= read_through
+        return broadcasts
+
+    @classmethod
+    def advance(cls, user, read_through):
+        """Move the user's high-water mark forward, never backwards"""
+        cursor, created = cls.objects.get_or_create(user=user, defaults={'read_through': read_through})
+        if not created and read_through > cursor.read_through:
+            cursor.read_through = read_through
+            cursor.save(update_fields=['read_through', 'updated_at'])
+        return cursor
+
+    @classmethod
+    def advance_to_latest(cls, user):
+        latest = AdminNotification.objects.aggregate(latest=models.Max('id'))['latest']
+        if latest is not None:
+            cls.advance(user, latest)
+
+class QueuedEmail(models.Model):
+    """Outbox row for an email that has not been handed to the mail server.
+
+    Requests only insert these; ``send_queued_emails`` delivers them in
+    batches over one SMTP connection and reschedules failures with
+    exponential backoff until ``EMAIL_OUTBOX_MAX_ATTEMPTS`` is reached.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='queued_email_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)}"
+
+
+class StoredBlob(models.Model):
+    """A file kept once by ContentAddressedStorage, with how many fields use it"""
+    name = models.CharField(max_length=255, unique=True)
+    digest = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['refcount', 'updated_at'], name='stored_blob_orphan_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} refs)"
+
+
+class Task(models.Model):
+    """A call to a ``@task`` function waiting for, or run by, ``runworker``"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    name = models.CharField(max_length=200)
+    queue = models.CharField(max_length=50, default='default')
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    unique_key = models.CharField(max_length=64, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['queue', 'status', 'run_at'], name='task_due_idx'),
+            models.Index(fields=['unique_key', 'status'], name='task_unique_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
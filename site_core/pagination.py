@@ -0,0 +1,247 @@
+import base64
+import hashlib
+import json
+import logging
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db import DatabaseError, connections
+from django.db.models import Q
+from django.db.models.query import QuerySet
+from django.http import QueryDict
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+
+class KeysetPage:
+    """A single page of a keyset-paginated queryset.
+
+    Exposes the parts of Django's Page API the list templates use, plus
+    ready-made query strings for the previous and next links.
+    """
+
+    def __init__(self, object_list, has_next, has_previous, next_query='', previous_query=''):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_query = next_query
+        self.previous_query = previous_query
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+
+class KeysetPaginator:
+    """Paginate a queryset by seeking past the last seen (created_at, id) pair.
+
+    Pages never run a COUNT(*) and never use OFFSET, so deep pages cost the
+    same as the first one. Rows are always ordered newest first with the
+    primary key as a tie-breaker, which keeps the ordering stable.
+    """
+
+    cursor_param = 'cursor'
+    direction_param = 'direction'
+
+    def __init__(self, queryset, per_page, keyset_fields=('created_at', 'id')):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.keyset_fields = tuple(keyset_fields)
+
+    def encode_cursor(self, obj):
+        values = []
+        for name in self.keyset_fields:
+            value = getattr(obj, name)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        raw = json.dumps(values, separators=(',', ':')).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Return the keyset values for a cursor, or None if it is malformed"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if len(values) != len(self.keyset_fields):
+                return None
+            opts = self.queryset.model._meta
+            return [
+                opts.get_field(name).to_python(value)
+                for name, value in zip(self.keyset_fields, values)
+            ]
+        except (ValueError, TypeError, ValidationError):
+            return None
+
+    def _seek(self, values, newer):
+        """Build the row-value comparison (a, b) < (x, y) as portable Q objects"""
+        lookup = 'gt' if newer else 'lt'
+        condition = Q()
+        for index, name in enumerate(self.keyset_fields):
+            step = Q(**{f'{name}__{lookup}': values[index]})
+            for previous_name, previous_value in zip(self.keyset_fields[:index], values[:index]):
+                step &= Q(**{previous_name: previous_value})
+            condition |= step
+        return condition
+
+    def _query_string(self, params, cursor, backwards):
+        query = params.copy() if params is not None else QueryDict(mutable=True)
+        for key in ('page', self.cursor_param, self.direction_param):
+            query.pop(key, None)
+        query[self.cursor_param] = cursor
+        if backwards:
+            query[self.direction_param] = 'prev'
+        return query.urlencode()
+
+    def get_page(self, cursor=None, direction=None, params=None):
+        values = self.decode_cursor(cursor) if cursor else None
+        backwards = values is not None and direction == 'prev'
+
+        descending = [f'-{name}' for name in self.keyset_fields]
+        ascending = list(self.keyset_fields)
+
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, newer=backwards))
+        queryset = queryset.order_by(*(ascending if backwards else descending))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+
+        next_query = self._query_string(params, self.encode_cursor(rows[-1]), False) if has_next and rows else ''
+        previous_query = self._query_string(params, self.encode_cursor(rows[0]), True) if has_previous and rows else ''
+
+        return KeysetPage(
+            rows,
+            has_next=bool(next_query),
+            has_previous=bool(previous_query),
+            next_query=next_query,
+            previous_query=previous_query,
+        )
+
+
+class KeysetPaginationMixin:
+    """Drop-in replacement for ListView's ``paginate_by`` page-number paging.
+
+    Templates receive ``page_obj`` with ``has_next``/``has_previous`` and the
+    ``next_query``/``previous_query`` strings to append after ``?``.
+    """
+
+    keyset_fields = ('created_at', 'id')
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, page_size, self.keyset_fields)
+        page = paginator.get_page(
+            cursor=self.request.GET.get(paginator.cursor_param),
+            direction=self.request.GET.get(paginator.direction_param),
+            params=self.request.GET,
+        )
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that stops paying for exact totals on large result sets.
+
+    Up to ``exact_count_threshold`` rows the count is exact, and finding that
+    out is a bounded ``COUNT`` over ``LIMIT threshold + 1``. Above it the total
+    comes from the PostgreSQL planner's row estimate, or from an exact count
+    cached for ``cache_timeout`` seconds on other backends. Templates can
+    check ``paginator.is_estimated`` to render "about N".
+    """
+
+    exact_count_threshold = 1000
+    cache_timeout = 300
+
+    def __init__(self, *args, exact_count_threshold=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if exact_count_threshold is not None:
+            self.exact_count_threshold = exact_count_threshold
+        self._is_estimated = False
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+
+        bounded = self.object_list[:self.exact_count_threshold + 1].count()
+        if bounded <= self.exact_count_threshold:
+            return bounded
+
+        self._is_estimated = True
+        estimate = self._planner_estimate()
+        if estimate is None:
+            estimate = self._cached_count()
+        return max(estimate, bounded)
+
+    @property
+    def is_estimated(self):
+        self.count
+        return self._is_estimated
+
+    def _planner_estimate(self):
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return None
+        try:
+            sql, params = self.object_list.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+                plan = cursor.fetchone()[0]
+        except DatabaseError as e:
+            logger.warning(f"Row estimate failed, falling back to cached count: {str(e)}")
+            return None
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+    def _cached_count(self):
+        query_hash = hashlib.md5(str(self.object_list.query).encode()).hexdigest()
+        key = f'estimated_count:{self.object_list.model._meta.label_lower}:{query_hash}'
+        return cache.get_or_set(key, self.object_list.count, self.cache_timeout)
+
+    def validate_number(self, number):
+        if not self.is_estimated:
+            return super().validate_number(number)
+        # An estimate may undershoot, so pages past it are not rejected
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.is_estimated:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(self.object_list[bottom:bottom + self.per_page], number, self)
+
+
+class EstimatedCountAdminMixin:
+    """Use estimated totals on admin changelists over large tables"""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
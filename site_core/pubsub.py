@@ -0,0 +1,142 @@
+import asyncio
+import queue
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class Subscription:
+    """One listener's view of a channel; read it with get() and close() it when done"""
+
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def get(self, timeout=None):
+        """Next message, or None if nothing arrived within ``timeout`` seconds"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def deliver(self, message):
+        """Called by the broker from the publishing thread; drops the message if the queue is full"""
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            pass
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class AsyncSubscription(Subscription):
+    """A Subscription read from an event loop: ``await get()`` parks no thread.
+
+    Publishers on other threads hand messages to the loop with
+    ``call_soon_threadsafe``, which feeds an ``asyncio.Queue``.
+    """
+
+    def __init__(self, broker, channel, maxsize, loop):
+        self.broker = broker
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    async def get(self, timeout=None):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+    def deliver(self, message):
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The loop has shut down; the stream is gone
+            pass
+
+
+class InProcessBroker:
+    """Fan-out publish/subscribe between threads of a single process.
+
+    Only reaches streams in the publishing process, so notifications sent
+    by the task worker are not pushed through it; streams pick those up by
+    re-reading their snapshot every LIVE_EVENTS_POLL_SECONDS. For instant
+    delivery across processes, point LIVE_EVENTS_BROKER at a class with
+    the same publish/subscribe/subscribe_async interface backed by a
+    shared broker. Slow subscribers drop messages rather than grow without
+    bound.
+    """
+
+    max_queue_size = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, channel):
+        return self._add(Subscription(self, channel, self.max_queue_size))
+
+    def subscribe_async(self, channel):
+        """Subscribe from a coroutine running on the current event loop"""
+        return self._add(AsyncSubscription(self, channel, self.max_queue_size, asyncio.get_running_loop()))
+
+    def _add(self, subscription):
+        with self._lock:
+            self._subscriptions[subscription.channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.deliver(message)
+        return len(subscriptions)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The process-wide broker named by LIVE_EVENTS_BROKER"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'LIVE_EVENTS_BROKER', 'site_core.pubsub.InProcessBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+def publish_to_user(user_id, event, data=None):
+    """Push an event to everyone listening on ``user_id``'s channel"""
+    return get_broker().publish(user_channel(user_id), {'event': event, 'data': data or {}})
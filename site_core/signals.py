@@ -0,0 +1,33 @@
+from functools import partial
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_save
+
+from .images import IMAGE_VARIANT_FIELDS, schedule_variants
+
+
+def queue_image_variants(sender, instance, update_fields=None, field_names=(), **kwargs):
+    """Generate responsive variants for newly saved images once the row commits"""
+    for field_name in field_names:
+        if update_fields is not None and field_name not in update_fields:
+            continue
+        fieldfile = getattr(instance, field_name)
+        if fieldfile:
+            transaction.on_commit(partial(schedule_variants, fieldfile.name))
+
+
+def connect_image_variant_signals():
+    fields_by_model = {}
+    for label, field_name in IMAGE_VARIANT_FIELDS:
+        fields_by_model.setdefault(apps.get_model(label), []).append(field_name)
+    for model, field_names in fields_by_model.items():
+        post_save.connect(
+            partial(queue_image_variants, field_names=tuple(field_names)),
+            sender=model,
+            weak=False,
+            dispatch_uid=f'image_variants_{model._meta.label_lower}',
+        )
+
+
+connect_image_variant_signals()
@@ -0,0 +1,126 @@
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from .pubsub import get_broker
+
+KEEPALIVE_SECONDS = 15
+# Streams end after this long and the browser reconnects, which bounds how
+# long a WSGI worker thread is held by one client
+STREAM_MAX_SECONDS = 300
+RECONNECT_MILLISECONDS = 3000
+
+
+def format_event(event, data):
+    payload = json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return f'event: {event}\ndata: {payload}\n\n'
+
+
+def poll_interval():
+    """Seconds between a stream's own re-reads of the snapshot (LIVE_EVENTS_POLL_SECONDS)"""
+    return getattr(settings, 'LIVE_EVENTS_POLL_SECONDS', 10)
+
+
+class _StreamState:
+    """What a stream last sent per event, so re-read snapshots only send changes"""
+
+    def __init__(self):
+        self.sent = {}
+        self.last_write = time.monotonic()
+        self.next_poll = time.monotonic() + poll_interval()
+
+    def send(self, pairs, only_changed=False):
+        chunks = []
+        for event, data in pairs:
+            if only_changed and self.sent.get(event) == data:
+                continue
+            self.sent[event] = data
+            chunks.append(format_event(event, data))
+        if chunks:
+            self.last_write = time.monotonic()
+        return chunks
+
+    def wait_timeout(self):
+        return max(0, min(KEEPALIVE_SECONDS, self.next_poll - time.monotonic()))
+
+    def poll_due(self):
+        if time.monotonic() < self.next_poll:
+            return False
+        self.next_poll = time.monotonic() + poll_interval()
+        return True
+
+    def keepalive_due(self):
+        if time.monotonic() - self.last_write < KEEPALIVE_SECONDS:
+            return False
+        self.last_write = time.monotonic()
+        return True
+
+
+def event_stream(channel, snapshot, expand):
+    """Yield server-sent events for everything published on ``channel``.
+
+    ``snapshot()`` returns the (event, data) pairs sent on connect and
+    ``expand(message)`` turns each published message into the pairs sent
+    to the browser. The snapshot is also re-read every poll interval and
+    any changed pairs are sent. Writes made by other processes (the task
+    worker, other web workers) therefore still arrive when the broker
+    cannot carry them across processes; a shared broker only makes them
+    arrive sooner.
+    """
+    subscription = get_broker().subscribe(channel)
+    deadline = time.monotonic() + STREAM_MAX_SECONDS
+    state = _StreamState()
+    try:
+        yield f'retry: {RECONNECT_MILLISECONDS}\n\n'
+        yield from state.send(snapshot())
+        while time.monotonic() < deadline:
+            message = subscription.get(timeout=state.wait_timeout())
+            if message is not None:
+                yield from state.send(expand(message))
+            if state.poll_due():
+                yield from state.send(snapshot(), only_changed=True)
+            if state.keepalive_due():
+                yield ': keepalive\n\n'
+    finally:
+        subscription.close()
+
+
+async def async_event_stream(channel, snapshot, expand):
+    """event_stream for ASGI servers, which wait on the event loop without holding a thread per client"""
+    subscription = get_broker().subscribe_async(channel)
+    deadline = time.monotonic() + STREAM_MAX_SECONDS
+    state = _StreamState()
+    try:
+        yield f'retry: {RECONNECT_MILLISECONDS}\n\n'
+        for chunk in state.send(await sync_to_async(snapshot)()):
+            yield chunk
+        while time.monotonic() < deadline:
+            message = await subscription.get(timeout=state.wait_timeout())
+            if message is not None:
+                for chunk in state.send(await sync_to_async(expand)(message)):
+                    yield chunk
+            if state.poll_due():
+                for chunk in state.send(await sync_to_async(snapshot)(), only_changed=True):
+                    yield chunk
+            if state.keepalive_due():
+                yield ': keepalive\n\n'
+    finally:
+        subscription.close()
+
+
+def stream_response(request, channel, snapshot, expand):
+    """StreamingHttpResponse of server-sent events, async under ASGI"""
+    if isinstance(request, ASGIRequest):
+        stream = async_event_stream(channel, snapshot, expand)
+    else:
+        stream = event_stream(channel, snapshot, expand)
+    response = StreamingHttpResponse(stream, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,281 @@
+import hashlib
+import os
+import tempfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+BLOB_PREFIX = 'cas'
+
+GC_BATCH_SIZE = 500
+
+
+def private_media_root():
+    """Directory for uploads that must never be served straight from MEDIA_ROOT"""
+    return getattr(settings, 'PRIVATE_MEDIA_ROOT', os.path.join(settings.BASE_DIR, 'private_media'))
+
+
+def private_media_url():
+    """URL prefix of the staff-only ``private_media`` view"""
+    return getattr(settings, 'PRIVATE_MEDIA_URL', '/private-media/')
+
+
+def blob_name(digest, extension):
+    """Storage name of a blob: cas/ab/cd/abcd…<ext>"""
+    return f'{BLOB_PREFIX}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Store each distinct upload once, under the SHA-256 of its bytes.
+
+    Uploads are hashed while they are streamed to a temporary file and
+    then moved to a path derived from the digest (keeping the extension so
+    content types still work). Saving bytes that are already stored only
+    bumps the blob's reference count in StoredBlob. ``delete()`` releases a
+    reference instead of removing the file; ``collect_blobs`` reconciles
+    counts with the rows that really point at each blob and removes
+    orphans.
+
+    Blobs hold KYC documents, deposit proofs and paid product files, so
+    they live under PRIVATE_MEDIA_ROOT rather than the public MEDIA_ROOT.
+    Their URLs point at the staff-only ``private_media`` view; buyers get
+    files through their own authorized views.
+    """
+
+    @cached_property
+    def base_location(self):
+        return self._value_or_setting(self._location, private_media_root())
+
+    @cached_property
+    def base_url(self):
+        return self._value_or_setting(self._base_url, private_media_url())
+
+    def _clear_cached_properties(self, setting, **kwargs):
+        super()._clear_cached_properties(setting, **kwargs)
+        if setting == 'PRIVATE_MEDIA_ROOT':
+            self.__dict__.pop('base_location', None)
+            self.__dict__.pop('location', None)
+        elif setting == 'PRIVATE_MEDIA_URL':
+            self.__dict__.pop('base_url', None)
+
+    def get_available_name(self, name, max_length=None):
+        # The final name depends on the content, so it is chosen in _save
+        return name
+
+    def _temp_dir(self):
+        path = self.path(f'{BLOB_PREFIX}/tmp')
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _hash_to_temp(self, content):
+        digest = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self._temp_dir())
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp.write(chunk)
+                    size += len(chunk)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return digest.hexdigest(), size, temp_path
+
+    def _hash_in_place(self, path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(64 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest(), os.path.getsize(path)
+
+    def _save(self, name, content):
+        from site_core.models import StoredBlob
+
+        extension = os.path.splitext(name)[1].lower()
+        if hasattr(content, 'temporary_file_path'):
+            # Already on local disk (large uploads): hash it there and move it
+            source = content.temporary_file_path()
+            digest, size = self._hash_in_place(source)
+        else:
+            digest, size, source = self._hash_to_temp(content)
+
+        name = blob_name(digest, extension)
+        full_path = self.path(name)
+        # The blob's row is claimed (and locked) before the file is looked
+        # at, so garbage collection cannot remove a file being reused
+        with transaction.atomic():
+            blob, created = StoredBlob.objects.select_for_update().get_or_create(
+                name=name, defaults={'digest': digest, 'size': size, 'refcount': 1}
+            )
+            if not created:
+                StoredBlob.objects.filter(pk=blob.pk).update(
+                    refcount=F('refcount') + 1, updated_at=timezone.now()
+                )
+            if os.path.exists(full_path):
+                # Already stored; the uploaded copy is not needed
+                os.remove(source)
+            else:
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                file_move_safe(source, full_path, allow_overwrite=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(full_path, self.file_permissions_mode)
+        return name
+
+    def delete(self, name):
+        """Release one reference; the file itself is removed by garbage collection"""
+        from site_core.models import StoredBlob
+
+        StoredBlob.objects.filter(name=name, refcount__gt=0).update(
+            refcount=F('refcount') - 1, updated_at=timezone.now()
+        )
+
+    def purge(self, name):
+        """Remove a blob's file; callers hold the lock on its StoredBlob row"""
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+
+content_addressed_storage = ContentAddressedStorage()
+
+
+def get_content_addressed_storage():
+    return content_addressed_storage
+
+
+def content_addressed_fields():
+    """(model, field name) for every file field stored by content address"""
+    from django.apps import apps
+    from django.db.models import FileField
+
+    return [
+        (model, field.name)
+        for model in apps.get_models()
+        for field in model._meta.get_fields()
+        if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def move_public_uploads(dry_run=False):
+    """Move files referenced by content-addressed fields out of MEDIA_ROOT.
+
+    Uploads saved before these fields became private (including ones named
+    before content addressing) still sit in the public media directory.
+    Returns how many files were (or would be) moved.
+    """
+    storage = content_addressed_storage
+    moved = 0
+    for model, field_name in content_addressed_fields():
+        names = (
+            model._default_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+            .values_list(field_name, flat=True).distinct().order_by()
+        )
+        for name in names.iterator():
+            public_path = os.path.join(settings.MEDIA_ROOT, name)
+            if '..' in name.split('/') or not os.path.isfile(public_path) or storage.exists(name):
+                continue
+            moved += 1
+            if not dry_run:
+                os.makedirs(os.path.dirname(storage.path(name)), exist_ok=True)
+                file_move_safe(public_path, storage.path(name))
+    return moved
+
+
+def count_blob_references():
+    """How many rows point at each blob, counted from the file fields themselves"""
+    references = Counter()
+    for model, field_name in content_addressed_fields():
+        rows = (
+            model._default_manager
+            .filter(**{f'{field_name}__startswith': f'{BLOB_PREFIX}/'})
+            .values(field_name).annotate(n=Count('pk')).order_by()
+        )
+        for row in rows:
+            references[row[field_name]] += row['n']
+    return references
+
+
+def collect_garbage(grace_hours=24, workers=4, dry_run=False):
+    """Reconcile blob reference counts and delete blobs nothing points at.
+
+    Reference counts kept by save/delete drift whenever rows are deleted
+    or files replaced without going through storage, so they are first
+    recounted from the file fields. Blobs at zero references, files with
+    no StoredBlob row and abandoned temporary files are then removed in
+    parallel. Anything touched within ``grace_hours`` is left alone so
+    uploads whose rows are not committed yet survive.
+
+    Each batch locks its blobs' rows (creating placeholder rows for
+    untracked files), keeps only those still at zero references, and
+    deletes their files before the lock is released. ``_save`` takes the
+    same row lock before reusing a file, so a blob is either reused or
+    removed, never reused and then removed.
+    """
+    from site_core.models import StoredBlob
+
+    storage = content_addressed_storage
+    cutoff = timezone.now() - timedelta(hours=grace_hours)
+    cutoff_timestamp = cutoff.timestamp()
+    references = count_blob_references()
+
+    stale = StoredBlob.objects.filter(updated_at__lt=cutoff)
+    changed, orphans = [], []
+    for blob in stale.only('id', 'name', 'refcount', 'updated_at').iterator():
+        if blob.refcount != references[blob.name]:
+            blob.refcount = references[blob.name]
+            changed.append(blob)
+        if blob.refcount == 0:
+            orphans.append(blob.name)
+
+    known = set(StoredBlob.objects.values_list('name', flat=True))
+    strays = []
+    root = storage.path(BLOB_PREFIX)
+    for directory, _, files in os.walk(root):
+        for filename in files:
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+            if name not in known and name not in references and os.path.getmtime(path) < cutoff_timestamp:
+                strays.append(name)
+
+    stats = {'recounted': len(changed), 'orphans': len(orphans), 'strays': len(strays), 'removed': 0}
+    if dry_run:
+        return stats
+
+    for blob in changed:
+        # Skipped if the blob was saved or released since it was read
+        StoredBlob.objects.filter(pk=blob.pk, updated_at=blob.updated_at).update(refcount=blob.refcount)
+
+    candidates = orphans + strays
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(candidates), GC_BATCH_SIZE):
+            batch = candidates[start:start + GC_BATCH_SIZE]
+            batch_strays = [name for name in batch if name not in known]
+            with transaction.atomic():
+                StoredBlob.objects.bulk_create(
+                    [StoredBlob(name=name, digest='', size=0, refcount=0) for name in batch_strays],
+                    ignore_conflicts=True,
+                )
+                doomed = list(
+                    StoredBlob.objects.select_for_update()
+                    .filter(
+                        Q(name__in=batch_strays) | Q(updated_at__lt=cutoff),
+                        name__in=batch, refcount=0,
+                    )
+                    .values_list('name', flat=True)
+                )
+                stats['removed'] += sum(executor.map(storage.purge, doomed))
+                StoredBlob.objects.filter(name__in=doomed).delete()
+    return stats
@@ -0,0 +1,241 @@
+import hashlib
+import json
+import logging
+import os
+import socket
+import traceback
+from datetime import datetime, timedelta
+from importlib import import_module
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Min, Q
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+CLAIM_CANDIDATES = 10
+
+_registry = {}
+
+
+class TaskFunction:
+    """A function that can also be queued with ``.delay()`` or ``.schedule()``.
+
+    Calling it directly still runs it inline. Arguments are stored as JSON,
+    so pass primary keys rather than model instances.
+    """
+
+    def __init__(self, func, name, queue, max_attempts, retry_seconds, unique):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.retry_seconds = retry_seconds
+        self.unique = unique
+        self.__doc__ = func.__doc__
+        self.__name__ = func.__name__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return self.schedule(None, *args, **kwargs)
+
+    def schedule(self, when, *args, **kwargs):
+        """Queue a call to run at ``when`` (a datetime, a timedelta or seconds from now).
+
+        The row commits or rolls back with the caller's transaction. With
+        ``unique=True`` a matching call that is still queued is reused
+        (and brought forward if this one is due sooner). With
+        TASK_QUEUE_EAGER the call runs once the transaction commits.
+        """
+        if getattr(settings, 'TASK_QUEUE_EAGER', False):
+            transaction.on_commit(lambda: self.func(*args, **kwargs))
+            return None
+
+        if when is None:
+            run_at = timezone.now()
+        elif isinstance(when, datetime):
+            run_at = when
+        else:
+            seconds = when.total_seconds() if isinstance(when, timedelta) else when
+            run_at = timezone.now() + timedelta(seconds=seconds)
+
+        unique_key = ''
+        if self.unique:
+            unique_key = hashlib.sha256(
+                json.dumps([self.name, args, kwargs], sort_keys=True, default=str).encode()
+            ).hexdigest()
+            existing = Task.objects.filter(unique_key=unique_key, status='queued').first()
+            if existing is not None:
+                if run_at < existing.run_at:
+                    Task.objects.filter(pk=existing.pk, status='queued').update(run_at=run_at)
+                return existing
+
+        return Task.objects.create(
+            name=self.name,
+            queue=self.queue,
+            args=list(args),
+            kwargs=kwargs,
+            unique_key=unique_key,
+            max_attempts=self.max_attempts,
+            run_at=run_at,
+        )
+
+
+def task(func=None, *, name=None, queue='default', max_attempts=3, retry_seconds=30, unique=False):
+    """Register a function as a background task.
+
+    Failed runs are retried up to ``max_attempts`` times, waiting
+    ``retry_seconds * 2^(attempt - 1)`` (capped by
+    TASK_QUEUE_MAX_RETRY_SECONDS) between tries. ``unique`` collapses
+    identical calls that are still waiting into one run.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__qualname__}'
+        wrapped = TaskFunction(func, task_name, queue, max_attempts, retry_seconds, unique)
+        _registry[task_name] = wrapped
+        return wrapped
+
+    return decorator(func) if func is not None else decorator
+
+
+def autodiscover_tasks():
+    """Import each installed app's ``tasks`` module so its tasks are registered"""
+    for app_config in apps.get_app_configs():
+        try:
+            import_module(f'{app_config.name}.tasks')
+        except ModuleNotFoundError as e:
+            if e.name != f'{app_config.name}.tasks':
+                raise
+
+
+def get_task(name):
+    if name not in _registry:
+        autodiscover_tasks()
+    return _registry.get(name)
+
+
+def retry_delay(attempts, base):
+    """Seconds to wait after the ``attempts``-th failure: base * 2^(attempts - 1), capped"""
+    return min(base * 2 ** (attempts - 1), getattr(settings, 'TASK_QUEUE_MAX_RETRY_SECONDS', 60 * 60))
+
+
+def worker_name(index=0):
+    return f'{socket.gethostname()}:{os.getpid()}:{index}'
+
+
+def requeue_stalled_tasks():
+    """Give tasks held by a worker that died another try, or fail them if they are out of tries"""
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'TASK_QUEUE_LOCK_TIMEOUT', 10 * 60))
+    stalled = Task.objects.filter(status='running', locked_at__lt=cutoff)
+    failed = stalled.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', finished_at=timezone.now(), last_error='Worker stopped while running the task'
+    )
+    requeued = stalled.update(status='queued', locked_by='', locked_at=None)
+    return requeued, failed
+
+
+def claim_task(queues, worker):
+    """Lock the next due task for ``worker``, or return None when nothing is due.
+
+    A task is claimed with a conditional UPDATE, so when several workers
+    pick the same candidate only one of them gets it.
+    """
+    now = timezone.now()
+    candidates = list(
+        Task.objects.filter(queue__in=queues, status='queued', run_at__lte=now)
+        .order_by('run_at', 'id').values_list('id', flat=True)[:CLAIM_CANDIDATES]
+    )
+    for pk in candidates:
+        claimed = Task.objects.filter(pk=pk, status='queued').update(
+            status='running', locked_by=worker, locked_at=now, started_at=now, attempts=F('attempts') + 1
+        )
+        if claimed:
+            return Task.objects.get(pk=pk)
+    return None
+
+
+def run_task(task_row):
+    """Run a claimed task and record the outcome. Returns True if it succeeded."""
+    task_function = get_task(task_row.name)
+    try:
+        if task_function is None:
+            raise LookupError(f'No task named {task_row.name} is registered')
+        task_function.func(*task_row.args, **task_row.kwargs)
+    except Exception as e:
+        now = timezone.now()
+        update = {'last_error': traceback.format_exc(), 'locked_by': '', 'locked_at': None}
+        if task_function is None or task_row.attempts >= task_row.max_attempts:
+            update.update(status='failed', finished_at=now)
+            logger.error(f"Task {task_row.pk} ({task_row.name}) failed after {task_row.attempts} attempts: {str(e)}")
+        else:
+            delay = retry_delay(task_row.attempts, task_function.retry_seconds)
+            update.update(status='queued', run_at=now + timedelta(seconds=delay))
+            logger.warning(f"Task {task_row.pk} ({task_row.name}) failed, retrying in {delay}s: {str(e)}")
+        Task.objects.filter(pk=task_row.pk).update(**update)
+        return False
+
+    Task.objects.filter(pk=task_row.pk).update(
+        status='done', finished_at=timezone.now(), last_error='', locked_by='', locked_at=None
+    )
+    return True
+
+
+def run_pending_tasks(queues=('default',), worker=None, limit=None):
+    """Run due tasks until none are left (or ``limit`` have run). Returns (succeeded, failed)."""
+    worker = worker or worker_name()
+    succeeded = failed = 0
+    while limit is None or succeeded + failed < limit:
+        close_old_connections()
+        task_row = claim_task(queues, worker)
+        if task_row is None:
+            break
+        if run_task(task_row):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
+
+
+def purge_finished_tasks(hours=None):
+    """Delete finished tasks older than TASK_QUEUE_RETENTION_HOURS; failed ones are kept for review"""
+    if hours is None:
+        hours = getattr(settings, 'TASK_QUEUE_RETENTION_HOURS', 24)
+    deleted, _ = Task.objects.filter(
+        status='done', finished_at__lt=timezone.now() - timedelta(hours=hours)
+    ).delete()
+    return deleted
+
+
+def queue_stats(window_hours=1):
+    """Depth and latency per queue for the admin.
+
+    ``oldest_due`` is how long the longest-waiting due task has waited and
+    ``avg_wait`` is the mean delay between a task falling due and a worker
+    starting it, over tasks started in the last ``window_hours``.
+    """
+    now = timezone.now()
+    rows = Task.objects.values('queue').annotate(
+        due=Count('id', filter=Q(status='queued', run_at__lte=now)),
+        scheduled=Count('id', filter=Q(status='queued', run_at__gt=now)),
+        running=Count('id', filter=Q(status='running')),
+        failed=Count('id', filter=Q(status='failed')),
+        oldest_due_at=Min('run_at', filter=Q(status='queued', run_at__lte=now)),
+    ).order_by('queue')
+    waits = dict(
+        Task.objects.filter(started_at__gte=now - timedelta(hours=window_hours))
+        .values('queue')
+        .annotate(avg_wait=Avg(ExpressionWrapper(F('started_at') - F('run_at'), output_field=DurationField())))
+        .order_by().values_list('queue', 'avg_wait')
+    )
+    stats = []
+    for row in rows:
+        row['oldest_due'] = now - row.pop('oldest_due_at') if row['oldest_due_at'] else None
+        row['avg_wait'] = waits.get(row['queue'])
+        stats.append(row)
+    return stats
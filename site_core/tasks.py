@@ -0,0 +1,15 @@
+from .images import ensure_variants
+from .mail import send_queued_emails
+from .taskqueue import task
+
+
+@task(unique=True, max_attempts=5)
+def deliver_queued_emails():
+    """Send whatever is due in the email outbox"""
+    return send_queued_emails()
+
+
+@task(unique=True, max_attempts=3, retry_seconds=60)
+def build_image_variants(name):
+    """Generate responsive variants for one uploaded image; failures raise so they are retried"""
+    return ensure_variants(name, raise_errors=True)
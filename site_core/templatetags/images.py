@@ -0,0 +1,27 @@
+from django import template
+from django.utils.html import format_html
+
+from site_core.images import build_srcset
+
+register = template.Library()
+
+
+@register.simple_tag
+def srcset(image, fmt='jpeg'):
+    """``srcset`` value for an ImageField file, e.g. {% srcset product.thumbnail 'webp' %}"""
+    return build_srcset(image, fmt)
+
+
+@register.simple_tag
+def responsive_image(image, alt='', css_class='', sizes='100vw'):
+    """A <picture> offering WebP variants with a JPEG fallback, lazily loaded"""
+    if not image:
+        return ''
+    return format_html(
+        '<picture>'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy" decoding="async">'
+        '</picture>',
+        build_srcset(image, 'webp'), sizes,
+        image.url, build_srcset(image, 'jpeg'), sizes, alt, css_class,
+    )
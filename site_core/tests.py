@@ -1,3 +1,509 @@
-from django.test import TestCase
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
+from django.core.cache import cache
 
-# Create your tests here.
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, RequestFactory, override_settings
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from blog.models import BlogPost, BlogComment
+from .images import build_srcset, ensure_variants, get_manifest
+from .mail import queue_email, send_queued_emails
+from .models import AdminNotification, BroadcastReadCursor, QueuedEmail, StoredBlob, Task
+from .pagination import KeysetPaginator, EstimatedCountPaginator
+from .expiry import sweep_expired
+from .pubsub import InProcessBroker
+from .storage import collect_garbage, content_addressed_storage
+from .taskqueue import run_pending_tasks, task
+
+User = get_user_model()
+
+class KeysetPaginatorTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='testpass123'
+        )
+        self.posts = [
+            BlogPost.objects.create(title=f'Post {i}', content='Body', author=author, status='published')
+            for i in range(5)
+        ]
+        self.factory = RequestFactory()
+    
+    def get_page(self, query=''):
+        request = self.factory.get('/blog/?' + query)
+        paginator = KeysetPaginator(BlogPost.objects.all(), 2)
+        return paginator.get_page(
+            cursor=request.GET.get('cursor'),
+            direction=request.GET.get('direction'),
+            params=request.GET,
+        )
+    
+    def test_walks_forward_and_back_without_overlap(self):
+        newest_first = [post.pk for post in reversed(self.posts)]
+        
+        first = self.get_page('search=x')
+        self.assertEqual([post.pk for post in first], newest_first[:2])
+        self.assertFalse(first.has_previous())
+        self.assertIn('search=x', first.next_query)
+        
+        second = self.get_page(first.next_query)
+        self.assertEqual([post.pk for post in second], newest_first[2:4])
+        
+        last = self.get_page(second.next_query)
+        self.assertEqual([post.pk for post in last], newest_first[4:])
+        self.assertFalse(last.has_next())
+        
+        back = self.get_page(last.previous_query)
+        self.assertEqual([post.pk for post in back], newest_first[2:4])
+    
+    def test_malformed_cursor_falls_back_to_first_page(self):
+        page = self.get_page('cursor=not-a-cursor')
+        self.assertEqual(len(page), 2)
+        self.assertFalse(page.has_previous())
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def setUp(self):
+        for i in range(5):
+            User.objects.create_user(username=f'user{i}', password='testpass123')
+    
+    def test_exact_count_below_threshold(self):
+        paginator = EstimatedCountPaginator(User.objects.order_by('id'), 2, exact_count_threshold=10)
+        self.assertEqual(paginator.count, 5)
+        self.assertFalse(paginator.is_estimated)
+    
+    def test_estimated_count_above_threshold(self):
+        paginator = EstimatedCountPaginator(User.objects.order_by('id'), 2, exact_count_threshold=3)
+        self.assertTrue(paginator.is_estimated)
+        self.assertGreaterEqual(paginator.count, 4)
+        self.assertEqual(len(paginator.get_page(3).object_list), 1)
+
+
+class ConditionalDetailTests(TestCase):
+    def setUp(self):
+        self.author = get_user_model().objects.create_user(username='author', password='testpass123')
+        self.post = BlogPost.objects.create(title='Post', content='Body', author=self.author, status='published')
+    
+    def test_repeat_view_is_not_modified_and_still_counted(self):
+        url = reverse('blog_detail', args=[self.post.slug])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.views_count, 2)
+    
+    def test_new_comment_changes_etag(self):
+        url = reverse('blog_detail', args=[self.post.slug])
+        etag = self.client.get(url)['ETag']
+        BlogComment.objects.create(post=self.post, author=self.author, content='Nice')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class BroadcastReadCursorTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username='reader', password='testpass123')
+        now = timezone.now()
+        self.older = AdminNotification.objects.create(
+            title='Maintenance', message='Tonight', notification_type='info',
+            start_date=now - timedelta(days=2), end_date=now + timedelta(days=1)
+        )
+        self.newer = AdminNotification.objects.create(
+            title='New feature', message='Try it', notification_type='success',
+            start_date=now - timedelta(hours=1), end_date=now + timedelta(days=1)
+        )
+    
+    def test_broadcasts_merge_into_inbox_without_per_user_rows(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('notifications_list'))
+        self.assertEqual([b.title for b in response.context['broadcasts']], ['New feature', 'Maintenance'])
+        self.assertEqual(response.context['unread_count'], 2)
+        self.assertFalse(BroadcastReadCursor.objects.exists())
+    
+    def test_read_state_is_a_high_water_mark(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('mark_broadcast_read', args=[self.older.pk]))
+        read = {b.title: b.is_read for b in BroadcastReadCursor.inbox_for(self.user)}
+        self.assertEqual(read, {'Maintenance': True, 'New feature': False})
+        
+        self.client.post(reverse('mark_all_notifications_read'))
+        self.assertTrue(all(b.is_read for b in BroadcastReadCursor.inbox_for(self.user)))
+        self.assertEqual(BroadcastReadCursor.objects.count(), 1)
+    
+    def test_backdated_broadcast_after_mark_all_read_is_unread(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse('mark_all_notifications_read'))
+        backdated = AdminNotification.objects.create(
+            title='Late notice', message='Posted late', notification_type='warning', show_popup=True,
+            start_date=timezone.now() - timedelta(days=3), end_date=timezone.now() + timedelta(days=1)
+        )
+        read = {b.pk: b.is_read for b in BroadcastReadCursor.inbox_for(self.user)}
+        self.assertEqual(read, {self.newer.pk: True, self.older.pk: True, backdated.pk: False})
+        response = self.client.get(reverse('notifications_list'))
+        self.assertEqual(response.context['unread_count'], 1)
+
+
+class QueuedEmailTests(TestCase):
+    def test_password_reset_only_queues_the_email(self):
+        User.objects.create_user(
+            username='reset', password='testpass123', email='reset@example.com',
+            first_name='Ada', last_name='Lovelace'
+        )
+        response = self.client.post(reverse('password_reset_request'), {
+            'first_name': 'ada', 'last_name': 'lovelace', 'email': 'reset@example.com'
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(len(mail.outbox), 0)
+        queued = QueuedEmail.objects.get()
+        self.assertEqual(queued.recipients, ['reset@example.com'])
+        self.assertIn('/accounts/password-reset/confirm/', queued.body)
+        
+        self.assertEqual(send_queued_emails(), (1, 0))
+        self.assertEqual(mail.outbox[0].to, ['reset@example.com'])
+        self.assertEqual(QueuedEmail.objects.get().status, 'sent')
+    
+    def test_rejected_message_backs_off_without_failing_the_batch(self):
+        queue_email('First', 'body', ['first@example.com'])
+        queue_email('Second', 'body', ['second@example.com'])
+        original = EmailBackend.send_messages
+        
+        def reject_first(backend, messages):
+            if messages[0].subject == 'First':
+                raise ConnectionError('mailbox unavailable')
+            return original(backend, messages)
+        
+        with mock.patch.object(EmailBackend, 'send_messages', reject_first):
+            self.assertEqual(send_queued_emails(max_attempts=2), (1, 1))
+        
+        first = QueuedEmail.objects.get(subject='First')
+        self.assertEqual((first.status, first.attempts), ('pending', 1))
+        self.assertGreater(first.next_attempt_at, timezone.now())
+        # Not due yet, so a second run does nothing
+        self.assertEqual(send_queued_emails(), (0, 0))
+    
+    def test_crash_mid_batch_keeps_delivered_messages_sent(self):
+        queue_email('First', 'body', ['first@example.com'])
+        queue_email('Second', 'body', ['second@example.com'])
+        original = EmailBackend.send_messages
+        
+        def crash_on_second(backend, messages):
+            if messages[0].subject == 'Second':
+                raise SystemExit('worker killed')
+            return original(backend, messages)
+        
+        with mock.patch.object(EmailBackend, 'send_messages', crash_on_second):
+            with self.assertRaises(SystemExit):
+                send_queued_emails()
+        
+        self.assertEqual(QueuedEmail.objects.get(subject='First').status, 'sent')
+        second = QueuedEmail.objects.get(subject='Second')
+        self.assertEqual(second.status, 'pending')
+        # Claimed, so it only comes due again once the claim window has passed
+        self.assertEqual(send_queued_emails(), (0, 0))
+        QueuedEmail.objects.filter(pk=second.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(send_queued_emails(), (1, 0))
+        self.assertEqual([message.subject for message in mail.outbox], ['First', 'Second'])
+
+
+def make_png(width, height):
+    from PIL import Image
+    buffer = io.BytesIO()
+    Image.new('RGBA', (width, height), (200, 30, 30, 128)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class PubSubTests(SimpleTestCase):
+    def test_async_subscribers_wait_on_the_event_loop(self):
+        broker = InProcessBroker()
+        
+        async def listen():
+            subscription = broker.subscribe_async('room')
+            try:
+                # Published from another thread, as a sync view would
+                threading.Timer(0.05, broker.publish, args=('room', {'event': 'hello'})).start()
+                return await subscription.get(timeout=5), await subscription.get(timeout=0.01)
+            finally:
+                subscription.close()
+        
+        self.assertEqual(asyncio.run(listen()), ({'event': 'hello'}, None))
+        self.assertEqual(broker.publish('room', {}), 0)
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(
+            MEDIA_ROOT=self.media_root, IMAGE_VARIANT_WIDTHS=(320, 640, 1280), IMAGE_VARIANTS_ASYNC=False
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.user = User.objects.create_user(username='pictured', password='testpass123')
+    
+    def test_upload_generates_variants_without_upscaling(self):
+        profile = self.user.profile
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.profile_picture = SimpleUploadedFile('me.png', make_png(800, 400), content_type='image/png')
+            profile.save()
+        
+        manifest = get_manifest(profile.profile_picture.name)
+        self.assertEqual(manifest['variants'], {'320': 320, '640': 640, '1280': 800})
+        srcset = build_srcset(profile.profile_picture, 'webp')
+        self.assertTrue(srcset.endswith('.webp 800w'))
+        self.assertIn('/media/variants/320/profile_pics/', srcset)
+    
+    def test_existing_image_is_generated_on_first_request(self):
+        name = default_storage.save('blog_images/legacy.png', SimpleUploadedFile('legacy.png', make_png(500, 500)))
+        image = SimpleNamespace(name=name)
+        self.assertIn('/media-variants/320/jpeg/blog_images/legacy.png 320w', build_srcset(image, 'jpeg'))
+        
+        # 640 and 1280 both collapse onto the 500px original width
+        response = self.client.get(reverse('image_variant', args=[1280, 'jpeg', name]))
+        self.assertRedirects(response, '/media/variants/640/blog_images/legacy.jpg', fetch_redirect_response=False)
+        self.assertTrue(build_srcset(image, 'jpeg').endswith('/media/variants/640/blog_images/legacy.jpg 500w'))
+    
+    def test_manifest_from_other_widths_is_regenerated(self):
+        name = default_storage.save('blog_images/resized.png', SimpleUploadedFile('resized.png', make_png(2000, 100)))
+        with override_settings(IMAGE_VARIANT_WIDTHS=(320, 640)):
+            self.client.get(reverse('image_variant', args=[320, 'webp', name]))
+        
+        response = self.client.get(reverse('image_variant', args=[1280, 'webp', name]))
+        self.assertRedirects(response, '/media/variants/1280/blog_images/resized.webp', fetch_redirect_response=False)
+    
+    def test_public_requests_queue_generation_and_serve_the_original(self):
+        name = default_storage.save('blog_images/queued.png', SimpleUploadedFile('queued.png', make_png(400, 400)))
+        with override_settings(IMAGE_VARIANTS_ASYNC=True), \
+                mock.patch('site_core.tasks.build_image_variants.delay') as delay:
+            response = self.client.get(reverse('image_variant', args=[320, 'webp', name]))
+        self.assertRedirects(response, '/media/blog_images/queued.png', fetch_redirect_response=False)
+        delay.assert_called_once_with(name)
+        self.assertIsNone(get_manifest(name))
+    
+    def test_concurrent_generation_runs_once(self):
+        name = default_storage.save('blog_images/busy.png', SimpleUploadedFile('busy.png', make_png(400, 400)))
+        cache.add(f'image_variants_lock:{name}', True)
+        self.addCleanup(cache.delete, f'image_variants_lock:{name}')
+        with mock.patch('site_core.images.generate_variants') as generate:
+            self.assertIsNone(ensure_variants(name))
+        generate.assert_not_called()
+    
+    def test_undecodable_image_is_retried_by_the_queue_then_served_as_is(self):
+        from .tasks import build_image_variants
+        name = default_storage.save('blog_images/broken.png', SimpleUploadedFile('broken.png', b'not a png'))
+        self.addCleanup(cache.delete, f'image_variants_failed:{name}')
+        with self.assertRaises(Exception):
+            build_image_variants(name)
+        
+        image = SimpleNamespace(name=name)
+        self.assertEqual(build_srcset(image, 'webp'), '')
+        with override_settings(IMAGE_VARIANTS_ASYNC=True), \
+                mock.patch('site_core.tasks.build_image_variants.delay') as delay:
+            response = self.client.get(reverse('image_variant', args=[320, 'webp', name]))
+        self.assertRedirects(response, '/media/blog_images/broken.png', fetch_redirect_response=False)
+        delay.assert_not_called()
+    
+    def test_private_uploads_are_not_exposed(self):
+        name = default_storage.save('kyc_documents/id.png', SimpleUploadedFile('id.png', make_png(100, 100)))
+        response = self.client.get(reverse('image_variant', args=[320, 'webp', name]))
+        self.assertEqual(response.status_code, 404)
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.private_root = tempfile.mkdtemp()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media_root, PRIVATE_MEDIA_ROOT=self.private_root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root)
+        self.addCleanup(shutil.rmtree, self.private_root)
+        self.user = User.objects.create_user(username='depositor', password='testpass123')
+    
+    def make_deposit(self, filename):
+        from payments.models import ManualDeposit
+        return ManualDeposit.objects.create(
+            user=self.user, amount=5000, depositor_name='Depositor', deposit_date=timezone.now(),
+            screenshot=SimpleUploadedFile(filename, make_png(50, 50), content_type='image/png'),
+        )
+    
+    def test_identical_uploads_share_one_blob(self):
+        first = self.make_deposit('receipt.png')
+        retry = self.make_deposit('receipt (1).PNG')
+        
+        self.assertEqual(first.screenshot.name, retry.screenshot.name)
+        self.assertTrue(first.screenshot.name.startswith('cas/'))
+        self.assertEqual(StoredBlob.objects.get(name=first.screenshot.name).refcount, 2)
+        with first.screenshot.open('rb') as f:
+            self.assertEqual(f.read(), make_png(50, 50))
+    
+    def test_blobs_are_kept_out_of_public_media(self):
+        deposit = self.make_deposit('receipt.png')
+        name = deposit.screenshot.name
+        self.assertTrue(os.path.exists(os.path.join(self.private_root, name)))
+        self.assertEqual(os.listdir(self.media_root), [])
+        self.assertEqual(deposit.screenshot.url, f'/private-media/{name}')
+        
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(deposit.screenshot.url).status_code, 302)
+        staff = User.objects.create_user(username='reviewer', password='testpass123', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(deposit.screenshot.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), make_png(50, 50))
+    
+    def test_garbage_collection_recounts_and_removes_orphans(self):
+        first = self.make_deposit('receipt.png')
+        retry = self.make_deposit('receipt.png')
+        name = first.screenshot.name
+        # Deleting rows does not go through storage, so the count drifts
+        first.delete()
+        
+        stats = collect_garbage(grace_hours=0, workers=2)
+        self.assertEqual((stats['recounted'], stats['removed']), (1, 0))
+        self.assertEqual(StoredBlob.objects.get(name=name).refcount, 1)
+        
+        retry.delete()
+        self.assertEqual(collect_garbage(grace_hours=0, dry_run=True)['orphans'], 1)
+        self.assertTrue(content_addressed_storage.exists(name))
+        stats = collect_garbage(grace_hours=0, workers=2)
+        self.assertEqual(stats['removed'], 1)
+        self.assertFalse(content_addressed_storage.exists(name))
+        self.assertFalse(StoredBlob.objects.filter(name=name).exists())
+    
+    def test_blob_reused_during_collection_survives(self):
+        first = self.make_deposit('receipt.png')
+        name = first.screenshot.name
+        first.delete()
+        StoredBlob.objects.filter(name=name).update(refcount=0)
+        
+        class ReuseFirst(ThreadPoolExecutor):
+            # The same bytes are uploaded after orphans are listed, before they are removed
+            def __init__(inner, *args, **kwargs):
+                self.reused = self.make_deposit('again.png')
+                super().__init__(*args, **kwargs)
+        
+        with mock.patch('site_core.storage.ThreadPoolExecutor', ReuseFirst):
+            stats = collect_garbage(grace_hours=0, workers=2)
+        self.assertEqual((stats['orphans'], stats['removed']), (1, 0))
+        self.assertEqual(self.reused.screenshot.name, name)
+        self.assertTrue(content_addressed_storage.exists(name))
+        self.assertEqual(StoredBlob.objects.get(name=name).refcount, 1)
+
+
+task_calls = []
+
+
+@task(unique=True)
+def record_call(value):
+    task_calls.append(value)
+
+
+@task(max_attempts=2, retry_seconds=60)
+def always_fails():
+    raise RuntimeError('upstream is down')
+
+
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        task_calls.clear()
+    
+    def test_queued_calls_run_in_the_worker(self):
+        first = record_call.delay(1)
+        self.assertEqual(record_call.delay(1).pk, first.pk)
+        record_call.schedule(timedelta(hours=1), 2)
+        
+        self.assertEqual(run_pending_tasks(), (1, 0))
+        self.assertEqual(task_calls, [1])
+        self.assertEqual(Task.objects.get(pk=first.pk).status, 'done')
+        self.assertEqual(Task.objects.filter(status='queued').count(), 1)
+    
+    def test_failures_retry_with_backoff_then_fail(self):
+        queued = always_fails.delay()
+        self.assertEqual(run_pending_tasks(), (0, 1))
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('queued', 1))
+        self.assertGreater(queued.run_at, timezone.now() + timedelta(seconds=50))
+        
+        Task.objects.filter(pk=queued.pk).update(run_at=timezone.now())
+        run_pending_tasks()
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), ('failed', 2))
+        self.assertIn('upstream is down', queued.last_error)
+    
+    def test_admin_shows_queue_stats(self):
+        User.objects.create_superuser(username='boss', email='boss@example.com', password='testpass123')
+        self.client.login(username='boss', password='testpass123')
+        record_call.delay(3)
+        response = self.client.get(reverse('admin:site_core_task_changelist'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['queue_stats'][0]['due'], 1)
+
+
+class ExpirationSweepTests(TestCase):
+    def setUp(self):
+        from jobs.models import Job
+        from pricing.models import SubscriptionPlan, SubscriptionPurchase
+        from accounts.models import PasswordResetToken
+        from .models import Category
+
+        self.user = User.objects.create_user(username='sweeper', password='testpass123')
+        now = timezone.now()
+        category = Category.objects.create(name='Engineering', category_type='job')
+        job_fields = dict(
+            description='Build things', category=category, job_type='full_time', location='Lagos',
+            company_name='Acme', salary_min=100, salary_max=200, posted_by=self.user, status='approved',
+        )
+        self.open_job = Job.objects.create(title='Open', deadline=now + timedelta(days=3), **job_fields)
+        self.closed_job = Job.objects.create(title='Closed', deadline=now + timedelta(days=3), **job_fields)
+        Job.objects.filter(pk=self.closed_job.pk).update(deadline=now - timedelta(hours=1))
+
+        plan = SubscriptionPlan.objects.create(name='pro', price=1000, duration_days=30)
+        self.subscription = SubscriptionPurchase.objects.create(
+            user=self.user, plan=plan, amount_paid=1000, status='active',
+            start_date=now - timedelta(days=31), end_date=now - timedelta(days=1),
+        )
+        PasswordResetToken.objects.create(user=self.user, expires_at=now - timedelta(minutes=5))
+        self.live_token = PasswordResetToken.objects.create(user=self.user, expires_at=now + timedelta(minutes=55))
+
+    def test_sweep_moves_expired_rows_in_bulk(self):
+        from accounts.models import PasswordResetToken
+
+        counts = sweep_expired(batch_size=1)
+        self.assertEqual((counts['jobs'], counts['subscriptions'], counts['password reset tokens']), (1, 1, 1))
+
+        self.closed_job.refresh_from_db()
+        self.assertEqual((self.closed_job.status, self.closed_job.spots_left), ('expired', 0))
+        self.open_job.refresh_from_db()
+        self.assertEqual(self.open_job.status, 'approved')
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.status, 'expired')
+        self.assertEqual(list(PasswordResetToken.objects.values_list('pk', flat=True)), [self.live_token.pk])
+        self.assertEqual(sum(sweep_expired().values()), 0)
+
+    def test_swept_job_is_no_longer_served_from_cache(self):
+        url = reverse('job_detail', args=[self.closed_job.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        sweep_expired()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_job_list_hides_expired_jobs_before_the_sweep(self):
+        response = self.client.get(reverse('jobs_list'))
+        self.assertEqual([job.pk for job in response.context['jobs']], [self.open_job.pk])
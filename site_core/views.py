@@ -14,13 +14,25 @@ from accounts.models import User, UserProfile
 from payments.models import Transaction
 from affiliates.models import Referral, AffiliateSale
 from .models import SiteSetting, Category, AdminNotification
+from .pagination import EstimatedCountPaginator
 from .forms import SiteSettingForm, CategoryForm, AdminNotificationForm
-from payments.monnify_service import MonnifyService
 from django.db import transaction
-from accounts.models import KYCVerification, VirtualAccount, User
-from .models import MonnifyBank
+from accounts.models import KYCVerification, User
+from accounts.tasks import approve_kyc_with_virtual_accounts
 from payments.models import PaymentMethod, ManualDeposit
 from payments.forms import PaymentMethodForm
+from transactions.forms import AdminTransactionFilterForm
+from transactions.exports import ADMIN_TRANSACTION_COLUMNS, EXPORT_FORMATS, stream_transactions
+from django.http import HttpResponseBadRequest, Http404
+from django.core.files.storage import default_storage
+from django.db.models.fields.files import FieldFile
+from types import SimpleNamespace
+from .downloads import serve_protected_file
+from .storage import BLOB_PREFIX, get_content_addressed_storage
+from .images import (
+    VARIANT_FORMATS, get_manifest, schedule_variants, stored_variant_width, variant_name,
+    variant_upload_prefixes, variant_widths,
+)
 
 
 
@@ -212,7 +224,7 @@ def kyc_management(request):
         rejected=Count('id', filter=Q(status='rejected'))
     )
 
-    paginator = Paginator(kyc_list, 15)
+    paginator = EstimatedCountPaginator(kyc_list, 15)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
 
@@ -234,44 +246,9 @@ def kyc_detail(request, kyc_id):
         action = request.POST.get('action')
         
         if action == 'approve' and kyc.status == 'pending':
-            # --- VIRTUAL ACCOUNT CREATION LOGIC ---
-            monnify_service = MonnifyService()
-            kyc_data = {
-                'legal_first_name': kyc.legal_first_name,
-                'legal_last_name': kyc.legal_last_name,
-            }
-            
-            # Use all active banks if user has no preference, otherwise use their preferences
-            preferred_banks = list(kyc.user.bank_preferences.filter(is_active=True).values_list('bank__bank_code', flat=True))
-            if not preferred_banks:
-                 preferred_banks = list(MonnifyBank.objects.filter(is_active=True).values_list('bank_code', flat=True))
-
-
-            account_data, error = monnify_service.create_reserved_account(kyc.user, kyc_data, preferred_banks)
-
-            if account_data and account_data.get('accounts'):
-                # Delete old accounts if any, to prevent duplicates on re-approval
-                VirtualAccount.objects.filter(user=kyc.user).delete()
-
-                for account in account_data['accounts']:
-                    VirtualAccount.objects.create(
-                        user=kyc.user,
-                        account_number=account['accountNumber'], # 823]
-                        account_name=account['accountName'], # 823]
-                        bank_name=account['bankName'], # 823]
-                        bank_code=account['bankCode'], # 824]
-                        reference=account_data['accountReference'] # 824]
-                    )
-                
-                kyc.status = 'approved' # 825]
-                kyc.rejection_reason = '' # Clear any previous rejection reason
-                kyc.monnify_customer_reference = account_data.get('customerReference', '') # 825]
-                kyc.reviewed_at = timezone.now() # 825]
-                kyc.reviewed_by = request.user # 825]
-                kyc.save()
-                messages.success(request, f"KYC for {kyc.user.username} has been approved and virtual accounts have been created.")
-            else:
-                messages.error(request, f"Failed to create virtual accounts for {kyc.user.username}: {error}")
+            # Monnify calls are slow, so accounts are created by the task worker
+            approve_kyc_with_virtual_accounts.delay(kyc.pk, request.user.pk)
+            messages.success(request, f"KYC approval for {kyc.user.username} is queued; virtual accounts will be created shortly.")
 
         elif action == 'reject' and kyc.status == 'pending':
             reason = request.POST.get('rejection_reason', 'No reason provided.')
@@ -293,7 +270,7 @@ def kyc_detail(request, kyc_id):
 
 @staff_member_required
 def user_management(request):
-    users = User.objects.select_related('profile').all()
+    users = User.objects.select_related('profile').order_by('-date_joined')
     
     # Filters
     search = request.GET.get('search', '')
@@ -312,7 +289,7 @@ def user_management(request):
     elif status == 'inactive':
         users = users.filter(is_active=False)
     
-    paginator = Paginator(users, 20)
+    paginator = EstimatedCountPaginator(users, 20)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
@@ -421,10 +398,22 @@ def financial_management(request):
         'deposit_requests': deposit_requests,
         'total_earnings': total_earnings,
         'manual_deposit_requests': manual_deposit_requests, # Pass this to the template
-
+        'export_form': AdminTransactionFilterForm(),
     }
     return render(request, 'admin_panel/financial_management.html', context)
 
+@staff_member_required
+def export_transactions(request):
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest('Unsupported export format')
+    
+    form = AdminTransactionFilterForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest('Invalid export filters')
+    transactions = form.filter_queryset(Transaction.objects.all())
+    return stream_transactions(transactions, export_format, 'all-transactions', columns=ADMIN_TRANSACTION_COLUMNS)
+
 @staff_member_required
 def process_transaction(request, transaction_id, action):
     transaction = get_object_or_404(Transaction, id=transaction_id)
@@ -563,4 +552,37 @@ def moderation_panel(request):
         'pending_blog_posts': pending_blog_posts,
     }
     
-    return render(request, 'admin_panel/moderation.html', context)
\ No newline at end of file
+    return render(request, 'admin_panel/moderation.html', context)
+
+def image_variant(request, width, fmt, name):
+    """Redirect to an image variant in storage, or to the original until it is generated.
+
+    Missing variants are handed to the task worker (see ``schedule_variants``)
+    rather than generated in the request.
+    """
+    if width not in variant_widths() or fmt not in VARIANT_FORMATS:
+        raise Http404('Unknown image variant')
+    # Only public upload directories, never KYC documents or deposit screenshots
+    if '..' in name.split('/') or not name.startswith(variant_upload_prefixes()):
+        raise Http404('Unknown image')
+    if not default_storage.exists(name):
+        raise Http404('Image not found')
+    
+    manifest = get_manifest(name) or schedule_variants(name)
+    if manifest is None:
+        return redirect(default_storage.url(name))
+    stored_width = stored_variant_width(manifest, width)
+    if stored_width is None:
+        raise Http404('Unknown image variant')
+    return redirect(default_storage.url(variant_name(name, stored_width, fmt)))
+
+
+@staff_member_required
+def private_media(request, name):
+    """Show a private upload (KYC document, deposit proof, product file) to staff reviewing it"""
+    storage = get_content_addressed_storage()
+    if '..' in name.split('/') or not name.startswith(f'{BLOB_PREFIX}/') or not storage.exists(name):
+        raise Http404('File not found')
+    # Not tied to one model field, so wrap the name the way a file field would
+    fieldfile = FieldFile(None, SimpleNamespace(storage=storage), name)
+    return serve_protected_file(request, fieldfile, as_attachment=False)
@@ -1,8 +1,9 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, NotificationEvent, NotificationArchive
+from site_core.pagination import EstimatedCountAdminMixin
 
 @admin.register(Notification)
-class NotificationAdmin(admin.ModelAdmin):
+class NotificationAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'title', 'notification_type', 'is_read', 'created_at')
     list_filter = ('notification_type', 'is_read', 'created_at')
     search_fields = ('user__username', 'title', 'message')
@@ -12,4 +13,18 @@ class NotificationAdmin(admin.ModelAdmin):
     def mark_as_read(self, request, queryset):
         updated = queryset.update(is_read=True)
         self.message_user(request, f'{updated} notifications marked as read.')
-    mark_as_read.short_description = "Mark selected notifications as read"
\ No newline at end of file
+    mark_as_read.short_description = "Mark selected notifications as read"
+
+@admin.register(NotificationEvent)
+class NotificationEventAdmin(admin.ModelAdmin):
+    list_display = ('user', 'title', 'notification_type', 'created_at')
+    list_filter = ('notification_type',)
+    raw_id_fields = ('user',)
+
+
+@admin.register(NotificationArchive)
+class NotificationArchiveAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
+    list_display = ('user', 'title', 'notification_type', 'created_at', 'archived_at')
+    list_filter = ('notification_type',)
+    search_fields = ('user__username', 'title')
+    raw_id_fields = ('user',)
@@ -1,14 +1,14 @@
-from .models import Notification
+from site_core.models import BroadcastReadCursor
+from .live import stream_enabled, unread_count
 
 def notifications_context(request):
-    """Add notification count to template context"""
+    """Add notification count and live admin broadcasts to template context"""
     if request.user.is_authenticated:
-        unread_count = Notification.objects.filter(
-            user=request.user, 
-            is_read=False
-        ).count()
+        broadcasts = BroadcastReadCursor.inbox_for(request.user)
         return {
-            'unread_notifications_count': unread_count
+            'unread_notifications_count': unread_count(request.user, broadcasts),
+            'admin_notifications': broadcasts,
+            'live_events_stream': stream_enabled(),
         }
     return {
         'unread_notifications_count': 0
@@ -0,0 +1,80 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# (header, lookup) pairs read with values_list so rows never become model instances
+TRANSACTION_COLUMNS = [
+    ('reference', 'reference'),
+    ('created_at', 'created_at'),
+    ('completed_at', 'completed_at'),
+    ('transaction_type', 'transaction_type'),
+    ('status', 'status'),
+    ('amount', 'amount'),
+    ('currency', 'currency'),
+    ('payment_method', 'payment_method__name'),
+    ('description', 'description'),
+]
+
+ADMIN_TRANSACTION_COLUMNS = [
+    ('user_id', 'user_id'),
+    ('username', 'user__username'),
+    ('email', 'user__email'),
+] + TRANSACTION_COLUMNS
+
+EXPORT_CHUNK_SIZE = 2000
+
+# Leading characters that make spreadsheet apps read a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def escape_formula(value):
+    """Quote user-supplied text (usernames, descriptions) so spreadsheets show it instead of evaluating it"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _csv_rows(headers, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([escape_formula(value) for value in row])
+
+
+def _ndjson_rows(headers, rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(headers, row))) + '\n'
+
+
+def stream_transactions(queryset, export_format, filename, columns=TRANSACTION_COLUMNS):
+    """Stream a Transaction queryset as CSV or NDJSON in constant memory.
+
+    Rows are read oldest first through ``iterator(chunk_size=...)``, which
+    uses a server-side cursor where the database supports one, and each
+    row is written out as soon as it is fetched.
+    """
+    headers = [header for header, _ in columns]
+    rows = queryset.order_by('created_at', 'id').values_list(
+        *(lookup for _, lookup in columns)
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    content = _csv_rows(headers, rows) if export_format == 'csv' else _ndjson_rows(headers, rows)
+    response = StreamingHttpResponse(content, content_type=EXPORT_FORMATS[export_format])
+    stamp = timezone.now().strftime('%Y%m%d')
+    response['Content-Disposition'] = f'attachment; filename="{filename}-{stamp}.{export_format}"'
+    return response
@@ -1,4 +1,5 @@
 from django import forms
+from django.db.models import Q
 from payments.models import Transaction
 
 class TransactionFilterForm(forms.Form):
@@ -22,4 +23,35 @@ class TransactionFilterForm(forms.Form):
     transaction_type = forms.ChoiceField(choices=TRANSACTION_TYPES, required=False)
     status = forms.ChoiceField(choices=STATUS_CHOICES, required=False)
     start_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
-    end_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
\ No newline at end of file
+    end_date = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    
+    def filter_queryset(self, queryset):
+        """Apply the cleaned filters to a Transaction queryset"""
+        if not self.is_valid():
+            return queryset
+        
+        transaction_type = self.cleaned_data.get('transaction_type')
+        status = self.cleaned_data.get('status')
+        start_date = self.cleaned_data.get('start_date')
+        end_date = self.cleaned_data.get('end_date')
+        
+        if transaction_type:
+            queryset = queryset.filter(transaction_type=transaction_type)
+        if status:
+            queryset = queryset.filter(status=status)
+        if start_date:
+            queryset = queryset.filter(created_at__date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(created_at__date__lte=end_date)
+        return queryset
+
+class AdminTransactionFilterForm(TransactionFilterForm):
+    transaction_type = forms.ChoiceField(choices=[('', 'All Types')] + Transaction.TRANSACTION_TYPES, required=False)
+    user = forms.CharField(required=False)
+    
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.is_valid() and self.cleaned_data.get('user'):
+            user = self.cleaned_data['user']
+            queryset = queryset.filter(Q(user__username__iexact=user) | Q(user__email__iexact=user))
+        return queryset
@@ -0,0 +1,55 @@
+from django.conf import settings
+
+from payments.models import Transaction
+from site_core.models import BroadcastReadCursor
+from .models import Notification
+
+
+def stream_enabled():
+    """Whether browsers hold a server-sent event stream open (LIVE_EVENTS_STREAM).
+
+    Off by default: under WSGI every open stream holds a worker for up to
+    STREAM_MAX_SECONDS, so it is meant for ASGI deployments. Otherwise
+    pages poll ``notification_poll``.
+    """
+    return getattr(settings, 'LIVE_EVENTS_STREAM', False)
+
+
+def serialize_notification(notification):
+    return {
+        'id': notification.id,
+        'title': notification.title,
+        'message': notification.message,
+        'notification_type': notification.notification_type,
+        'created_at': notification.created_at,
+    }
+
+
+def unread_count(user, broadcasts=None):
+    """Unread notifications plus unread admin broadcasts, as shown on the badge"""
+    if broadcasts is None:
+        broadcasts = BroadcastReadCursor.inbox_for(user)
+    unread_broadcasts = sum(not broadcast.is_read for broadcast in broadcasts)
+    return Notification.objects.filter(user=user, is_read=False).count() + unread_broadcasts
+
+
+def snapshot(user):
+    """Events describing the user's current state, sent when a stream opens"""
+    return [
+        ('unread_count', {'count': unread_count(user)}),
+        ('balance', {'balance': Transaction.get_user_balance(user)}),
+    ]
+
+
+def expand(user, message):
+    """Turn a published message into the events sent to the browser.
+
+    Publishers only say what changed; counts and balances are read here,
+    once per listening user, so writers never pay for them.
+    """
+    event, data = message['event'], message['data']
+    if event == 'notification':
+        return [('notification', data), ('unread_count', {'count': unread_count(user)})]
+    if event == 'balance':
+        return [('balance', {'balance': Transaction.get_user_balance(user)})]
+    return [(event, data)]
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from transactions.retention import RETENTION_BATCH_SIZE, archive_read_notifications
+
+class Command(BaseCommand):
+    help = 'Move old read notifications into the archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Archive read notifications older than this (default NOTIFICATION_RETENTION_DAYS or 90)')
+        parser.add_argument('--batch-size', type=int, default=RETENTION_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        archived = archive_read_notifications(days=options['days'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Archived {archived} notifications'))
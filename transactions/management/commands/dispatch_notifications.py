@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+from transactions.outbox import DISPATCH_BATCH_SIZE, dispatch_notifications
+
+class Command(BaseCommand):
+    help = 'Deliver queued notification events in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=DISPATCH_BATCH_SIZE)
+        parser.add_argument('--digest-threshold', type=int, default=None,
+                            help='Send one digest when a user has this many events in a batch')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new events')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            dispatched = dispatch_notifications(
+                batch_size=options['batch_size'],
+                digest_threshold=options['digest_threshold'],
+            )
+            if dispatched:
+                self.stdout.write(f'Dispatched {dispatched} notification events')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
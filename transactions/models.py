@@ -20,10 +20,62 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Unread counts and unread filters
+            models.Index(fields=['user', 'is_read', 'created_at']),
+            # Newest-first inbox pages
+            models.Index(fields=['user', 'created_at']),
+            # Retention sweeps over old read rows
+            models.Index(fields=['is_read', 'created_at']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.title}"
 
     def mark_as_read(self):
         self.is_read = True
-        self.save()
\ No newline at end of file
+        self.save()
+
+class NotificationEvent(models.Model):
+    """Outbox row for a notification that has not been delivered yet.
+
+    Events are written in the same database transaction as the change that
+    caused them and turned into Notification rows in batches by
+    ``dispatch_notifications``, which deletes them once delivered.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notification_events')
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    related_object_id = models.PositiveIntegerField(null=True, blank=True)
+    related_content_type = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.user_id} - {self.title}"
+
+
+
+class NotificationArchive(models.Model):
+    """Read notifications moved out of the inbox table by the retention sweep.
+
+    Only what is needed to show or audit an old notification is kept.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_notifications')
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES)
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.title}"
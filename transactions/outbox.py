@@ -0,0 +1,119 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from site_core.pubsub import publish_to_user
+from .live import serialize_notification
+from .models import Notification, NotificationEvent
+
+DISPATCH_BATCH_SIZE = 500
+
+
+def enqueue_notification(user, notification_type, title, message, related_object=None):
+    """Append a notification to the outbox.
+
+    The event commits or rolls back with the caller's transaction, so a
+    notification is only ever delivered for changes that were saved. A
+    task worker delivers it shortly after.
+    """
+    from .tasks import deliver_notifications
+
+    event = NotificationEvent.objects.create(
+        user=user,
+        notification_type=notification_type,
+        title=title,
+        message=message,
+        related_object_id=related_object.pk if related_object is not None else None,
+        related_content_type=related_object._meta.label_lower if related_object is not None else '',
+    )
+    deliver_notifications.delay()
+    return event
+
+
+def enqueue_notifications(items):
+    """Append many notifications with one insert.
+
+    ``items`` are ``(user_id, notification_type, title, message,
+    related_object)`` tuples; related_object may be None.
+    """
+    from .tasks import deliver_notifications
+
+    events = NotificationEvent.objects.bulk_create([
+        NotificationEvent(
+            user_id=user_id,
+            notification_type=notification_type,
+            title=title,
+            message=message,
+            related_object_id=related_object.pk if related_object is not None else None,
+            related_content_type=related_object._meta.label_lower if related_object is not None else '',
+        )
+        for user_id, notification_type, title, message, related_object in items
+    ])
+    if events:
+        deliver_notifications.delay()
+    return events
+
+
+def _build_notifications(events, digest_threshold):
+    groups = defaultdict(list)
+    for event in events:
+        groups[(event.user_id, event.notification_type)].append(event)
+
+    notifications = []
+    for (user_id, notification_type), group in groups.items():
+        if digest_threshold and len(group) >= digest_threshold:
+            notifications.append(Notification(
+                user_id=user_id,
+                notification_type=notification_type,
+                title=f"{len(group)} new {group[0].get_notification_type_display().lower()} updates",
+                message='\n'.join(f"{event.title}: {event.message}" for event in group),
+            ))
+            continue
+        notifications.extend(
+            Notification(
+                user_id=event.user_id,
+                notification_type=event.notification_type,
+                title=event.title,
+                message=event.message,
+                related_object_id=event.related_object_id,
+                related_content_type=event.related_content_type,
+            )
+            for event in group
+        )
+    return notifications
+
+
+def _publish(notifications):
+    """Tell live streams about delivered notifications, one message per user"""
+    by_user = defaultdict(list)
+    for notification in notifications:
+        by_user[notification.user_id].append(serialize_notification(notification))
+    for user_id, items in by_user.items():
+        publish_to_user(user_id, 'notification', {'notifications': items})
+
+
+def dispatch_notifications(batch_size=DISPATCH_BATCH_SIZE, digest_threshold=None):
+    """Deliver pending outbox events as Notification rows, one batch at a time.
+
+    Each batch is a single bulk_create plus a single delete. When a user
+    has ``digest_threshold`` or more events of one type in a batch they
+    get one digest notification instead. Concurrent dispatchers skip rows
+    another dispatcher has locked. Returns the number of events consumed.
+    """
+    if digest_threshold is None:
+        digest_threshold = getattr(settings, 'NOTIFICATION_DIGEST_THRESHOLD', None)
+
+    dispatched = 0
+    while True:
+        with transaction.atomic():
+            events = list(NotificationEvent.objects.select_for_update(skip_locked=True).order_by('id')[:batch_size])
+            if not events:
+                break
+            notifications = Notification.objects.bulk_create(_build_notifications(events, digest_threshold))
+            NotificationEvent.objects.filter(pk__in=[event.pk for event in events]).delete()
+        _publish(notifications)
+        dispatched += len(events)
+        if len(events) < batch_size:
+            break
+    return dispatched
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification, NotificationArchive
+
+RETENTION_BATCH_SIZE = 1000
+
+
+def archive_read_notifications(days=None, batch_size=RETENTION_BATCH_SIZE):
+    """Move read notifications older than ``days`` into NotificationArchive.
+
+    Works in batches of ``batch_size`` rows, each copied with one
+    bulk_create and removed with one DELETE in its own transaction, so
+    the inbox table is never locked for long. Returns the number of
+    notifications archived.
+    """
+    if days is None:
+        days = getattr(settings, 'NOTIFICATION_RETENTION_DAYS', 90)
+    cutoff = timezone.now() - timedelta(days=days)
+    stale = Notification.objects.filter(is_read=True, created_at__lt=cutoff).order_by('created_at', 'id')
+
+    archived = 0
+    while True:
+        with transaction.atomic():
+            rows = list(stale.values_list('id', 'user_id', 'notification_type', 'title', 'message', 'created_at')[:batch_size])
+            if not rows:
+                break
+            NotificationArchive.objects.bulk_create(
+                NotificationArchive(
+                    user_id=user_id,
+                    notification_type=notification_type,
+                    title=title,
+                    message=message,
+                    created_at=created_at,
+                )
+                for _, user_id, notification_type, title, message, created_at in rows
+            )
+            Notification.objects.filter(id__in=[row[0] for row in rows]).delete()
+        archived += len(rows)
+        if len(rows) < batch_size:
+            break
+    return archived
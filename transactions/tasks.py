@@ -0,0 +1,9 @@
+from site_core.taskqueue import task
+
+from .outbox import dispatch_notifications
+
+
+@task(unique=True, max_attempts=5, retry_seconds=10)
+def deliver_notifications():
+    """Turn pending outbox events into notifications"""
+    return dispatch_notifications()
@@ -1,3 +1,198 @@
-from django.test import TestCase
+import json
+from unittest import mock
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from payments.models import Transaction
+from datetime import timedelta
+from django.utils import timezone
+from .models import Notification, NotificationEvent, NotificationArchive
+from .retention import archive_read_notifications
+from site_core.models import AdminNotification
+from site_core.pubsub import publish_to_user
+from .outbox import dispatch_notifications
+
+User = get_user_model()
+
+class TransactionExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='payer', email='payer@example.com', password='testpass123')
+        other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        for i, status in enumerate(['completed', 'pending', 'completed']):
+            Transaction.objects.create(
+                user=self.user, transaction_type='add_money', amount=Decimal('100.50'),
+                status=status, reference=f'REF-{i}', description=f'Deposit, #{i}'
+            )
+        Transaction.objects.create(
+            user=other, transaction_type='add_money', amount=Decimal('5.00'),
+            status='completed', reference='REF-OTHER', description='Not yours'
+        )
+    
+    def test_csv_export_streams_own_filtered_rows(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('transactions_export'), {'format': 'csv', 'status': 'completed'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('reference,created_at'))
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], ['REF-0', 'REF-2'])
+        self.assertIn('"Deposit, #0"', lines[1])
+    
+    def test_ndjson_export(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('transactions_export'), {'format': 'ndjson'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['amount'], '100.50')
+    
+    def test_admin_export_requires_staff(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('export_transactions'))
+        self.assertEqual(response.status_code, 302)
+        
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('export_transactions'), {'user': 'other@example.com'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('REF-OTHER', lines[1])
+
+    
+    def test_invalid_filters_do_not_export_everything(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('transactions_export'), {'status': 'bogus'})
+        self.assertEqual(response.status_code, 400)
+        
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get(reverse('export_transactions'), {'start_date': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+    
+    def test_csv_cells_are_not_read_as_formulas(self):
+        Transaction.objects.filter(reference='REF-0').update(description='=HYPERLINK("http://evil.example")')
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('transactions_export'), {'format': 'csv'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertIn('"\'=HYPERLINK(""http://evil.example"")"', lines[1])
+
+class NotificationOutboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='payer', email='payer@example.com', password='testpass123')
+    
+    def create_transactions(self, count):
+        for i in range(count):
+            Transaction.objects.create(
+                user=self.user, transaction_type='add_money', amount=Decimal('10.00'),
+                reference=f'OUT-{i}', description='Deposit'
+            )
+    
+    def test_saves_only_append_events(self):
+        self.create_transactions(2)
+        self.assertEqual(NotificationEvent.objects.count(), 2)
+        self.assertFalse(Notification.objects.exists())
+        
+        with self.assertNumQueries(5):
+            # savepoint, select batch, bulk insert, delete, release
+            self.assertEqual(dispatch_notifications(), 2)
+        self.assertEqual(Notification.objects.filter(user=self.user, title='Money Added').count(), 2)
+        self.assertFalse(NotificationEvent.objects.exists())
+    
+    def test_inbox_shows_queued_events_without_dispatching(self):
+        self.create_transactions(1)
+        self.client.force_login(self.user)
+        with mock.patch('transactions.views.deliver_notifications.delay') as delay:
+            response = self.client.get(reverse('notifications_list'))
+        self.assertContains(response, 'Money Added')
+        delay.assert_called_once_with()
+        self.assertTrue(NotificationEvent.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+    
+    def test_digest_coalesces_a_burst(self):
+        self.create_transactions(4)
+        dispatch_notifications(digest_threshold=3)
+        notification = Notification.objects.get(user=self.user)
+        self.assertEqual(notification.title, '4 new transaction updates')
+        self.assertEqual(len(notification.message.splitlines()), 4)
+
+
+class NotificationRetentionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='testpass123')
+    
+    def test_old_read_notifications_move_to_archive(self):
+        for i, is_read in enumerate([True, True, False, True]):
+            Notification.objects.create(user=self.user, notification_type='system', title=f'N{i}', message='m', is_read=is_read)
+        old = timezone.now() - timedelta(days=120)
+        Notification.objects.filter(title__in=['N0', 'N1', 'N2']).update(created_at=old)
+        
+        self.assertEqual(archive_read_notifications(days=90, batch_size=1), 2)
+        self.assertEqual(set(Notification.objects.values_list('title', flat=True)), {'N2', 'N3'})
+        self.assertEqual(set(NotificationArchive.objects.values_list('title', flat=True)), {'N0', 'N1'})
+        self.assertEqual(NotificationArchive.objects.get(title='N0').created_at, old)
+    
+    def test_inbox_pages_with_cursor(self):
+        for i in range(25):
+            Notification.objects.create(user=self.user, notification_type='system', title=f'N{i}', message='m')
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('notifications_list'))
+        page = response.context['page_obj']
+        self.assertEqual(len(page), 20)
+        response = self.client.get(reverse('notifications_list') + '?' + page.next_query)
+        self.assertEqual(len(response.context['page_obj']), 5)
+
+
+class LiveEventTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='live', password='testpass123')
+        self.client.force_login(self.user)
+    
+    def test_stream_is_off_unless_enabled(self):
+        self.assertEqual(self.client.get(reverse('notification_stream')).status_code, 204)
+        # Pages poll instead of opening a stream
+        self.assertContains(self.client.get(reverse('notifications_list')), 'if (!false || !window.EventSource)')
+    
+    @override_settings(LIVE_EVENTS_STREAM=True)
+    def test_stream_sends_snapshot_then_published_events(self):
+        response = self.client.get(reverse('notification_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks = iter(response.streaming_content)
+        self.assertTrue(next(chunks).startswith(b'retry:'))
+        self.assertIn(b'event: unread_count', next(chunks))
+        self.assertIn(b'event: balance', next(chunks))
+        
+        Notification.objects.create(user=self.user, notification_type='system', title='Hi', message='m')
+        publish_to_user(self.user.pk, 'notification', {'notifications': []})
+        next(chunks)
+        self.assertIn(b'"count":1', next(chunks))
+        response.close()
+    
+    @override_settings(LIVE_EVENTS_STREAM=True, LIVE_EVENTS_POLL_SECONDS=0)
+    def test_stream_picks_up_changes_published_elsewhere(self):
+        response = self.client.get(reverse('notification_stream'))
+        chunks = iter(response.streaming_content)
+        for _ in range(3):
+            next(chunks)
+        # Created by another process: nothing is published to this one's broker
+        Notification.objects.create(user=self.user, notification_type='system', title='Hi', message='m')
+        self.assertEqual(next(chunks), b'event: unread_count\ndata: {"count":1}\n\n')
+        response.close()
+    
+    def test_poll_returns_new_notifications(self):
+        first = Notification.objects.create(user=self.user, notification_type='system', title='Old', message='m')
+        Notification.objects.create(user=self.user, notification_type='system', title='New', message='m')
+        data = self.client.get(reverse('notification_poll'), {'since': first.pk}).json()
+        self.assertEqual([n['title'] for n in data['notifications']], ['New'])
+        self.assertEqual(data['unread_count'], 2)
+    
+    def test_live_count_includes_unread_broadcasts(self):
+        # The live broadcast list is cached and outlives this test's rollback
+        self.addCleanup(cache.delete, AdminNotification.BROADCASTS_CACHE_KEY)
+        AdminNotification.objects.create(
+            title='Heads up', message='m', notification_type='info',
+            start_date=timezone.now() - timedelta(hours=1), end_date=timezone.now() + timedelta(days=1)
+        )
+        page_count = self.client.get(reverse('notifications_list')).context['unread_notifications_count']
+        self.assertEqual(page_count, 1)
+        self.assertEqual(self.client.get(reverse('notification_poll')).json()['unread_count'], page_count)
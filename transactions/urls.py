@@ -3,9 +3,13 @@ from . import views
 
 urlpatterns = [
     path('transactions/', views.transactions_list, name='transactions_list'),
+    path('transactions/export/', views.transactions_export, name='transactions_export'),
     path('transactions/<int:pk>/', views.transaction_detail, name='transaction_detail'),
 
     path('notifications/', views.notifications_list, name='notifications_list'),
+    path('notifications/stream/', views.notification_stream, name='notification_stream'),
+    path('notifications/poll/', views.notification_poll, name='notification_poll'),
     path('notifications/mark-all/', views.mark_all_notifications_read, name='mark_all_notifications_read'),
     path('notifications/<int:pk>/mark/', views.mark_notification_read, name='mark_notification_read'),
+    path('notifications/broadcasts/<int:pk>/mark/', views.mark_broadcast_read, name='mark_broadcast_read'),
 ]
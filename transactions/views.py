@@ -1,12 +1,22 @@
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from site_core.pagination import EstimatedCountPaginator, KeysetPaginator
 from django.db.models import Q
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import render
 from payments.models import Transaction
-from .models import Notification
+from site_core.models import AdminNotification, BroadcastReadCursor
+from .models import Notification, NotificationEvent
 from .forms import TransactionFilterForm
+from .tasks import deliver_notifications
+from site_core.pubsub import user_channel
+from site_core.sse import stream_response
+from .live import expand, serialize_notification, snapshot, stream_enabled, unread_count as count_unread
+from .exports import EXPORT_FORMATS, stream_transactions
 from .utils import mask_email
 
+PENDING_EVENTS_SHOWN = 20
+
 
 from django.shortcuts import redirect, get_object_or_404
 from django.views.decorators.http import require_POST
@@ -15,6 +25,7 @@ from django.views.decorators.http import require_POST
 @require_POST
 def mark_all_notifications_read(request):
     Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+    BroadcastReadCursor.advance_to_latest(request.user)
     return redirect('/transactions/notifications')  # use the name of your notification list url
 
 
@@ -27,27 +38,23 @@ def mark_notification_read(request, pk):
     return redirect('/transactions/notifications')
 
 
+@login_required
+@require_POST
+def mark_broadcast_read(request, pk):
+    broadcast = get_object_or_404(AdminNotification, id=pk)
+    # Read state is a high-water mark, so this also covers older broadcasts
+    BroadcastReadCursor.advance(request.user, broadcast.pk)
+    return redirect('/transactions/notifications')
+
+
 @login_required
 def transactions_list(request):
     transactions = Transaction.objects.filter(user=request.user).select_related('payment_method')
     
     form = TransactionFilterForm(request.GET)
-    if form.is_valid():
-        transaction_type = form.cleaned_data.get('transaction_type')
-        status = form.cleaned_data.get('status')
-        start_date = form.cleaned_data.get('start_date')
-        end_date = form.cleaned_data.get('end_date')
-        
-        if transaction_type:
-            transactions = transactions.filter(transaction_type=transaction_type)
-        if status:
-            transactions = transactions.filter(status=status)
-        if start_date:
-            transactions = transactions.filter(created_at__date__gte=start_date)
-        if end_date:
-            transactions = transactions.filter(created_at__date__lte=end_date)
+    transactions = form.filter_queryset(transactions)
     
-    paginator = Paginator(transactions, 20)
+    paginator = EstimatedCountPaginator(transactions.order_by('-created_at', '-id'), 20)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
@@ -55,9 +62,29 @@ def transactions_list(request):
         'page_obj': page_obj,
         'transactions': page_obj,
         'form': form,
+        'export_query': export_query(request.GET),
     }
     return render(request, 'transactions/list.html', context)
 
+def export_query(params):
+    """The current filters as a query string for the export links"""
+    query = params.copy()
+    for key in ('page', 'format'):
+        query.pop(key, None)
+    return query.urlencode()
+
+@login_required
+def transactions_export(request):
+    export_format = request.GET.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return HttpResponseBadRequest('Unsupported export format')
+    
+    form = TransactionFilterForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest('Invalid export filters')
+    transactions = form.filter_queryset(Transaction.objects.filter(user=request.user))
+    return stream_transactions(transactions, export_format, 'transactions')
+
 @login_required
 def transaction_detail(request, pk):
     transaction = Transaction.objects.filter(user=request.user, pk=pk).first()
@@ -74,21 +101,57 @@ def transaction_detail(request, pk):
 def notifications_list(request):
     notifications = Notification.objects.filter(user=request.user)
     
-    # Debug: Print notification count
-    print(f"Total notifications: {notifications.count()}")
-    for notification in notifications:
-        print(f"Notification: {notification.title} - Read: {notification.is_read}")
+    broadcasts = BroadcastReadCursor.inbox_for(request.user)
+    unread_count = count_unread(request.user, broadcasts)
     
-    unread_count = notifications.filter(is_read=False).count()
-    print(f"Unread count: {unread_count}")
+    # Keyset pages read 20 rows off the (user, created_at) index, however long the inbox
+    paginator = KeysetPaginator(notifications, 20)
+    page_obj = paginator.get_page(
+        cursor=request.GET.get(paginator.cursor_param),
+        direction=request.GET.get(paginator.direction_param),
+        params=request.GET,
+    )
     
-    paginator = Paginator(notifications, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Events still in the outbox are shown as they are; delivery stays with the worker
+    pending_events = []
+    if not page_obj.has_previous():
+        pending_events = list(NotificationEvent.objects.filter(user=request.user).order_by('-id')[:PENDING_EVENTS_SHOWN])
+        if pending_events:
+            deliver_notifications.delay()
     
     context = {
         'page_obj': page_obj,
         'notifications': page_obj.object_list,
+        'broadcasts': broadcasts if not page_obj.has_previous() else [],
+        'pending_events': pending_events,
         'unread_count': unread_count,
     }
-    return render(request, 'transactions/notifications.html', context)
\ No newline at end of file
+    return render(request, 'transactions/notifications.html', context)
+
+@login_required
+def notification_stream(request):
+    """Server-sent events: new notifications, unread counts and balance changes"""
+    if not stream_enabled():
+        # 204 tells EventSource to stop reconnecting
+        return HttpResponse(status=204)
+    user = request.user
+    return stream_response(
+        request,
+        user_channel(user.pk),
+        snapshot=lambda: snapshot(user),
+        expand=lambda message: expand(user, message),
+    )
+
+@login_required
+def notification_poll(request):
+    """Polling fallback for clients without EventSource"""
+    try:
+        since = int(request.GET.get('since', 0))
+    except ValueError:
+        since = 0
+    notifications = Notification.objects.filter(user=request.user, id__gt=since).order_by('-id')[:20]
+    return JsonResponse({
+        'notifications': [serialize_notification(notification) for notification in notifications],
+        'unread_count': count_unread(request.user),
+        'balance': Transaction.get_user_balance(request.user),
+    })
@@ -3,6 +3,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from payments.webhooks import monnify_webhook
+from site_core.views import image_variant, private_media
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -21,6 +22,9 @@ urlpatterns = [
     path('site-admin/', include('site_core.urls')),
     path('api/', include('api.urls')),
     path('webhooks/monnify/', monnify_webhook, name='monnify_webhook'),
+    path('media-variants/<int:width>/<str:fmt>/<path:name>', image_variant, name='image_variant'),
+    # Must match PRIVATE_MEDIA_URL
+    path('private-media/<path:name>', private_media, name='private_media'),
     
 
 ]